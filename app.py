@@ -0,0 +1,122 @@
+import sys
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+import pandas as pd
+import uvicorn
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from websecurity.constant.serving import SERVING_HOST, SERVING_PORT, SERVING_STREAM_CHUNK_SIZE, SERVING_WORKERS
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+from websecurity.serving.model_service import ModelService
+from websecurity.serving.prefork import PreforkServer
+
+
+class PredictRequest(BaseModel):
+    features: Dict[str, Optional[float]]
+
+
+class BatchPredictRequest(BaseModel):
+    rows: List[Dict[str, Optional[float]]]
+
+
+class URLPredictRequest(BaseModel):
+    urls: List[str]
+
+
+model_service = ModelService()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    model_service.start()
+    yield
+    await model_service.stop()
+
+
+app = FastAPI(title="Web Shield", lifespan=lifespan)
+
+
+async def score(rows, urls: bool = False):
+    try:
+        if urls:
+            return await model_service.predict_urls(rows)
+        return await model_service.predict(rows)
+    except WebShieldException as e:
+        logging.info(f"Prediction request rejected: {e}")
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "model_loaded": model_service.network_model is not None,
+            "model_version": model_service.model_version}
+
+
+@app.get("/metrics")
+async def metrics():
+    return model_service.metrics()
+
+
+@app.post("/predict")
+async def predict(request: PredictRequest):
+    prediction = await score([request.features])
+    return {"prediction": prediction[0].item()}
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: BatchPredictRequest):
+    if not request.rows:
+        return {"predictions": []}
+    predictions = await score(request.rows)
+    return {"predictions": predictions.tolist()}
+
+
+@app.post("/predict/urls")
+async def predict_urls(request: URLPredictRequest):
+    """Scores raw URLs; features that need DNS, WHOIS or the page are left to the imputer."""
+    if not request.urls:
+        return {"predictions": []}
+    predictions = await score(request.urls, urls=True)
+    return {"predictions": predictions.tolist()}
+
+
+@app.post("/predict/csv")
+async def predict_csv(file: UploadFile = File(...)):
+    """Scores an uploaded CSV chunk by chunk and streams it back with a prediction column."""
+    try:
+        chunks = pd.read_csv(file.file, chunksize=SERVING_STREAM_CHUNK_SIZE)
+        stream = model_service.stream_predictions(chunks)
+        # Score the first chunk up front so a malformed upload fails with an error status instead of a broken stream
+        first_chunk = await anext(stream, "")
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        logging.info(f"Unreadable CSV upload rejected: {e}")
+        raise HTTPException(status_code=400, detail=f"Could not parse the uploaded CSV: {e}")
+    except Exception as e:
+        # Validation errors (unknown columns, non-numeric values) are ValueErrors, possibly wrapped
+        cause = e.error_message if isinstance(e, WebShieldException) else e
+        if isinstance(cause, ValueError):
+            logging.info(f"CSV prediction request rejected: {e}")
+            raise HTTPException(status_code=422, detail=str(e))
+        logging.info(f"CSV prediction failed: {e}")
+        raise HTTPException(status_code=500, detail="Internal error while scoring the upload")
+
+    async def body():
+        yield first_chunk
+        async for chunk in stream:
+            yield chunk
+
+    return StreamingResponse(body(), media_type="text/csv")
+
+
+if __name__ == "__main__":
+    try:
+        if SERVING_WORKERS > 1:
+            PreforkServer(app, model_service, SERVING_WORKERS, SERVING_HOST, SERVING_PORT).run()
+        else:
+            uvicorn.run(app, host=SERVING_HOST, port=SERVING_PORT)
+    except Exception as e:
+        raise WebShieldException(e, sys)
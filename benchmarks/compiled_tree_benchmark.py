@@ -0,0 +1,73 @@
+"""
+Compares sklearn predict against the compiled array-backed predictor for tree classifiers.
+
+Trains each supported model on the phishing sample, checks that compiled predictions are
+bit-identical, and reports per-call latency and rows/sec at several batch sizes:
+
+    python benchmarks/compiled_tree_benchmark.py --batch-sizes 1 64 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE_PATH = os.path.join(REPO_ROOT, "Web_Data", "phisingData.csv")
+
+
+def time_call(predict, X: np.ndarray, min_seconds: float) -> float:
+    predict(X)
+    calls, start = 0, time.perf_counter()
+    while True:
+        predict(X)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 10000])
+    parser.add_argument("--n-estimators", type=int, default=128)
+    parser.add_argument("--min-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    from sklearn.ensemble import AdaBoostClassifier, GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.tree import DecisionTreeClassifier
+    from websecurity.utils.ml_utils.model.compiled_tree import compile_tree_model, calibrate_batch_limit
+
+    dataframe = pd.read_csv(DATA_FILE_PATH)
+    X = dataframe.drop(columns=["Result"]).to_numpy(dtype=np.float64)
+    y = dataframe["Result"].replace(-1, 0).to_numpy()
+    X_train, y_train, X_test = X[:8000], y[:8000], X[8000:]
+    X_large = np.tile(X_test, (max(args.batch_sizes) // len(X_test) + 1, 1))
+
+    models = {
+        "Decision Tree": DecisionTreeClassifier(random_state=42),
+        "Random Forest": RandomForestClassifier(n_estimators=args.n_estimators, random_state=42),
+        "Gradient Boosting": GradientBoostingClassifier(n_estimators=args.n_estimators, random_state=42),
+        "AdaBoost": AdaBoostClassifier(n_estimators=args.n_estimators, random_state=42),
+    }
+    for name, model in models.items():
+        model.fit(X_train, y_train)
+        compiled = compile_tree_model(model)
+        identical = np.array_equal(model.predict(X_test), compiled.predict(X_test))
+        print(f"{name}: {compiled.n_trees} trees, {len(compiled.feature)} nodes, depth {compiled.max_depth}, "
+              f"bit-identical on test={identical}, "
+              f"calibrated batch limit={calibrate_batch_limit(compiled, model, X_test)}")
+        for batch_size in args.batch_sizes:
+            batch = X_large[:batch_size]
+            sklearn_time = time_call(model.predict, batch, args.min_seconds)
+            compiled_time = time_call(compiled.predict, batch, args.min_seconds)
+            print(f"  batch={batch_size:<6} sklearn={sklearn_time * 1000:9.3f}ms ({batch_size / sklearn_time:11.0f} rows/s)"
+                  f"  compiled={compiled_time * 1000:9.3f}ms ({batch_size / compiled_time:11.0f} rows/s)"
+                  f"  speedup={sklearn_time / compiled_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Measures the cost of enriching URLs with network-dependent features through fake providers.
+
+Generates --rows URLs spread over --domains registered domains (several hosts and paths per domain)
+and extracts their features with an EnrichmentProvider of fake DNS, WHOIS and ranking providers that
+answer after --latency-ms, a --slow-fraction of them slower than --timeout-ms. Reports lookups made
+per provider against unique domains, the NaN share left by timeouts, and wall time for a cold run
+and for a second run served from the on-disk cache. Before timing, checks that cached results are
+reused until they expire and that only NXDOMAIN maps DNSRecord to -1; exits non-zero if either fails.
+
+    python benchmarks/enrichment_benchmark.py --rows 1000000 --domains 20000
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_FILE_PATH = os.path.join(REPO_ROOT, "data_schema", "schema.yaml")
+
+
+def synthetic_urls(rows: int, domains: int, seed: int = 0) -> pd.Series:
+    generator = np.random.default_rng(seed)
+    suffixes = np.array(["com", "net", "org", "co.uk", "ru", "io"])
+    names = pd.Series([f"site{index}" for index in range(domains)]) + "." + pd.Series(generator.choice(suffixes, size=domains))
+    subdomains = pd.Series(generator.choice(["", "www.", "login.", "mail.", "cdn.secure."], size=rows))
+    paths = pd.Series(generator.integers(0, 1000, size=rows).astype(str))
+    return "https://" + subdomains + names.to_numpy()[generator.integers(0, domains, size=rows)] + "/page/" + paths
+
+
+def check_cache_and_dns(scratch_dir: str) -> bool:
+    from websecurity.feature_extraction.enrichment import DNSRecordProvider, Enricher, EnrichmentCache
+    from websecurity.feature_extraction.fake_providers import FakeProvider
+
+    # A new Enricher has an empty memory, so its second run can only be served from the disk cache
+    cache = EnrichmentCache(os.path.join(scratch_dir, "check.sqlite"))
+    provider = FakeProvider("cached", ("DNSRecord",), latency_seconds=0)
+    for _ in range(2):
+        asyncio.run(Enricher([provider], cache).enrich(["a.com", "b.com"]))
+    reused = provider.calls == 2
+
+    expiring = FakeProvider("expiring", ("DNSRecord",), latency_seconds=0)
+    expiring.ttl_seconds = 0
+    enricher = Enricher([expiring], cache)
+    for _ in range(2):
+        asyncio.run(enricher.enrich(["a.com"]))
+    expired = expiring.calls == 2
+
+    async def getaddrinfo(host, port, *args, **kwargs):
+        if host == "missing.example":
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        if host == "flaky.example":
+            raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+        return []
+
+    async def resolve_dns():
+        asyncio.get_running_loop().getaddrinfo = getaddrinfo
+        return await Enricher([DNSRecordProvider()], cache).enrich(["ok.example", "missing.example", "flaky.example"])
+
+    dns = asyncio.run(resolve_dns())["DNSRecord"]
+    nxdomain_only = (dns["ok.example"] == 1 and dns["missing.example"] == -1 and np.isnan(dns["flaky.example"])
+                     and "flaky.example" not in cache.get_many("dns", ["flaky.example"]))
+    print(f"checks: cache reused={reused} expired entries looked up again={expired} "
+          f"only NXDOMAIN maps to -1={nxdomain_only}")
+    return reused and expired and nxdomain_only
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--domains", type=int, default=20000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--timeout-ms", type=float, default=200.0)
+    parser.add_argument("--slow-fraction", type=float, default=0.01)
+    parser.add_argument("--max-concurrency", type=int, default=256)
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    from websecurity.feature_extraction.enrichment import EnrichmentCache, EnrichmentProvider
+    from websecurity.feature_extraction.fake_providers import fake_providers
+    from websecurity.feature_extraction.url_features import URLFeatureExtractor
+    from websecurity.utils.main_utils.utils import get_feature_columns
+
+    urls = synthetic_urls(args.rows, args.domains)
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        os.chdir(scratch_dir)
+        if not check_cache_and_dns(scratch_dir):
+            sys.exit(1)
+        cache_file_path = os.path.join(scratch_dir, "enrichment.sqlite")
+        for run in ("cold", "cached"):
+            providers = fake_providers(args.latency_ms / 1000, args.slow_fraction, slow_latency_seconds=5.0,
+                                       max_concurrency=args.max_concurrency, timeout_seconds=args.timeout_ms / 1000)
+            enrichment = EnrichmentProvider(providers, EnrichmentCache(cache_file_path))
+            extractor = URLFeatureExtractor(get_feature_columns(SCHEMA_FILE_PATH), providers=[enrichment])
+            start = time.perf_counter()
+            features = extractor.extract(urls)
+            elapsed = time.perf_counter() - start
+            stats = enrichment.enricher.stats
+            calls = ", ".join(f"{provider.name}={provider.calls}" for provider in providers)
+            missing = features[list(enrichment.features)].isna().to_numpy().mean()
+            print(f"{run:<7} {len(urls)} URLs in {elapsed:6.2f} s  {len(urls) / elapsed:10,.0f} URLs/sec  "
+                  f"lookups per provider: {calls} (unique domains per chunk, summed: {stats['domains']})  "
+                  f"cache hits={stats['cache_hits']} timeouts={stats['timeouts']} enriched NaN share={missing:.2%}")
+
+
+if __name__ == "__main__":
+    main()
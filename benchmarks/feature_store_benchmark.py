@@ -0,0 +1,99 @@
+"""
+Compares end-to-end stage time and disk footprint of the feature store formats.
+
+Runs ingestion (feature store + split), validation and transformation on the
+phishing sample for each format inside a scratch directory:
+
+    python benchmarks/feature_store_benchmark.py --scale 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE_PATH = os.path.join(REPO_ROOT, "Web_Data", "phisingData.csv")
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def run_stages(file_format: str, dataframe: pd.DataFrame) -> dict:
+    from websecurity.components.data_ingestion import DataIngestion
+    from websecurity.components.data_validation import DataValidation
+    from websecurity.components.data_transformation import DataTransformation
+    from websecurity.entity.artifact_entity import DataIngestionArtifact
+    from websecurity.entity.config_entity import (
+        TrainingPipelineConfig, DataIngestionConfig, DataValidationConfig, DataTransformationConfig
+    )
+    from websecurity.constant import training_pipeline
+
+    training_pipeline.DATA_INGESTION_FILE_FORMAT = file_format
+    training_pipeline.DATA_VALIDATION_FILE_FORMAT = file_format
+    training_pipeline_config = TrainingPipelineConfig()
+    training_pipeline_config.artifact_dir = os.path.join(training_pipeline_config.artifact_name, file_format)
+
+    timings = {}
+    start = time.perf_counter()
+    data_ingestion_config = DataIngestionConfig(training_pipeline_config)
+    data_ingestion = DataIngestion(data_ingestion_config)
+    data_ingestion.export_data_into_feature_store(dataframe)
+    data_ingestion.split_data_into_train_test_split(dataframe)
+    data_ingestion_artifact = DataIngestionArtifact(
+        trained_file_path=data_ingestion_config.training_file_path,
+        test_file_path=data_ingestion_config.testing_file_path,
+    )
+    timings["ingestion"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data_validation = DataValidation(data_ingestion_artifact, DataValidationConfig(training_pipeline_config))
+    data_validation_artifact = data_validation.initiate_data_validation()
+    timings["validation"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data_transformation = DataTransformation(
+        data_validation_artifact, DataTransformationConfig(training_pipeline_config)
+    )
+    data_transformation.initiate_data_transformation()
+    timings["transformation"] = time.perf_counter() - start
+
+    timings["total"] = sum(timings.values())
+    timings["ingestion_bytes"] = directory_size(data_ingestion_config.data_ingestion_dir)
+    timings["validation_bytes"] = directory_size(os.path.join(training_pipeline_config.artifact_dir, "data_validation"))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1, help="replicate the sample this many times")
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet", "feather"])
+    args = parser.parse_args()
+
+    dataframe = pd.read_csv(DATA_FILE_PATH)
+    dataframe = pd.concat([dataframe] * args.scale, ignore_index=True)
+
+    # Artifacts, logs and final_model/ are written relative to the working directory
+    workdir = tempfile.mkdtemp(prefix="feature_store_benchmark_")
+    os.symlink(os.path.join(REPO_ROOT, "data_schema"), os.path.join(workdir, "data_schema"))
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+
+    print(f"rows={len(dataframe)} workdir={workdir}")
+    print(f"{'format':<8} {'ingest s':>9} {'validate s':>11} {'transform s':>12} {'total s':>8} "
+          f"{'ingest MB':>10} {'validate MB':>12}")
+    for file_format in args.formats:
+        result = run_stages(file_format, dataframe)
+        print(f"{file_format:<8} {result['ingestion']:>9.3f} {result['validation']:>11.3f} "
+              f"{result['transformation']:>12.3f} {result['total']:>8.3f} "
+              f"{result['ingestion_bytes'] / 1e6:>10.3f} {result['validation_bytes'] / 1e6:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Compares pickled models against out-of-band model artifacts on cold start and per-worker memory.
+
+Builds a NetworkModel (KNN imputer fitted on the tiled phishing sample, 256-tree random forest and
+its compiled copy), saves it both as a plain pickle and as a model artifact, then starts --workers
+processes per format that load the model and score a batch. Memory comes from /proc/<pid>/smaps_rollup:
+Pss splits shared pages between the processes mapping them, Private is what each worker owns alone.
+
+    python benchmarks/model_artifact_benchmark.py --workers 4 --scale 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE_PATH = os.path.join(REPO_ROOT, "Web_Data", "phisingData.csv")
+
+
+def memory_kib(pid="self") -> dict:
+    with open(f"/proc/{pid}/smaps_rollup") as smaps:
+        fields = {line.split()[0].rstrip(":"): int(line.split()[1]) for line in smaps if line.rstrip().endswith("kB")}
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "private": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def run_worker(model_path: str) -> None:
+    sys.path.insert(0, REPO_ROOT)
+    from websecurity.utils.main_utils.utils import load_object
+
+    features = pd.read_csv(DATA_FILE_PATH).drop(columns=["Result"]).iloc[:1000]
+    baseline = memory_kib()
+    start = time.perf_counter()
+    network_model = load_object(model_path)
+    network_model.predict(features.iloc[:1])
+    cold_start = time.perf_counter() - start
+    network_model.predict(features)
+    print(json.dumps({"cold_start": cold_start, "baseline": baseline, "loaded": memory_kib()}), flush=True)
+    # Stay alive until the parent has measured every worker
+    sys.stdin.read()
+
+
+def build_model(scale: int, n_estimators: int):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.impute import KNNImputer
+    from sklearn.pipeline import Pipeline
+    from websecurity.utils.ml_utils.model.compiled_tree import compile_tree_model
+    from websecurity.utils.ml_utils.model.estimator import NetworkModel
+
+    dataframe = pd.read_csv(DATA_FILE_PATH)
+    features = pd.concat([dataframe.drop(columns=["Result"])] * scale, ignore_index=True)
+    target = pd.concat([dataframe["Result"].replace(-1, 0)] * scale, ignore_index=True)
+    preprocessor = Pipeline([("imputer", KNNImputer(n_neighbors=3))]).fit(features)
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42).fit(
+        preprocessor.transform(features).astype(np.float32), target
+    )
+    return NetworkModel(preprocessor=preprocessor, model=model, fast_model=compile_tree_model(model))
+
+
+def start_workers(model_path: str, workers: int) -> list:
+    # Started one after another so cold starts don't compete for CPU; all stay alive for the memory reading
+    processes, results = [], []
+    for _ in range(workers):
+        process = subprocess.Popen([sys.executable, "-W", "ignore", os.path.abspath(__file__), "--worker", model_path],
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        processes.append(process)
+        results.append(json.loads(process.stdout.readline()))
+    # Re-read once every worker is up: Pss of shared pages depends on how many processes map them
+    results = [dict(result, loaded=memory_kib(process.pid)) for result, process in zip(results, processes)]
+    for process in processes:
+        process.stdin.close()
+        process.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--n-estimators", type=int, default=256)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    sys.path.insert(0, REPO_ROOT)
+    from websecurity.utils.main_utils.utils import save_object, object_file, get_artifact_dir
+
+    network_model = build_model(args.scale, args.n_estimators)
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        os.chdir(scratch_dir)
+        for label, out_of_band in (("pickle", False), ("artifact", True)):
+            model_path = os.path.join(scratch_dir, label, "model.pkl")
+            save_object(model_path, network_model, out_of_band=out_of_band)
+            stored = get_artifact_dir(model_path) if out_of_band else object_file(model_path)
+            size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(stored) for name in names) \
+                if os.path.isdir(stored) else os.path.getsize(stored)
+
+            results = start_workers(model_path, args.workers)
+            cold_start = np.median([result["cold_start"] for result in results])
+            added = {key: np.mean([result["loaded"][key] - result["baseline"][key] for result in results]) / 1024
+                     for key in ("rss", "pss", "private")}
+            print(f"{label:<9} size={size / 2 ** 20:6.1f} MiB  cold start (load + first predict)={cold_start * 1000:7.1f} ms  "
+                  f"per worker added: rss={added['rss']:6.1f} MiB pss={added['pss']:6.1f} MiB "
+                  f"private={added['private']:6.1f} MiB  ({args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compares wall-clock time and chosen-model test score of the ModelTrainer search strategies
+on Web_Data/phisingData.csv:
+
+    python benchmarks/search_strategy_benchmark.py --strategies randomized halving
+
+The exhaustive strategy fits every grid point (~3.5k fits) and takes a long time on small machines.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE_PATH = os.path.join(REPO_ROOT, "Web_Data", "phisingData.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--strategies", nargs="+", default=["exhaustive", "randomized", "halving"])
+    parser.add_argument("--budget", type=int, default=20)
+    parser.add_argument("--resource", default="n_samples", choices=["n_samples", "n_estimators"])
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    # Logs are written relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="search_strategy_benchmark_"))
+    sys.path.insert(0, REPO_ROOT)
+    from websecurity.components.model_trainer import ModelTrainer
+    from websecurity.utils.main_utils.utils import evaluate_models
+    from websecurity.utils.ml_utils.metric.classification_metric import get_classification_score
+
+    dataframe = pd.read_csv(DATA_FILE_PATH)
+    X = dataframe.drop(columns=["Result"]).to_numpy(dtype=np.float32)
+    y = dataframe["Result"].replace(-1, 0).to_numpy(dtype=np.int8)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    print(f"{'strategy':<12} {'seconds':>9} {'best model':<20} {'test r2':>8} {'test f1':>8}")
+    for strategy in args.strategies:
+        models, params = ModelTrainer.get_search_space()
+        for model in models.values():
+            if "verbose" in model.get_params():
+                model.set_params(verbose=0)
+
+        start = time.perf_counter()
+        report = evaluate_models(
+            X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test,
+            models=models, params=params, n_jobs=args.n_jobs, cache_dir=None,
+            strategy=strategy, budget=args.budget, resource=args.resource,
+        )
+        elapsed = time.perf_counter() - start
+
+        best_model_name = max(report, key=report.get)
+        test_metric = get_classification_score(y_true=y_test, y_pred=models[best_model_name].predict(X_test))
+        print(f"{strategy:<12} {elapsed:>9.1f} {best_model_name:<20} {report[best_model_name]:>8.4f} "
+              f"{test_metric.f1_score:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
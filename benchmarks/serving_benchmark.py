@@ -0,0 +1,77 @@
+"""
+Measures single-row prediction throughput of ModelService with and without micro-batching,
+and with the prediction cache on top of the batcher.
+
+Fires --requests single-row predictions from --concurrency concurrent callers against the
+model in final_model/ (run from a directory that has final_model/ and data_schema/):
+
+    python benchmarks/serving_benchmark.py --requests 5000 --concurrency 64 --max-wait-ms 1 2 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE_PATH = os.path.join(REPO_ROOT, "Web_Data", "phisingData.csv")
+
+
+async def run_load(service, records: list, concurrency: int) -> float:
+    position = iter(range(len(records)))
+
+    async def caller():
+        for index in position:
+            await service.predict([records[index]])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def measure(micro_batching: bool, max_wait_ms: float, max_batch_size: int, records: list, concurrency: int,
+                  cache_enabled: bool = False):
+    from websecurity.serving.model_service import ModelService
+
+    service = ModelService(micro_batching=micro_batching, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                           cache_enabled=cache_enabled)
+    service.start()
+    try:
+        await service.predict(records[:1])
+        elapsed = await run_load(service, records, concurrency)
+        return elapsed, service.metrics()
+    finally:
+        await service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[1.0, 2.0, 5.0])
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    dataframe = pd.read_csv(DATA_FILE_PATH).drop(columns=["Result"])
+    records = pd.concat([dataframe] * (args.requests // len(dataframe) + 1)).iloc[:args.requests].to_dict("records")
+
+    elapsed, _ = asyncio.run(measure(False, 0, args.max_batch_size, records, args.concurrency))
+    print(f"{'unbatched':<22} {len(records) / elapsed:10.0f} req/s")
+    for max_wait_ms in args.max_wait_ms:
+        elapsed, metrics = asyncio.run(measure(True, max_wait_ms, args.max_batch_size, records, args.concurrency))
+        print(f"{f'batched wait={max_wait_ms}ms':<22} {len(records) / elapsed:10.0f} req/s  "
+              f"batch mean={metrics['batch_size_mean']:.1f} latency p50={metrics['latency_ms_p50']:.1f}ms "
+              f"p99={metrics['latency_ms_p99']:.1f}ms")
+    elapsed, metrics = asyncio.run(
+        measure(True, args.max_wait_ms[0], args.max_batch_size, records, args.concurrency, cache_enabled=True)
+    )
+    cache = metrics["cache"]
+    print(f"{'batched + cache':<22} {len(records) / elapsed:10.0f} req/s  hit rate={cache['hit_rate']:.3f} "
+          f"entries={cache['entries']} memory={cache['memory_bytes'] / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Compares per-worker memory when every worker loads its own model against workers forked from a parent
+that loaded it once, the way PreforkServer hosts the prediction service.
+
+Builds a NetworkModel (KNN imputer fitted on the tiled phishing sample, random forest and its compiled
+copy) and saves it as a pickle and as an out-of-band artifact. "independent" starts --workers fresh
+processes that each load the model; "preforked" loads it in this process, freezes the collector and
+forks the workers. Every worker then scores a batch. Memory comes from /proc/<pid>/smaps_rollup: Pss
+splits shared pages between the processes mapping them, Private is what each worker owns alone.
+
+    python benchmarks/shared_model_benchmark.py --workers 4 --scale 4
+"""
+import argparse
+import gc
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE_PATH = os.path.join(REPO_ROOT, "Web_Data", "phisingData.csv")
+
+
+def memory_kib(pid="self") -> dict:
+    with open(f"/proc/{pid}/smaps_rollup") as smaps:
+        fields = {line.split()[0].rstrip(":"): int(line.split()[1]) for line in smaps if line.rstrip().endswith("kB")}
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "private": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def load_features() -> pd.DataFrame:
+    return pd.read_csv(DATA_FILE_PATH).drop(columns=["Result"]).iloc[:1000]
+
+
+def run_worker(model_path: str) -> None:
+    sys.path.insert(0, REPO_ROOT)
+    from websecurity.utils.main_utils.utils import load_object
+
+    features = load_features()
+    start = time.perf_counter()
+    network_model = load_object(model_path)
+    network_model.predict(features)
+    print(json.dumps({"ready": time.perf_counter() - start}), flush=True)
+    # Stay alive until the parent has measured every worker
+    sys.stdin.read()
+
+
+def build_model(scale: int, n_estimators: int):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.impute import KNNImputer
+    from sklearn.pipeline import Pipeline
+    from websecurity.utils.ml_utils.model.compiled_tree import compile_tree_model
+    from websecurity.utils.ml_utils.model.estimator import NetworkModel
+
+    dataframe = pd.read_csv(DATA_FILE_PATH)
+    features = pd.concat([dataframe.drop(columns=["Result"])] * scale, ignore_index=True)
+    target = pd.concat([dataframe["Result"].replace(-1, 0)] * scale, ignore_index=True)
+    preprocessor = Pipeline([("imputer", KNNImputer(n_neighbors=3))]).fit(features)
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42).fit(
+        preprocessor.transform(features).astype(np.float32), target
+    )
+    return NetworkModel(preprocessor=preprocessor, model=model, fast_model=compile_tree_model(model))
+
+
+def independent_workers(model_path: str, workers: int) -> list:
+    # Started one after another so loads don't compete for CPU; all stay alive for the memory reading
+    processes, ready = [], []
+    for _ in range(workers):
+        process = subprocess.Popen([sys.executable, "-W", "ignore", os.path.abspath(__file__), "--worker", model_path],
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        processes.append(process)
+        ready.append(json.loads(process.stdout.readline())["ready"])
+    memory = [memory_kib(process.pid) for process in processes]
+    for process in processes:
+        process.stdin.close()
+        process.wait()
+    return ready, memory
+
+
+def preforked_workers(model_path: str, workers: int) -> list:
+    from websecurity.utils.main_utils.utils import load_object
+
+    features = load_features()
+    network_model = load_object(model_path)
+    gc.collect()
+    gc.freeze()
+    pids, ready = [], []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            start = time.perf_counter()
+            network_model.predict(features)
+            os.write(write_fd, json.dumps({"ready": time.perf_counter() - start}).encode())
+            os.close(write_fd)
+            signal.pause()
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            ready.append(json.loads(pipe.read())["ready"])
+        pids.append(pid)
+    memory = [memory_kib(pid) for pid in pids]
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+    del network_model
+    gc.unfreeze()
+    return ready, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--n-estimators", type=int, default=256)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    sys.path.insert(0, REPO_ROOT)
+    from websecurity.utils.main_utils.utils import save_object
+
+    network_model = build_model(args.scale, args.n_estimators)
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        os.chdir(scratch_dir)
+        pickle_path = os.path.join(scratch_dir, "pickle", "model.pkl")
+        artifact_path = os.path.join(scratch_dir, "artifact", "model.pkl")
+        save_object(pickle_path, network_model)
+        save_object(artifact_path, network_model, out_of_band=True)
+        del network_model
+
+        for label, run, model_path in (("independent pickle", independent_workers, pickle_path),
+                                       ("independent artifact", independent_workers, artifact_path),
+                                       ("preforked", preforked_workers, pickle_path)):
+            ready, memory = run(model_path, args.workers)
+            added = {key: np.mean([usage[key] for usage in memory]) / 1024 for key in ("rss", "pss", "private")}
+            print(f"{label:<21} ready={np.median(ready) * 1000:7.1f} ms  per worker: rss={added['rss']:6.1f} MiB "
+                  f"pss={added['pss']:6.1f} MiB private={added['private']:6.1f} MiB  ({args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
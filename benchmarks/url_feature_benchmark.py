@@ -0,0 +1,126 @@
+"""
+Measures URL feature extraction throughput in URLs/sec over a file of raw URLs.
+
+Without --urls-file, writes --rows synthetic URLs (plain, IP hosts, shorteners, userinfo, redirects,
+deep subdomains, ports, long paths) to a temporary csv first. The vectorized URLFeatureExtractor is
+timed over the whole file; a per-URL urllib/re implementation of the same rules is timed on a sample
+and checked for identical output.
+
+    python benchmarks/url_feature_benchmark.py --rows 1000000
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_FILE_PATH = os.path.join(REPO_ROOT, "data_schema", "schema.yaml")
+
+
+def synthetic_urls(rows: int, seed: int = 0) -> pd.Series:
+    generator = np.random.default_rng(seed)
+    words = np.array(["login", "secure", "account", "paypal", "bank", "update", "mail", "shop", "news", "cdn",
+                      "verify", "apple", "my-site", "docs", "static", "portal"])
+    tlds = np.array(["com", "org", "net", "co.uk", "ru", "info", "io", "de"])
+    schemes = generator.choice(["http://", "https://", "", "HTTPS://"], size=rows, p=[0.45, 0.45, 0.05, 0.05])
+    subdomains = generator.integers(0, 4, size=rows)
+    host = pd.Series(generator.choice(words, size=rows)) + "." + pd.Series(generator.choice(tlds, size=rows))
+    for depth in range(1, 4):
+        prefix = pd.Series(generator.choice(words, size=rows)) + "."
+        host = host.where(subdomains < depth, prefix + host)
+    kind = generator.random(rows)
+    ip = pd.Series(generator.integers(1, 255, size=(rows, 4)).astype(str).tolist()).str.join(".")
+    host = host.where(kind >= 0.1, ip)
+    host = host.where((kind < 0.1) | (kind >= 0.15), pd.Series(generator.choice(["bit.ly", "goo.gl", "tinyurl.com"], size=rows)))
+    host = host.where((kind < 0.15) | (kind >= 0.2), "user@" + host)
+    host = host.where((kind < 0.2) | (kind >= 0.25), host + ":" + pd.Series(generator.choice(["80", "443", "8080"], size=rows)))
+    path_length = generator.integers(0, 90, size=rows)
+    path = pd.Series(["/" + "p" * length for length in path_length])
+    path = path.where((kind < 0.25) | (kind >= 0.3), "//" + path)
+    return pd.Series(schemes) + host + path
+
+
+SHORTENERS = None
+IP_HOST = re.compile(r"^(?:(?:\d{1,3}|0x[0-9a-f]{1,2})(?:\.(?:\d{1,3}|0x[0-9a-f]{1,2})){3}|0x[0-9a-f]+|\d+|\[[0-9a-f:.]+\])$")
+COUNTRY_CODE = re.compile(r"\.[a-z]{2}$")
+DOUBLE_SLASH = re.compile(r"^.{7,}//")
+
+
+def reference_features(url: str) -> dict:
+    """The same rules one URL at a time with urllib and re."""
+    url = url.strip()
+    parts = urlsplit(url if "://" in url else "//" + url)
+    scheme = parts.scheme.lower() if "://" in url else ""
+    netloc = parts.netloc.rsplit("@", 1)[-1]
+    host, _, port = netloc.partition(":") if not netloc.startswith("[") else (netloc[:netloc.find("]") + 1], ":", netloc[netloc.find("]") + 2:])
+    host = host.lower().rstrip(".")
+    domain = host[4:] if host.startswith("www.") else host
+    dots = domain.count(".") - (1 if COUNTRY_CODE.search(domain) else 0)
+    standard_port = (port == "80" and scheme != "https") or (port == "443" and scheme != "http")
+    return {
+        "having_IP_Address": -1 if IP_HOST.match(host) else 1,
+        "URL_Length": 1 if len(url) < 54 else 0 if len(url) <= 75 else -1,
+        "Shortining_Service": -1 if domain in SHORTENERS else 1,
+        "having_At_Symbol": -1 if "@" in url else 1,
+        "double_slash_redirecting": -1 if DOUBLE_SLASH.match(url) else 1,
+        "Prefix_Suffix": -1 if "-" in host else 1,
+        "having_Sub_Domain": 1 if dots <= 1 else 0 if dots == 2 else -1,
+        "SSLfinal_State": np.nan if scheme == "https" else -1,
+        "port": -1 if port and not standard_port else 1,
+        "HTTPS_token": -1 if "https" in host else 1,
+    }
+
+
+def main():
+    global SHORTENERS
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--urls-file", help="csv, parquet or feather file with a url column")
+    parser.add_argument("--url-column", default="url")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--reference-rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    from websecurity.constant.feature_extraction import FEATURE_EXTRACTION_SHORTENER_DOMAINS
+    from websecurity.feature_extraction.url_features import URLFeatureExtractor
+    from websecurity.utils.main_utils.utils import get_feature_columns
+
+    SHORTENERS = set(FEATURE_EXTRACTION_SHORTENER_DOMAINS)
+    extractor = URLFeatureExtractor(get_feature_columns(SCHEMA_FILE_PATH), chunk_size=args.chunk_size)
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        os.chdir(scratch_dir)
+        urls_file = args.urls_file
+        if urls_file is None:
+            urls_file = os.path.join(scratch_dir, "urls.csv")
+            synthetic_urls(args.rows).rename(args.url_column).to_frame().to_csv(urls_file, index=False)
+
+        start = time.perf_counter()
+        rows = sum(len(features) for features in extractor.extract_file(urls_file, args.url_column))
+        elapsed = time.perf_counter() - start
+        print(f"file (read + extract)  {rows} URLs in {elapsed:6.2f} s  {rows / elapsed:12,.0f} URLs/sec")
+
+        urls = pd.read_csv(urls_file)[args.url_column]
+        start = time.perf_counter()
+        features = extractor.extract(urls)
+        elapsed = time.perf_counter() - start
+        print(f"vectorized extract     {len(urls)} URLs in {elapsed:6.2f} s  {len(urls) / elapsed:12,.0f} URLs/sec")
+
+        sample = urls.iloc[:args.reference_rows]
+        start = time.perf_counter()
+        reference = pd.DataFrame([reference_features(url) for url in sample], index=sample.index)
+        elapsed = time.perf_counter() - start
+        print(f"per-URL reference      {len(sample)} URLs in {elapsed:6.2f} s  {len(sample) / elapsed:12,.0f} URLs/sec")
+        mismatches = ~((features.loc[sample.index, reference.columns] == reference)
+                       | (features.loc[sample.index, reference.columns].isna() & reference.isna()))
+        print(f"rows differing from the reference: {int(mismatches.any(axis=1).sum())}")
+
+
+if __name__ == "__main__":
+    main()
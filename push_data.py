@@ -1,13 +1,21 @@
 import os
 import sys
-import json
+import time
+import hashlib
+import argparse
 import certifi
 import pandas as pd
 import numpy as np
 import pymongo
+from pymongo import UpdateOne
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from dotenv import load_dotenv
 from websecurity.exception.exception import WebShieldException
 from websecurity.logging.logger import logging
+from websecurity.constant.training_pipeline import (
+    DATA_INGESTION_DATABASE_NAME, DATA_INGESTION_COLLECTION_NAME, DATA_INGESTION_INGESTED_AT_FIELD,
+    DATA_INGESTION_LOAD_CHUNK_SIZE, DATA_INGESTION_LOAD_BATCH_SIZE, DATA_INGESTION_LOAD_WORKERS
+)
 
 # Load environment variables
 load_dotenv()
@@ -23,66 +31,174 @@ if not MONGO_DB_URL:
 ca = certifi.where()
 
 class WebDataExtract:
-    def __init__(self):
+    def __init__(self, workers: int = DATA_INGESTION_LOAD_WORKERS):
         try:
-            # Initialize MongoDB client
-            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL, tlsCAFile=ca)
+            # One pooled client shared by all writer threads
+            self.workers = workers
+            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL, tlsCAFile=ca, maxPoolSize=workers)
             logging.info("MongoDB client initialized successfully.")
         except Exception as e:
             raise WebShieldException(e, sys)
 
-    def csv_to_json_converter(self, file_path):
+    @staticmethod
+    def row_ids(chunk: pd.DataFrame, source: str, occurrences: dict) -> list:
         """
-        Converts a CSV file to a JSON-like list of records.
+        Id of every row: its source file, a content hash and how many identical rows came before it in
+        that file. Loading the same file again reproduces the same ids, while distinct samples that happen
+        to share every feature value stay separate documents. occurrences maps content hash to the count
+        seen so far and is carried across the chunks of one file. Numeric columns are hashed as float64,
+        so a column that reads as int in one chunk and float (because of a missing value) in another still
+        hashes the same; the row is hashed with its columns in both orders for a 128-bit content hash.
+        """
+        try:
+            normalized = pd.DataFrame({
+                column: values.astype(np.float64) if pd.api.types.is_numeric_dtype(values) else values.astype(str)
+                for column, values in chunk.items()
+            })
+            high, low = (pd.util.hash_pandas_object(frame, index=False).to_numpy()
+                         for frame in (normalized, normalized[normalized.columns[::-1]]))
+            content = pd.Series([f"{h:016x}{l:016x}" for h, l in zip(high.tolist(), low.tolist())])
+            occurrence = content.groupby(content).cumcount() + content.map(occurrences).fillna(0).astype(np.int64)
+            for content_hash, count in content.value_counts().items():
+                occurrences[content_hash] = occurrences.get(content_hash, 0) + count
+            source_hash = hashlib.sha1(source.encode()).hexdigest()[:16]
+            return [f"{source_hash}{content_hash}{index:x}" for content_hash, index in zip(content, occurrence.tolist())]
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    def iter_record_batches(self, file_path: str, chunk_size: int = DATA_INGESTION_LOAD_CHUNK_SIZE,
+                            batch_size: int = DATA_INGESTION_LOAD_BATCH_SIZE):
+        """
+        Reads the CSV chunk_size rows at a time and yields lists of at most batch_size records, each with
+        its row id as _id. The file is identified by its name, so the same file loaded from another
+        directory matches its earlier load. Records are built straight from the column arrays; missing
+        values become None.
         """
         try:
             logging.info(f"Reading CSV file from path: {file_path}")
-            data = pd.read_csv(file_path)
-            data.reset_index(drop=True, inplace=True)
-            records = list(json.loads(data.T.to_json()).values())
+            source = os.path.basename(file_path)
+            occurrences = {}
+            for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+                chunk = chunk.reset_index(drop=True)
+                columns = ["_id", *chunk.columns]
+                values = [self.row_ids(chunk, source, occurrences)]
+                for _, column in chunk.items():
+                    if column.isna().any():
+                        column = column.astype(object).where(column.notna(), None)
+                    values.append(column.tolist())
+                rows = list(zip(*values))
+                for start in range(0, len(rows), batch_size):
+                    yield [dict(zip(columns, row)) for row in rows[start:start + batch_size]]
+        except FileNotFoundError as e:
+            logging.error(f"File not found: {file_path}")
+            raise WebShieldException(e, sys) from e
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    def csv_to_json_converter(self, file_path):
+        """
+        Converts a CSV file to a JSON-like list of records, each with its row id as _id.
+        """
+        try:
+            records = [record for batch in self.iter_record_batches(file_path) for record in batch]
             logging.info(f"Successfully converted CSV to JSON records: {len(records)} records found.")
             return records
-        except FileNotFoundError:
-            logging.error(f"File not found: {file_path}")
-            raise WebShieldException(f"File not found: {file_path}", sys)
         except Exception as e:
             raise WebShieldException(e, sys)
 
     def insert_data_to_mongodb(self, records, database, collection):
         """
-        Inserts a list of JSON-like records into a MongoDB collection.
+        Upserts records from csv_to_json_converter into a MongoDB collection; returns how many were new.
         """
         try:
             logging.info(f"Inserting data into MongoDB: Database={database}, Collection={collection}")
-            db = self.mongo_client[database]
-            col = db[collection]
-            result = col.insert_many(records)
-            logging.info(f"Inserted {len(result.inserted_ids)} records into MongoDB.")
-            return len(result.inserted_ids)
+            col = self.mongo_client[database][collection]
+            inserted = sum(self.upsert_batch(col, records[start:start + DATA_INGESTION_LOAD_BATCH_SIZE])["inserted"]
+                           for start in range(0, len(records), DATA_INGESTION_LOAD_BATCH_SIZE))
+            logging.info(f"Inserted {inserted} records into MongoDB.")
+            return inserted
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    @staticmethod
+    def upsert_batch(collection, records) -> dict:
+        """
+        Unordered bulk upsert of one batch. Existing documents are left untouched; new ones are then
+        stamped with the server's clock ($currentDate), which incremental ingestion uses as its watermark.
+        Until stamped a document is invisible to ingestion, and any document of the batch still missing
+        the stamp (e.g. after a crash between the two writes) gets it when the batch is loaded again.
+        """
+        try:
+            requests = [UpdateOne({"_id": record["_id"]}, {"$setOnInsert": record}, upsert=True) for record in records]
+            result = collection.bulk_write(requests, ordered=False)
+            collection.update_many(
+                {"_id": {"$in": [record["_id"] for record in records]},
+                 DATA_INGESTION_INGESTED_AT_FIELD: {"$exists": False}},
+                {"$currentDate": {DATA_INGESTION_INGESTED_AT_FIELD: True}},
+            )
+            return {"rows": len(records), "inserted": result.upserted_count, "existing": result.matched_count}
         except pymongo.errors.PyMongoError as e:
             logging.error(f"MongoDB error: {e}")
             raise WebShieldException(e, sys)
         except Exception as e:
             raise WebShieldException(e, sys)
 
+    def load_csv_to_mongodb(self, file_path, database, collection,
+                            chunk_size: int = DATA_INGESTION_LOAD_CHUNK_SIZE,
+                            batch_size: int = DATA_INGESTION_LOAD_BATCH_SIZE) -> dict:
+        """
+        Streams a CSV into a MongoDB collection with bulk upserts from self.workers threads. Rerunning it
+        on the same file inserts nothing new; every row of the file, duplicates included, is one document.
+        """
+        try:
+            logging.info(f"Loading {file_path} into MongoDB: Database={database}, Collection={collection}")
+            col = self.mongo_client[database][collection]
+            col.create_index(DATA_INGESTION_INGESTED_AT_FIELD)
+
+            totals = {"rows": 0, "inserted": 0, "existing": 0}
+            start = time.perf_counter()
+
+            def collect(done):
+                for future in done:
+                    for key, value in future.result().items():
+                        totals[key] += value
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                pending = set()
+                for records in self.iter_record_batches(file_path, chunk_size, batch_size):
+                    # Bounded backlog so reading never runs far ahead of the writers
+                    if len(pending) >= 2 * self.workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                        elapsed = time.perf_counter() - start
+                        logging.info(f"Loaded {totals['rows']} rows ({totals['rows'] / elapsed:.0f} docs/sec)")
+                    pending.add(executor.submit(self.upsert_batch, col, records))
+                collect(wait(pending).done)
+
+            totals["seconds"] = round(time.perf_counter() - start, 3)
+            totals["docs_per_sec"] = round(totals["rows"] / max(totals["seconds"], 1e-9))
+            logging.info(f"Loaded {file_path}: {totals}")
+            return totals
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+
 if __name__ == '__main__':
     try:
-        # Configuration for the script
-        FILE_PATH = 'Network_Data/phisingData.csv'  # Ensure this path exists
-        DATABASE = "Ishant"
-        COLLECTION = "WebData"
-
-        # Initialize the class
-        web_obj = WebDataExtract()
-
-        # Convert CSV to JSON records
-        records = web_obj.csv_to_json_converter(file_path=FILE_PATH)
-        print(records)
-        # Insert records into MongoDB
-        no_of_records = web_obj.insert_data_to_mongodb(records, DATABASE, COLLECTION)
-
-        # Print the number of records inserted
-        print(f"Successfully inserted {no_of_records} records into MongoDB.")
+        parser = argparse.ArgumentParser(description="Load a CSV of web data into MongoDB.")
+        parser.add_argument("--file-path", default="Network_Data/phisingData.csv")
+        parser.add_argument("--database", default=DATA_INGESTION_DATABASE_NAME)
+        parser.add_argument("--collection", default=DATA_INGESTION_COLLECTION_NAME)
+        parser.add_argument("--chunk-size", type=int, default=DATA_INGESTION_LOAD_CHUNK_SIZE)
+        parser.add_argument("--batch-size", type=int, default=DATA_INGESTION_LOAD_BATCH_SIZE)
+        parser.add_argument("--workers", type=int, default=DATA_INGESTION_LOAD_WORKERS)
+        args = parser.parse_args()
+
+        web_obj = WebDataExtract(workers=args.workers)
+        totals = web_obj.load_csv_to_mongodb(args.file_path, args.database, args.collection,
+                                             chunk_size=args.chunk_size, batch_size=args.batch_size)
+        print(f"Loaded {totals['rows']} rows into MongoDB ({totals['inserted']} new, {totals['existing']} "
+              f"already present) in {totals['seconds']} s, {totals['docs_per_sec']} docs/sec.")
     except Exception as e:
         logging.error(f"An error occurred: {e}")
         print(f"An error occurred: {e}")
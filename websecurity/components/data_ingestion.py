@@ -5,13 +5,21 @@ from websecurity.logging.logger import logging
 # Config file for DataIngestion Config
 from websecurity.entity.config_entity import DataIngestionConfig
 from websecurity.entity.artifact_entity import DataIngestionArtifact
+from websecurity.constant.training_pipeline import SCHEMA_FILE_PATH, DATA_INGESTION_INGESTED_AT_FIELD
+from websecurity.utils.main_utils.utils import read_yaml_file, write_yaml_file
+from websecurity.utils.main_utils.utils import write_dataframe, append_dataframe, copy_dataframe, dataframe_part_paths
 
 import os
 import sys
+import time
+import shutil
 import pymongo
+from bson import ObjectId
 import numpy as np
 import pandas as pd
 from typing import List
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.model_selection import train_test_split
 
 from dotenv import load_dotenv
@@ -23,6 +31,8 @@ class DataIngestion:
     def __init__(self, data_ingestion_config: DataIngestionConfig):
         try:
             self.data_ingestion_config = data_ingestion_config
+            self.partition_timings = {}
+            self.schema_config = read_yaml_file(SCHEMA_FILE_PATH)
         except Exception as e:
             raise WebShieldException(e, sys)
 
@@ -37,7 +47,9 @@ class DataIngestion:
             df = pd.DataFrame(list(collection.find()))
 
             if "_id" in df.columns.to_list():
-                df.drop(columns=["_id"], axis=1, inplace=True)  # Fixed assignment issue
+                df.drop(columns=["_id"], inplace=True)  # Fixed assignment issue
+            if DATA_INGESTION_INGESTED_AT_FIELD in df.columns.to_list():
+                df.drop(columns=[DATA_INGESTION_INGESTED_AT_FIELD], inplace=True)
 
             df.replace({"na": np.nan}, inplace=True)
 
@@ -46,14 +58,183 @@ class DataIngestion:
         except Exception as e:
             raise WebShieldException(e, sys)  # Fixed missing parameters
 
+    # Column name -> dtype mapping declared in schema.yaml
+    def get_schema_dtypes(self) -> dict:
+        try:
+            dtypes = {}
+            for column in self.schema_config["columns"]:
+                dtypes.update({name: np.dtype(dtype) for name, dtype in column.items()})
+            return dtypes
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    # Converting one batch of documents into typed column chunks
+    def batch_to_column_chunks(self, batch: List[dict], dtypes: dict) -> dict:
+        """
+        Builds one numpy array per schema column for a batch of documents.
+        Columns holding missing values ("na") are kept as float32 so NaN survives;
+        everything else is cast to the schema dtype.
+        """
+        try:
+            frame = pd.DataFrame.from_records(batch, columns=list(dtypes.keys()))
+            chunks = {}
+            for column, dtype in dtypes.items():
+                values = pd.to_numeric(frame[column].replace({"na": np.nan}), errors="coerce").to_numpy()
+                if np.isnan(values.astype(np.float64, copy=False)).any():
+                    chunks[column] = values.astype(np.float32)
+                else:
+                    chunks[column] = values.astype(dtype)
+            return chunks
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    # Assembling column chunks into a single DataFrame
+    @staticmethod
+    def column_chunks_to_dataframe(chunks: List[dict], columns: List[str]) -> pd.DataFrame:
+        try:
+            data = {}
+            for column in columns:
+                parts = [chunk[column] for chunk in chunks]
+                data[column] = np.concatenate(parts) if parts else np.array([], dtype=np.int8)
+            return pd.DataFrame(data, columns=columns)
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    # Reading one cursor's worth of documents as typed column chunks
+    def read_column_chunks(self, collection, query: dict, dtypes: dict, sort: list = None,
+                           label: str = "Batch") -> List[dict]:
+        try:
+            batch_size = self.data_ingestion_config.batch_size
+            cursor = collection.find(query, projection={"_id": 0}, batch_size=batch_size)
+            if sort:
+                cursor = cursor.sort(sort)
+
+            chunks = []
+            batch = []
+            start = time.perf_counter()
+            for document in cursor:
+                batch.append(document)
+                if len(batch) == batch_size:
+                    chunks.append(self.batch_to_column_chunks(batch, dtypes))
+                    start = self.log_batch_throughput(f"{label} {len(chunks)}", len(batch), start)
+                    batch = []
+            if batch:
+                chunks.append(self.batch_to_column_chunks(batch, dtypes))
+                self.log_batch_throughput(f"{label} {len(chunks)}", len(batch), start)
+            return chunks
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    # Reading DataFrame from MongoDB in batches
+    def export_collection_in_batches(self, query: dict = None) -> pd.DataFrame:
+        try:
+            database = self.data_ingestion_config.database_name
+            collection_name = self.data_ingestion_config.collection_name
+            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
+            collection = self.mongo_client[database][collection_name]
+
+            dtypes = self.get_schema_dtypes()
+            chunks = self.read_column_chunks(collection, query or {}, dtypes)
+
+            df = self.column_chunks_to_dataframe(chunks, list(dtypes.keys()))
+            logging.info(f"Exported {len(df)} rows from {database}.{collection_name} in {len(chunks)} batches")
+            return df
+
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    # Splitting the collection into contiguous _id ranges of roughly equal size
+    @staticmethod
+    def get_partition_queries(collection, num_partitions: int) -> List[dict]:
+        try:
+            total = collection.estimated_document_count()
+            boundaries = []
+            for i in range(1, num_partitions):
+                cursor = collection.find({}, projection={"_id": 1}).sort("_id", 1)
+                boundary = next(iter(cursor.skip(total * i // num_partitions).limit(1)), None)
+                if boundary is not None and boundary["_id"] not in boundaries:
+                    boundaries.append(boundary["_id"])
+
+            edges = [None] + boundaries + [None]
+            queries = []
+            for lower, upper in zip(edges[:-1], edges[1:]):
+                id_range = {}
+                if lower is not None:
+                    id_range["$gte"] = lower
+                if upper is not None:
+                    id_range["$lt"] = upper
+                queries.append({"_id": id_range} if id_range else {})
+            return queries
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    # Reading DataFrame from MongoDB with concurrent range-partitioned cursors
+    def export_collection_in_partitions(self) -> pd.DataFrame:
+        try:
+            database = self.data_ingestion_config.database_name
+            collection_name = self.data_ingestion_config.collection_name
+            num_partitions = self.data_ingestion_config.num_partitions
+            pool_size = self.data_ingestion_config.max_pool_size
+            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL, maxPoolSize=pool_size)
+            collection = self.mongo_client[database][collection_name]
+
+            dtypes = self.get_schema_dtypes()
+            queries = self.get_partition_queries(collection, num_partitions)
+            logging.info(f"Reading {len(queries)} partitions with {pool_size} workers")
+
+            def read_partition(index: int, query: dict):
+                start = time.perf_counter()
+                chunks = self.read_column_chunks(
+                    collection, query, dtypes, sort=[("_id", 1)], label=f"Partition {index} batch"
+                )
+                rows = sum(len(next(iter(chunk.values()))) for chunk in chunks)
+                return chunks, {"rows": rows, "seconds": round(time.perf_counter() - start, 6)}
+
+            with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                futures = [executor.submit(read_partition, i, query) for i, query in enumerate(queries)]
+                results = [future.result() for future in futures]
+
+            # Concatenating in partition order keeps the export deterministic
+            chunks = [chunk for partition_chunks, _ in results for chunk in partition_chunks]
+            self.partition_timings = {f"partition_{i}": timing for i, (_, timing) in enumerate(results)}
+
+            df = self.column_chunks_to_dataframe(chunks, list(dtypes.keys()))
+            logging.info(f"Exported {len(df)} rows from {database}.{collection_name}: {self.partition_timings}")
+            return df
+
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    # Cheap description of the collection's current contents, for the stage cache
+    def source_fingerprint(self) -> dict:
+        try:
+            database = self.data_ingestion_config.database_name
+            collection_name = self.data_ingestion_config.collection_name
+            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
+            collection = self.mongo_client[database][collection_name]
+            latest = next(iter(collection.find({}, projection={DATA_INGESTION_INGESTED_AT_FIELD: 1})
+                               .sort(DATA_INGESTION_INGESTED_AT_FIELD, -1).limit(1)), None)
+            return {
+                "database": database,
+                "collection": collection_name,
+                "documents": collection.estimated_document_count(),
+                "latest_ingested_at": str(latest.get(DATA_INGESTION_INGESTED_AT_FIELD)) if latest else None,
+            }
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    @staticmethod
+    def log_batch_throughput(label: str, rows: int, start: float) -> float:
+        now = time.perf_counter()
+        elapsed = max(now - start, 1e-9)
+        logging.info(f"{label}: {rows} rows in {elapsed:.3f}s ({rows / elapsed:.0f} rows/sec)")
+        return now
+
     # Exporting Data into Feature Store
     def export_data_into_feature_store(self, dataframe: pd.DataFrame):
         try:
             feature_store_file_path = self.data_ingestion_config.feature_store_file_path
-            # Creating folder
-            dir_path = os.path.dirname(feature_store_file_path)
-            os.makedirs(dir_path, exist_ok=True)
-            dataframe.to_csv(feature_store_file_path, index=False, header=True)  # Fixed method name
+            write_dataframe(feature_store_file_path, dataframe)
             return dataframe
         except Exception as e:
             raise WebShieldException(e, sys)
@@ -68,32 +249,196 @@ class DataIngestion:
             logging.info("Performed train-test split on the DataFrame.")
             logging.info("Exiting split_data_into_train_test method of the DataIngestion class.")
 
-            dir_path = os.path.dirname(self.data_ingestion_config.training_file_path)
-            os.makedirs(dir_path, exist_ok=True)
-
             logging.info("Exporting train and test file paths.")
 
-            train_set.to_csv(
-                self.data_ingestion_config.training_file_path, index=False, header=True
-            )
-            test_set.to_csv(
-                self.data_ingestion_config.testing_file_path, index=False, header=True
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(write_dataframe,
+                                  [self.data_ingestion_config.training_file_path, self.data_ingestion_config.testing_file_path],
+                                  [train_set, test_set]))
+
+            logging.info(f"Exported train-test {self.data_ingestion_config.file_format} files.")
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    # Reading the watermark left by the previous incremental run
+    def read_watermark(self):
+        try:
+            watermark_file_path = self.data_ingestion_config.watermark_file_path
+            if not os.path.exists(watermark_file_path):
+                return None
+            watermark = read_yaml_file(watermark_file_path)
+            if watermark["field"] != self.data_ingestion_config.watermark_field:
+                raise Exception(f"Watermark at {watermark_file_path} tracks {watermark['field']}, "
+                                f"not {self.data_ingestion_config.watermark_field}")
+            if watermark["type"] == "ObjectId":
+                return ObjectId(watermark["value"])
+            return watermark["value"]
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    def incremental_store_paths(self) -> List[str]:
+        config = self.data_ingestion_config
+        return [config.incremental_feature_store_file_path, config.incremental_training_file_path,
+                config.incremental_testing_file_path]
+
+    @staticmethod
+    def store_state(file_path: str):
+        """What a store holds at commit time: its part files, or the size of an appended CSV."""
+        if os.path.isdir(file_path):
+            return [os.path.basename(part_path) for part_path in dataframe_part_paths(file_path)]
+        return os.path.getsize(file_path) if os.path.exists(file_path) else None
+
+    def write_watermark(self, value) -> None:
+        """
+        Commits the watermark together with the state of every store, through a temporary file and a
+        rename, so a crash leaves either the previous commit or this one.
+        """
+        try:
+            watermark_file_path = self.data_ingestion_config.watermark_file_path
+            write_yaml_file(
+                file_path=f"{watermark_file_path}.tmp",
+                content={
+                    "field": self.data_ingestion_config.watermark_field,
+                    "type": type(value).__name__,
+                    "value": str(value) if isinstance(value, ObjectId) else value,
+                    "stores": {file_path: self.store_state(file_path) for file_path in self.incremental_store_paths()},
+                },
+                replace=True,
             )
+            os.replace(f"{watermark_file_path}.tmp", watermark_file_path)
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    def rollback_uncommitted_rows(self) -> None:
+        """
+        Drops rows a crashed run appended after the last committed watermark: part files it does not list
+        are deleted and CSVs are truncated to their committed size. Without a watermark nothing was
+        committed, so the stores are removed and rebuilt from a full export.
+        """
+        try:
+            watermark_file_path = self.data_ingestion_config.watermark_file_path
+            watermark = read_yaml_file(watermark_file_path) if os.path.exists(watermark_file_path) else {"stores": {}}
+            if "stores" not in watermark:
+                return
+            for file_path in self.incremental_store_paths():
+                committed = watermark["stores"].get(file_path)
+                if committed is None:
+                    if os.path.isdir(file_path):
+                        shutil.rmtree(file_path)
+                    elif os.path.exists(file_path):
+                        os.remove(file_path)
+                elif isinstance(committed, list):
+                    for part_path in dataframe_part_paths(file_path):
+                        if os.path.basename(part_path) not in committed:
+                            logging.info(f"Removing uncommitted part {part_path}")
+                            os.remove(part_path)
+                elif os.path.getsize(file_path) > committed:
+                    logging.info(f"Truncating uncommitted rows from {file_path}")
+                    with open(file_path, "r+b") as file:
+                        file.truncate(committed)
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    # Reading only the documents added since the last watermark
+    def export_new_documents(self):
+        try:
+            database = self.data_ingestion_config.database_name
+            collection_name = self.data_ingestion_config.collection_name
+            field = self.data_ingestion_config.watermark_field
+            self.mongo_client = pymongo.MongoClient(MONGO_DB_URL)
+            collection = self.mongo_client[database][collection_name]
+
+            watermark = self.read_watermark()
+            query = {field: {"$gt": watermark}} if watermark is not None else {}
+
+            # Pin the upper bound first so documents inserted during the export wait for the next run
+            latest = next(iter(collection.find(query, projection={field: 1}).sort(field, -1).limit(1)), None)
+            dtypes = self.get_schema_dtypes()
+            if latest is None:
+                logging.info(f"No new documents in {database}.{collection_name} after watermark {watermark}")
+                return self.column_chunks_to_dataframe([], list(dtypes.keys())), watermark
+
+            upper = latest[field]
+            if isinstance(upper, datetime) and self.data_ingestion_config.watermark_lag_seconds > 0:
+                # Concurrent loaders commit out of stamp order, so stay a safety lag behind the clock
+                # (naive UTC, as pymongo returns the stamps)
+                now = datetime.now(timezone.utc).replace(tzinfo=None)
+                upper = min(upper, now - timedelta(seconds=self.data_ingestion_config.watermark_lag_seconds))
+                if watermark is not None and upper <= watermark:
+                    logging.info(f"No documents in {database}.{collection_name} older than the watermark lag yet")
+                    return self.column_chunks_to_dataframe([], list(dtypes.keys())), watermark
 
-            logging.info("Exported train-test CSV files.")
+            query = {field: {**query.get(field, {}), "$lte": upper}}
+            chunks = self.read_column_chunks(collection, query, dtypes)
+            df = self.column_chunks_to_dataframe(chunks, list(dtypes.keys()))
+            logging.info(f"Exported {len(df)} new rows from {database}.{collection_name} "
+                         f"({field} {watermark} -> {upper})")
+            return df, upper
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    # Assigning rows to train/test from a hash of their content so earlier rows never move
+    def hash_split(self, dataframe: pd.DataFrame):
+        try:
+            buckets = pd.util.hash_pandas_object(dataframe.astype(np.float64), index=False).to_numpy() % 10000
+            is_test = buckets < int(self.data_ingestion_config.train_test_split_ratio * 10000)
+            return dataframe[~is_test], dataframe[is_test]
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    # Appending the delta to the persistent feature store and train/test files
+    def ingest_incrementally(self) -> None:
+        try:
+            config = self.data_ingestion_config
+            self.rollback_uncommitted_rows()
+            dataframe, watermark = self.export_new_documents()
+
+            train_set, test_set = self.hash_split(dataframe)
+            append_dataframe(config.incremental_feature_store_file_path, dataframe)
+            append_dataframe(config.incremental_training_file_path, train_set)
+            append_dataframe(config.incremental_testing_file_path, test_set)
+            logging.info(f"Appended {len(train_set)} train and {len(test_set)} test rows to the incremental store")
+
+            # The delta only counts once the watermark that lists it is committed
+            if watermark is not None:
+                self.write_watermark(watermark)
+
+            for source, destination in [
+                (config.incremental_feature_store_file_path, config.feature_store_file_path),
+                (config.incremental_training_file_path, config.training_file_path),
+                (config.incremental_testing_file_path, config.testing_file_path),
+            ]:
+                copy_dataframe(source, destination)
         except Exception as e:
             raise WebShieldException(e, sys)
 
     # Initiating Data Ingestion
     def intiate_data_ingestion(self):
         try:
-            dataframe = self.export_collection_as_dataframe()
-            dataframe = self.export_data_into_feature_store(dataframe)  # Fixed method call
-            self.split_data_into_train_test_split(dataframe)
+            if self.data_ingestion_config.incremental:
+                self.ingest_incrementally()
+                return DataIngestionArtifact(
+                    trained_file_path=self.data_ingestion_config.training_file_path,
+                    test_file_path=self.data_ingestion_config.testing_file_path,
+                    partition_timings=self.partition_timings,
+                )
+
+            if self.data_ingestion_config.export_mode == "streaming":
+                dataframe = self.export_collection_in_batches()
+            elif self.data_ingestion_config.export_mode == "partitioned":
+                dataframe = self.export_collection_in_partitions()
+            else:
+                dataframe = self.export_collection_as_dataframe()
+            # The feature store is written while the split runs; both only read the dataframe
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                feature_store = executor.submit(self.export_data_into_feature_store, dataframe)
+                self.split_data_into_train_test_split(dataframe)
+                feature_store.result()
 
             dataingestionartifact = DataIngestionArtifact(
                 trained_file_path=self.data_ingestion_config.training_file_path,
-                test_file_path=self.data_ingestion_config.testing_file_path  # Fixed typo in attribute name
+                test_file_path=self.data_ingestion_config.testing_file_path,  # Fixed typo in attribute name
+                partition_timings=self.partition_timings,
             )
 
             return dataingestionartifact
@@ -1,12 +1,13 @@
 import sys
 import os
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from sklearn.impute import KNNImputer
 from sklearn.pipeline import Pipeline
 
 from websecurity.constant.training_pipeline import TARGET_COLUMN
 from websecurity.constant.training_pipeline import DATA_TRANSFORMATION_IMPUTER_PARAMS
+from websecurity.utils.ml_utils.model.imputer import DiscreteNeighborImputer
 
 from websecurity.entity.artifact_entity import (
     DataTransformationArtifact,
@@ -16,7 +17,7 @@ from websecurity.entity.artifact_entity import (
 from websecurity.entity.config_entity import DataTransformationConfig
 from websecurity.exception.exception import WebShieldException
 from websecurity.logging.logger import logging
-from websecurity.utils.main_utils.utils import save_numpy_array_data, save_object
+from websecurity.utils.main_utils.utils import save_numpy_array_data, save_object, read_dataframe
 
 
 class DataTransformation:
@@ -31,15 +32,20 @@ class DataTransformation:
     @staticmethod
     def read_data(file_path) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return read_dataframe(file_path)
         except Exception as e:
             raise WebShieldException(e, sys)
 
     def get_data_transformer_object(self) -> Pipeline:  # Fixed method signature
         logging.info("Entered get_data_transformer_object method of DataTransformation class")
         try:
-            imputer: KNNImputer = KNNImputer(**DATA_TRANSFORMATION_IMPUTER_PARAMS)
-            logging.info(f"Initialized KNNImputer with {DATA_TRANSFORMATION_IMPUTER_PARAMS}")
+            imputer_params = dict(DATA_TRANSFORMATION_IMPUTER_PARAMS)
+            algorithm = imputer_params.pop("algorithm", "knn")
+            if algorithm == "knn":
+                imputer = KNNImputer(**imputer_params)
+            else:
+                imputer = DiscreteNeighborImputer(algorithm=algorithm, **imputer_params)
+            logging.info(f"Initialized {type(imputer).__name__} with {DATA_TRANSFORMATION_IMPUTER_PARAMS}")
             processor: Pipeline = Pipeline([("imputer", imputer)])
             return processor
         except Exception as e:
@@ -53,36 +59,48 @@ class DataTransformation:
             test_df = DataTransformation.read_data(self.data_validation_artifact.valid_test_file_path)
 
             # Training dataframe
-            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN], axis=1)
+            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN])
             target_feature_train_df = train_df[TARGET_COLUMN]
             target_feature_train_df = target_feature_train_df.replace(-1, 0)
 
             # Testing dataframe
-            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN], axis=1)
+            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN])
             target_feature_test_df = test_df[TARGET_COLUMN]
             target_feature_test_df = target_feature_test_df.replace(-1, 0)
 
             preprocessor = self.get_data_transformer_object()
 
             preprocessor_object = preprocessor.fit(input_feature_train_df)
-            transformed_input_train_feature = preprocessor_object.transform(input_feature_train_df)
-            transformed_input_test_feature = preprocessor_object.transform(input_feature_test_df)
-
-            train_arr = np.c_[transformed_input_train_feature, np.array(target_feature_train_df)]
-            test_arr = np.c_[transformed_input_test_feature, np.array(target_feature_test_df)]
-
-            # Save numpy array data
-            save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, array=train_arr)
-            save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, array=test_arr)
-            save_object(self.data_transformation_config.transformed_object_file_path, preprocessor_object)
-
-            save_object("final_model/preprocessor.pkl", preprocessor_object)
+            config = self.data_transformation_config
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                # Train and test are transformed concurrently, then every array is written concurrently
+                transformed_input_train_feature, transformed_input_test_feature = executor.map(
+                    preprocessor_object.transform, [input_feature_train_df, input_feature_test_df]
+                )
+
+                writes = [
+                    # Split layout: features and target as separate C-contiguous arrays for zero-copy loading
+                    executor.submit(save_numpy_array_data, config.transformed_train_features_file_path,
+                                    transformed_input_train_feature, config.feature_dtype),
+                    executor.submit(save_numpy_array_data, config.transformed_train_target_file_path,
+                                    target_feature_train_df.to_numpy(), config.target_dtype),
+                    executor.submit(save_numpy_array_data, config.transformed_test_features_file_path,
+                                    transformed_input_test_feature, config.feature_dtype),
+                    executor.submit(save_numpy_array_data, config.transformed_test_target_file_path,
+                                    target_feature_test_df.to_numpy(), config.target_dtype),
+                    # Published to final_model/ together with the model by the trainer
+                    executor.submit(save_object, config.transformed_object_file_path, preprocessor_object),
+                ]
+                for write in writes:
+                    write.result()
 
             # Preparing artifacts
             data_transformation_artifact = DataTransformationArtifact(
                 transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
-                transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
-                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path
+                transformed_train_features_file_path=config.transformed_train_features_file_path,
+                transformed_train_target_file_path=config.transformed_train_target_file_path,
+                transformed_test_features_file_path=config.transformed_test_features_file_path,
+                transformed_test_target_file_path=config.transformed_test_target_file_path,
             )
             return data_transformation_artifact
 
@@ -4,7 +4,10 @@ from websecurity.constant.training_pipeline import SCHEMA_FILE_PATH
 from websecurity.exception.exception import WebShieldException
 from websecurity.logging.logger import logging
 from websecurity.utils.main_utils.utils import read_yaml_file,write_yaml_file
-from scipy.stats import ks_2samp
+from websecurity.utils.main_utils.utils import read_dataframe,write_dataframe
+from websecurity.utils.main_utils.utils import read_dataframe_columns,iter_dataframe_chunks,DataFrameChunkWriter
+from websecurity.utils.ml_utils.metric.drift_metric import drift_p_values,accumulated_drift_p_values,HistogramAccumulator
+import numpy as np
 import pandas as pd
 import os
 import sys
@@ -23,13 +26,13 @@ class DataValidation:
     @staticmethod
     def read_data(file_path)->pd.DataFrame :
         try:
-            return(pd.read_csv(file_path ))
+            return read_dataframe(file_path)
         except Exception as e:
             raise WebShieldException(e,sys)
         
     def validate_number_of_columns(self,dataframe:pd.DataFrame)->bool:
         try:
-            no_of_columns=len(self.schema_config)
+            no_of_columns=len(self.schema_config["columns"])
             logging.info(f"Required no of columns is equal to {no_of_columns}")
             logging.info(f"Dataframe has columns{len(dataframe.columns)}")
             if len(dataframe.columns)==no_of_columns:
@@ -41,7 +44,7 @@ class DataValidation:
     def validate_number_of_numerical_columns(self, dataframe: pd.DataFrame) -> bool:
    
         try:
-            numerical_columns = len(self.schema_config)
+            numerical_columns = len(self.schema_config["numerical_columns"])
             numerical_columns_in_dataframe = dataframe.select_dtypes(include=["number"]).shape[1]
 
             logging.info(f"Expected number of numerical columns: {numerical_columns}")
@@ -55,21 +58,18 @@ class DataValidation:
         except Exception as e:
             raise WebShieldException(e,sys)
 
-    def detect_dataset_drift(self,base_df,current_df,threshold=0.05)->bool:
+    def write_drift_report(self,p_values:dict,threshold=0.05)->bool:
         try:
             status=True
             report={}
-            for column in base_df.columns:
-                d1=base_df[column]
-                d2=current_df[column]
-                is_same_dist=ks_2samp(d1,d2)
-                if threshold<=is_same_dist.pvalue:
+            for column,p_value in p_values.items():
+                if threshold<=p_value:
                     is_found=False
                 else:
                     is_found=True
                     status=False
                 report.update({column:{
-                    "p_value":float(is_same_dist.pvalue),
+                    "p_value":float(p_value),
                     "drift_status":is_found
                     
                     }})
@@ -79,20 +79,167 @@ class DataValidation:
             dir_path = os.path.dirname(drift_report_file_path)
             os.makedirs(dir_path,exist_ok=True)
             write_yaml_file(file_path=drift_report_file_path,content=report)
+            return status
+
+        except Exception as e:
+            raise WebShieldException(e,sys)
+
+    def detect_dataset_drift(self,base_df,current_df,threshold=0.05)->bool:
+        try:
+            p_values=drift_p_values(
+                base_df,current_df,
+                metric=self.data_validation_config.drift_metric,
+                max_categories=self.data_validation_config.drift_max_categories,
+            )
+            return self.write_drift_report(p_values,threshold)
+        except Exception as e:
+            raise WebShieldException(e,sys)
+
+    def get_schema_dtypes(self)->dict:
+        try:
+            dtypes={}
+            for column in self.schema_config["columns"]:
+                dtypes.update({name:np.dtype(dtype) for name,dtype in column.items()})
+            return dtypes
+        except Exception as e:
+            raise WebShieldException(e,sys)
+
+    @staticmethod
+    def split_valid_rows(chunk:pd.DataFrame,dtypes:dict):
+        """
+        Checks every cell of a chunk against the schema dtypes. Missing values are allowed (the imputer
+        fills them); anything non-numeric, fractional for an integer column or out of the dtype's range
+        is invalid. Returns (numeric values of the chunk, per-cell invalid mask).
+        """
+        try:
+            columns=list(dtypes.keys())
+            coerced={}
+            for column in columns:
+                raw=chunk[column]
+                if not pd.api.types.is_numeric_dtype(raw):
+                    coerced[column]=pd.to_numeric(raw.replace({"na":np.nan}),errors="coerce")
+            frame=chunk[columns].replace({"na":np.nan}) if coerced else chunk[columns]
+            missing=frame.isna().to_numpy()
+            values=frame.assign(**coerced).to_numpy(dtype=np.float64)
 
+            invalid=~missing & np.isnan(values)
+            with np.errstate(invalid="ignore"):
+                for index,dtype in enumerate(dtypes.values()):
+                    if dtype.kind in "iu":
+                        info=np.iinfo(dtype)
+                        column_values=values[:,index]
+                        invalid[:,index]|=(column_values!=np.round(column_values))|(column_values<info.min)|(column_values>info.max)
+            invalid&=~missing
+            return values,invalid
         except Exception as e:
             raise WebShieldException(e,sys)
+
+    @staticmethod
+    def to_schema_frame(values,dtypes:dict)->pd.DataFrame:
+        # Nullable integer columns keep a stable int8 file schema across chunks while allowing missing values
+        frame={}
+        for index,(column,dtype) in enumerate(dtypes.items()):
+            if dtype.kind in "iu":
+                nullable_dtype=f"{'U' if dtype.kind=='u' else ''}Int{dtype.itemsize*8}"
+                frame[column]=pd.Series(values[:,index]).astype(nullable_dtype)
+            else:
+                frame[column]=pd.Series(values[:,index].astype(dtype))
+        return pd.DataFrame(frame)
+
+    def validate_file_in_chunks(self,file_path:str,valid_file_path:str,invalid_file_path:str,
+                                histograms:HistogramAccumulator)->dict:
+        """
+        Streams file_path in fixed-size chunks, routing rows that match the schema to valid_file_path
+        and the rest to invalid_file_path, and adds the valid rows to the drift histograms. Columns may
+        come in any order; valid_file_path is always written in schema order, empty if no row is valid.
+        """
+        try:
+            dtypes=self.get_schema_dtypes()
+            columns=list(dtypes.keys())
+            header=read_dataframe_columns(file_path)
+            summary={"header_valid":set(header)==set(columns),"valid_rows":0,"invalid_rows":0,
+                     "invalid_cells":{column:0 for column in columns}}
+            if not summary["header_valid"]:
+                missing=[column for column in columns if column not in header]
+                unexpected=[column for column in header if column not in columns]
+                logging.info(f"{file_path} header does not match schema: missing {missing}, unexpected {unexpected}")
+
+            with DataFrameChunkWriter(valid_file_path) as valid_writer, \
+                    DataFrameChunkWriter(invalid_file_path) as invalid_writer:
+                for chunk in iter_dataframe_chunks(file_path,self.data_validation_config.chunk_size):
+                    if not summary["header_valid"]:
+                        invalid_writer.write(chunk.astype(str))
+                        summary["invalid_rows"]+=len(chunk)
+                        continue
+
+                    chunk=chunk[columns]
+                    values,invalid=self.split_valid_rows(chunk,dtypes)
+                    invalid_rows=invalid.any(axis=1)
+                    for column,count in zip(columns,invalid.sum(axis=0)):
+                        summary["invalid_cells"][column]+=int(count)
+
+                    valid_values=values[~invalid_rows]
+                    histograms.update(valid_values)
+                    valid_writer.write(self.to_schema_frame(valid_values,dtypes))
+                    if invalid_rows.any():
+                        invalid_writer.write(chunk[invalid_rows].astype(str))
+                    summary["valid_rows"]+=int((~invalid_rows).sum())
+                    summary["invalid_rows"]+=int(invalid_rows.sum())
+                if valid_writer.rows==0:
+                    valid_writer.write(self.to_schema_frame(np.empty((0,len(columns))),dtypes))
+
+            logging.info(f"Validated {file_path}: {summary['valid_rows']} valid rows, {summary['invalid_rows']} invalid rows")
+            return summary
+        except Exception as e:
+            raise WebShieldException(e,sys)
+
+    def initiate_chunked_data_validation(self)->DataValidationArtifact:
+        try:
+            config=self.data_validation_config
+            columns=list(self.get_schema_dtypes().keys())
+            train_histograms=HistogramAccumulator(columns)
+            test_histograms=HistogramAccumulator(columns)
+
+            train_summary=self.validate_file_in_chunks(
+                self.data_ingestion_artifact.trained_file_path,config.valid_train_file_path,
+                config.invalid_train_file_path,train_histograms)
+            test_summary=self.validate_file_in_chunks(
+                self.data_ingestion_artifact.test_file_path,config.valid_test_file_path,
+                config.invalid_test_file_path,test_histograms)
+            write_yaml_file(file_path=config.invalid_report_file_path,
+                            content={"train":train_summary,"test":test_summary},replace=True)
+
+            ## drift from the histograms gathered in the same pass
+            p_values=accumulated_drift_p_values(train_histograms,test_histograms,metric=config.drift_metric)
+            drift_status=self.write_drift_report(p_values)
+            status=drift_status and train_summary["header_valid"] and test_summary["header_valid"]
+
+            data_validation_artifact = DataValidationArtifact(
+                validation_report_status=status,
+                valid_train_file_path=config.valid_train_file_path,
+                valid_test_file_path=config.valid_test_file_path,
+                invalid_train_file_path=config.invalid_train_file_path if train_summary["invalid_rows"] else None,
+                invalid_test_file_path=config.invalid_test_file_path if test_summary["invalid_rows"] else None,
+                drift_report_file_path=config.drift_report_file_path,
+            )
+            return data_validation_artifact
+        except Exception as e:
+            raise WebShieldException(e,sys)
+
     def initiate_data_validation(self)->DataValidationArtifact:
         try:
-            train_file_path=self.data_ingestion_artifact.training_file_path
-            test_file_path=self.data_ingestion_artifact.testing_file_path
+            if self.data_validation_config.validation_mode=="chunked":
+                return self.initiate_chunked_data_validation()
+
+            train_file_path=self.data_ingestion_artifact.trained_file_path
+            test_file_path=self.data_ingestion_artifact.test_file_path
 
             ## read the data from train and test
             train_dataframe=DataValidation.read_data(train_file_path)
             test_dataframe=DataValidation.read_data(test_file_path)
             
             ## validate number of columns
-
+            error_message=""
             status=self.validate_number_of_columns(dataframe=train_dataframe)
             if not status:
                 error_message=f"Train dataframe does not contain all columns.\n"
@@ -108,22 +255,13 @@ class DataValidation:
 
             ## lets check datadrift
             status=self.detect_dataset_drift(base_df=train_dataframe,current_df=test_dataframe)
-            dir_path=os.path.dirname(self.data_validation_config.valid_train_file_path)
-            os.makedirs(dir_path,exist_ok=True)
-
-            train_dataframe.to_csv(
-                self.data_validation_config.valid_train_file_path, index=False, header=True
-
-            )
-
-            test_dataframe.to_csv(
-                self.data_validation_config.valid_test_file_path, index=False, header=True
-            )
+            write_dataframe(self.data_validation_config.valid_train_file_path, train_dataframe)
+            write_dataframe(self.data_validation_config.valid_test_file_path, test_dataframe)
             
             data_validation_artifact = DataValidationArtifact(
                 validation_report_status=status,
-                valid_train_file_path=self.data_ingestion_artifact.training_file_path,
-                valid_test_file_path=self.data_ingestion_artifact.testing_file_path,
+                valid_train_file_path=self.data_validation_config.valid_train_file_path,
+                valid_test_file_path=self.data_validation_config.valid_test_file_path,
                 invalid_train_file_path=None,
                 invalid_test_file_path=None,
                 drift_report_file_path=self.data_validation_config.drift_report_file_path,
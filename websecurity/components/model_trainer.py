@@ -8,17 +8,28 @@ from websecurity.entity.config_entity import ModelTrainerConfig
 
 from websecurity.utils.ml_utils.model.estimator import NetworkModel
 from websecurity.utils.main_utils.utils import save_object, load_object
+from websecurity.utils.main_utils.model_registry import publish_model_version
+from websecurity.constant.training_pipeline import (
+    MODEL_FILE_NAME, FINAL_MODEL_PREPROCESSOR_FILE_NAME, MODEL_TRAINER_COMPILED_MODEL_FILE_NAME,
+    MODEL_TRAINER_LOOKUP_MODEL_FILE_NAME
+)
 from websecurity.utils.main_utils.utils import load_numpy_array_data, evaluate_models
 from websecurity.utils.ml_utils.metric.classification_metric import get_classification_score
-
-from sklearn.linear_model import LogisticRegression
+from websecurity.utils.ml_utils.model.compiled_tree import compile_tree_model, calibrate_batch_limit
+from websecurity.utils.ml_utils.model.lookup_table import build_lookup_model, unseen_rows
+from websecurity.utils.ml_utils.model.incremental import fit_incremental, predict_in_chunks
+from websecurity.utils.ml_utils.tracking.mlflow_tracker import get_tracker
+
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import r2_score
+from sklearn.naive_bayes import GaussianNB
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.ensemble import (
     AdaBoostClassifier,
     GradientBoostingClassifier,
     RandomForestClassifier,
 )
-import mlflow
+import numpy as np
 
 class ModelTrainer:
     def __init__(self, model_trainer_config: ModelTrainerConfig, data_transformation_artifact: DataTransformationArtifact):
@@ -28,25 +39,21 @@ class ModelTrainer:
         except Exception as e:
             raise WebShieldException(e, sys)
 
-    def track_mlflow(self, model_name, model, classification_metric, stage, input_example=None):  
+    def track_mlflow(self, model_name, model, train_metric, test_metric, input_example=None):
+        """Queues one MLflow run with the train and test metrics and the model; does not wait for it."""
         try:
-            with mlflow.start_run():
-                # Log metrics
-                mlflow.log_metric(f"{stage}_f1_score", classification_metric.f1_score)
-                mlflow.log_metric(f"{stage}_precision", classification_metric.precision_score)
-                mlflow.log_metric(f"{stage}_recall", classification_metric.recall_score)
-
-                # Log the model with input_example
-                mlflow.sklearn.log_model(
-                    sk_model=model,
-                    artifact_path=model_name,
-                    registered_model_name=f"{model_name}_{stage}",
-                    input_example=input_example,  
-                )
+            metrics = {}
+            for stage, classification_metric in (("train", train_metric), ("test", test_metric)):
+                metrics[f"{stage}_f1_score"] = classification_metric.f1_score
+                metrics[f"{stage}_precision"] = classification_metric.precision_score
+                metrics[f"{stage}_recall"] = classification_metric.recall_score
+            get_tracker().log_training_run(model_name, model, metrics, params=model.get_params(),
+                                           input_example=input_example)
         except Exception as e:
             raise WebShieldException(e, sys)
 
-    def train_model(self, X_train, y_train, X_test, y_test):
+    @staticmethod
+    def get_search_space():
         models = {
             "Random Forest": RandomForestClassifier(verbose=1),  
             "Decision Tree": DecisionTreeClassifier(),
@@ -79,43 +86,99 @@ class ModelTrainer:
                 'n_estimators': [8, 16, 32, 64, 128, 256],
             }
         }
+        return models, params
+
+    @staticmethod
+    def get_incremental_models():
+        """Models that can be fitted one chunk at a time, through partial_fit or warm_start."""
+        return {
+            "SGD Classifier": SGDClassifier(loss="log_loss"),
+            "Gaussian Naive Bayes": GaussianNB(),
+            "Random Forest": RandomForestClassifier(),
+            "Gradient Boosting": GradientBoostingClassifier(),
+        }
+
+    def select_incremental_model(self, X_train, y_train, X_test, y_test):
+        """
+        Fits every incremental model over the training chunks and keeps the one with the best test score,
+        scored like evaluate_models. Neither split is ever loaded whole.
+        """
+        config = self.model_trainer_config
+        models = self.get_incremental_models()
+        model_report = {}
+        for model_name, model in models.items():
+            fit_incremental(model, X_train, y_train, chunk_size=config.chunk_size,
+                            epochs=config.incremental_epochs, trees_per_chunk=config.trees_per_chunk)
+            model_report[model_name] = r2_score(y_test, predict_in_chunks(model, X_test, config.chunk_size))
+            logging.info(f"{model_name} test score: {model_report[model_name]}")
+        best_model_name = max(model_report, key=model_report.get)
+        return best_model_name, models[best_model_name]
+
+    def select_model(self, X_train, y_train, X_test, y_test):
+        models, params = self.get_search_space()
 
         # Evaluate models and get the best one
         model_report: dict = evaluate_models(
             X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test,
-            models=models, params=params)
+            models=models, params=params,
+            n_jobs=self.model_trainer_config.search_n_jobs,
+            cache_dir=self.model_trainer_config.search_cache_dir,
+            strategy=self.model_trainer_config.search_strategy,
+            budget=self.model_trainer_config.search_budget,
+            resource=self.model_trainer_config.halving_resource,
+            factor=self.model_trainer_config.halving_factor)
         best_model_score = max(sorted(model_report.values()))
         best_model_name = list(model_report.keys())[
             list(model_report.values()).index(best_model_score)
         ]
-        best_model = models[best_model_name]
+        return best_model_name, models[best_model_name]
+
+    def train_model(self, X_train, y_train, X_test, y_test):
+        incremental = self.model_trainer_config.mode == "incremental"
+        if incremental:
+            best_model_name, best_model = self.select_incremental_model(X_train, y_train, X_test, y_test)
+        else:
+            best_model_name, best_model = self.select_model(X_train, y_train, X_test, y_test)
+        chunk_size = self.model_trainer_config.chunk_size
 
         # Get training metrics
-        y_train_pred = best_model.predict(X_train)
+        y_train_pred = predict_in_chunks(best_model, X_train, chunk_size)
         classification_train_metric = get_classification_score(y_true=y_train, y_pred=y_train_pred)
 
-        # Track training metrics with MLflow
-        input_example = X_train[:1]  # Used a small subset of X_train for input_example
-        self.track_mlflow(best_model_name, best_model, classification_train_metric, "train", input_example=input_example)
-
         # Get testing metrics
-        y_test_pred = best_model.predict(X_test)
+        y_test_pred = predict_in_chunks(best_model, X_test, chunk_size)
         classification_test_metric = get_classification_score(y_true=y_test, y_pred=y_test_pred)
 
-        # Track testing metrics with MLflow
-        self.track_mlflow(best_model_name, best_model, classification_test_metric, "test", input_example=input_example)
+        # Logged in the background while the model is compiled, saved and published
+        input_example = np.array(X_train[:1])  # Used a small subset of X_train for input_example
+        self.track_mlflow(best_model_name, best_model, classification_train_metric, classification_test_metric,
+                          input_example=input_example)
 
         # Save the preprocessor and model
         preprocessor = load_object(file_path=self.data_transformation_artifact.transformed_object_file_path)
         model_dir_path = os.path.dirname(self.model_trainer_config.trained_model_file_path)
         os.makedirs(model_dir_path, exist_ok=True)
 
+        compiled_model = self.compile_model(best_model, X_test)
+        # Out of core, a hashed table is built from half of the test split and checked on the other half
+        if incremental:
+            table_rows, check_rows = X_test[:len(X_test) // 2], X_test[len(X_test) // 2:]
+        else:
+            table_rows, check_rows = X_train, X_test
+        lookup_model = self.build_lookup_model(best_model, table_rows, check_rows)
+
         # Wrap preprocessor and model into a NetworkModel
-        Network_Model = NetworkModel(preprocessor=preprocessor, model=best_model)
+        Network_Model = NetworkModel(preprocessor=preprocessor, model=best_model, fast_model=compiled_model,
+                                     lookup_model=lookup_model)
         save_object(self.model_trainer_config.trained_model_file_path, obj=Network_Model)
 
-        # Save the standalone model for deployment
-        save_object("final_model/model.pkl", best_model)
+        # Publish everything serving loads as one version, so it never mixes files from two runs
+        publish_model_version(self.model_trainer_config.final_model_dir, {
+            FINAL_MODEL_PREPROCESSOR_FILE_NAME: preprocessor,
+            MODEL_FILE_NAME: best_model,
+            MODEL_TRAINER_COMPILED_MODEL_FILE_NAME: compiled_model,
+            MODEL_TRAINER_LOOKUP_MODEL_FILE_NAME: lookup_model,
+        }, keep_versions=self.model_trainer_config.keep_model_versions)
 
         # Return ModelTrainerArtifact
         model_trainer_artifact = ModelTrainerArtifact(
@@ -126,21 +189,64 @@ class ModelTrainer:
         logging.info(f"Model trainer artifact: {model_trainer_artifact}")
         return model_trainer_artifact
 
-    def initiate_model_trainer(self) -> ModelTrainerArtifact:
+    def compile_model(self, model, X_test):
+        """Array-backed copy of the chosen tree model, used only if it reproduces the test predictions exactly."""
         try:
-            train_file_path = self.data_transformation_artifact.transformed_train_file_path
-            test_file_path = self.data_transformation_artifact.transformed_test_file_path
-
-            # Load numpy array data
-            train_arr = load_numpy_array_data(train_file_path)
-            test_arr = load_numpy_array_data(test_file_path)
-
-            X_train, y_train, X_test, y_test = (
-                train_arr[:, :-1],
-                train_arr[:, -1],
-                test_arr[:, :-1],
-                test_arr[:, -1],
+            if not self.model_trainer_config.compile_model:
+                return None
+            compiled_model = compile_tree_model(model)
+            if compiled_model is None:
+                return None
+            if not np.array_equal(compiled_model.predict(X_test), model.predict(X_test)):
+                logging.info(f"Compiled {type(model).__name__} disagrees with sklearn on the test set, not using it")
+                return None
+            compiled_model.max_batch_rows = calibrate_batch_limit(compiled_model, model, X_test)
+            if compiled_model.max_batch_rows == 0:
+                logging.info(f"Compiled {type(model).__name__} is slower than sklearn at every batch size, not using it")
+                return None
+            logging.info(f"Compiled {type(model).__name__} into {compiled_model.n_trees} trees, "
+                         f"{len(compiled_model.feature)} nodes, used for batches up to {compiled_model.max_batch_rows} rows")
+            return compiled_model
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    def build_lookup_model(self, model, X_train, X_test):
+        """
+        Lookup table of the chosen model built from X_train, used only if table + fallback reproduce the
+        model's predictions exactly on X_test and on rows the table has no entry for.
+        """
+        try:
+            if not self.model_trainer_config.lookup_model:
+                return None
+            lookup_model = build_lookup_model(
+                model, X_train,
+                max_dense_entries=self.model_trainer_config.lookup_max_dense_entries,
+                max_hashed_entries=self.model_trainer_config.lookup_max_hashed_entries,
             )
+            if lookup_model is None:
+                return None
+            # X_test may be fully covered by the table, so unseen rows make sure the fallback is exercised
+            X_test = np.asarray(X_test)
+            check_rows = np.concatenate([X_test, unseen_rows(lookup_model).astype(X_test.dtype)])
+            if not np.array_equal(lookup_model.predict(check_rows, fallback=model.predict), model.predict(check_rows)):
+                logging.info(f"Lookup table disagrees with {type(model).__name__} on the test set, not using it")
+                return None
+            _, found = lookup_model.lookup(X_test)
+            logging.info(f"Lookup table answers {found.mean():.2%} of the test split directly")
+            return lookup_model
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    def initiate_model_trainer(self) -> ModelTrainerArtifact:
+        try:
+            artifact = self.data_transformation_artifact
+            mmap_mode = self.model_trainer_config.mmap_mode
+
+            # Memory-mapped, C-contiguous arrays are handed to sklearn without extra copies
+            X_train = load_numpy_array_data(artifact.transformed_train_features_file_path, mmap_mode=mmap_mode)
+            y_train = load_numpy_array_data(artifact.transformed_train_target_file_path, mmap_mode=mmap_mode)
+            X_test = load_numpy_array_data(artifact.transformed_test_features_file_path, mmap_mode=mmap_mode)
+            y_test = load_numpy_array_data(artifact.transformed_test_target_file_path, mmap_mode=mmap_mode)
 
             model = self.train_model(X_train, y_train, X_test, y_test)
             return model
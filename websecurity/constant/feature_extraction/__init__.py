@@ -0,0 +1,46 @@
+import os
+
+"""
+URL feature extraction related constant start with FEATURE_EXTRACTION VAR NAME
+"""
+# Features computed from the URL string alone
+FEATURE_EXTRACTION_LEXICAL_FEATURES: tuple = (
+    "having_IP_Address", "URL_Length", "Shortining_Service", "having_At_Symbol", "double_slash_redirecting",
+    "Prefix_Suffix", "having_Sub_Domain", "SSLfinal_State", "port", "HTTPS_token",
+)
+# Features that need DNS, WHOIS, the page itself or ranking services; left missing unless a provider resolves them.
+# SSLfinal_State is lexical for plain http URLs (-1) and needs the certificate for https ones.
+FEATURE_EXTRACTION_NETWORK_FEATURES: tuple = (
+    "SSLfinal_State", "Domain_registeration_length", "Favicon", "Request_URL", "URL_of_Anchor", "Links_in_tags",
+    "SFH", "Submitting_to_email", "Abnormal_URL", "Redirect", "on_mouseover", "RightClick", "popUpWidnow",
+    "Iframe", "age_of_domain", "DNSRecord", "web_traffic", "Page_Rank", "Google_Index", "Links_pointing_to_page",
+    "Statistical_report",
+)
+
+# URL_Length: shorter than the first bound is legitimate, up to the second suspicious, longer phishing
+FEATURE_EXTRACTION_URL_LENGTH_BOUNDS: tuple = (54, 75)
+FEATURE_EXTRACTION_DEFAULT_PORTS: dict = {"http": "80", "https": "443"}
+FEATURE_EXTRACTION_SHORTENER_DOMAINS: tuple = (
+    "bit.ly", "bitly.com", "goo.gl", "tinyurl.com", "ow.ly", "t.co", "is.gd", "v.gd", "buff.ly", "adf.ly",
+    "bit.do", "cutt.ly", "shorturl.at", "rebrand.ly", "tiny.cc", "lnkd.in", "db.tt", "qr.ae", "rb.gy", "t.ly",
+    "x.co", "po.st", "soo.gd", "s2r.co", "clicky.me", "budurl.com", "tr.im", "cli.gs", "snipurl.com",
+    "short.to", "ping.fm", "post.ly", "just.as", "bkite.com", "snipr.com", "fic.kr", "loopt.us", "doiop.com",
+    "twitthis.com", "su.pr", "tweez.me", "migre.me", "om.ly", "to.ly", "yourls.org", "prettylinkpro.com",
+    "scrnch.me", "filoops.info", "vzturl.com", "qr.net", "1url.com", "lnk.to", "shorte.st",
+    "ouo.io", "zpr.io", "u.to", "j.mp", "tiny.pl", "wp.me", "youtu.be", "amzn.to", "fb.me", "ift.tt",
+)
+FEATURE_EXTRACTION_CHUNK_SIZE: int = 100000
+
+# Enrichment of network-dependent features, looked up once per registered domain
+FEATURE_EXTRACTION_ENRICHMENT_CACHE_FILE_PATH: str = os.path.join("enrichment_cache", "enrichment.sqlite")
+FEATURE_EXTRACTION_ENRICHMENT_TTL_SECONDS: float = 7 * 24 * 3600.0
+FEATURE_EXTRACTION_ENRICHMENT_TIMEOUT_SECONDS: float = 2.0
+FEATURE_EXTRACTION_ENRICHMENT_MAX_CONCURRENCY: int = 32
+# Results kept in process memory per provider, in front of the on-disk cache
+FEATURE_EXTRACTION_ENRICHMENT_MEMORY_ENTRIES: int = 1000000
+# Public suffixes of two labels, so that e.g. example.co.uk (not co.uk) is the registered domain
+FEATURE_EXTRACTION_MULTI_LABEL_SUFFIXES: tuple = (
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "com.au", "net.au", "org.au", "co.nz", "co.za", "co.in",
+    "co.jp", "ne.jp", "or.jp", "com.br", "com.cn", "com.mx", "com.tr", "com.sg", "com.hk", "com.tw", "co.kr",
+    "com.ar", "com.co", "com.my", "com.ph", "com.pk", "com.ng", "com.ua", "com.vn",
+)
@@ -0,0 +1,40 @@
+import os
+
+"""
+Prediction service related constant start with SERVING VAR NAME
+"""
+SERVING_MODEL_DIR: str = "final_model"
+SERVING_MODEL_FILE_NAME: str = "model.pkl"
+SERVING_PREPROCESSOR_FILE_NAME: str = "preprocessor.pkl"
+SERVING_COMPILED_MODEL_FILE_NAME: str = "compiled_model.pkl"
+SERVING_LOOKUP_MODEL_FILE_NAME: str = "lookup_model.pkl"
+SERVING_MAX_WORKERS: int = os.cpu_count() or 1
+SERVING_STREAM_CHUNK_SIZE: int = 10000
+SERVING_PREDICTION_COLUMN: str = "prediction"
+SERVING_HOST: str = "0.0.0.0"
+SERVING_PORT: int = 8000
+# Worker processes forked after the parent has loaded the model, so they share its arrays copy-on-write;
+# 1 serves from a single process
+SERVING_WORKERS: int = 1
+# Crashed workers are replaced after an exponential backoff; the server gives up after too many crashes in a window
+SERVING_RESPAWN_BACKOFF_SECONDS: float = 0.5
+SERVING_RESPAWN_MAX_BACKOFF_SECONDS: float = 30.0
+SERVING_MAX_WORKER_CRASHES: int = 5
+SERVING_WORKER_CRASH_WINDOW_SECONDS: float = 60.0
+SERVING_PREFORK_POLL_SECONDS: float = 0.2
+
+# Polling for a newly published model version; 0 disables hot reload
+SERVING_RELOAD_INTERVAL_SECONDS: float = 5.0
+SERVING_WARMUP_ROWS: int = 256
+
+# Micro-batching of concurrent /predict requests
+SERVING_MICRO_BATCHING: bool = True
+SERVING_MAX_BATCH_SIZE: int = 256
+SERVING_MAX_WAIT_MS: float = 2.0
+SERVING_MAX_QUEUE_SIZE: int = 10000
+SERVING_METRICS_WINDOW: int = 10000
+
+# In-process prediction cache keyed by the packed feature vector
+SERVING_CACHE_ENABLED: bool = True
+SERVING_CACHE_MAX_ENTRIES: int = 100000
+SERVING_CACHE_TTL_SECONDS: float = 3600.0
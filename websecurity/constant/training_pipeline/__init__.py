@@ -8,6 +8,14 @@ PIPELINE_NAME = "Web Shield"
 ARTIFACT_DIR = "Artifacts"
 FILE_NAME = "phisingData.csv"
 
+# Stage artifacts are reused across runs by fingerprint; each run records its completed stages
+STAGE_CACHE_DIR_NAME: str = "stage_cache"
+STAGE_CACHE_DIGEST_FILE_NAME: str = "digests.json"
+RUN_STATE_FILE_NAME: str = "run_state.json"
+RUN_SUMMARY_FILE_NAME: str = "run_summary.json"
+PIPELINE_MAX_CONCURRENT_STAGES: int = 4
+PIPELINE_RSS_SAMPLE_INTERVAL_SECONDS: float = 0.05
+
 TRAIN_FILE_NAME : str = "train.csv"
 TEST_FILE_NAME : str = "test.csv"
 
@@ -16,12 +24,42 @@ SCHEMA_FILE_PATH = os.path.join("data_schema", "schema.yaml")
 SAVED_MODEL_DIR =os.path.join("saved_models")
 MODEL_FILE_NAME = "model.pkl"
 
+# Deployed objects are written as a directory: a protocol-5 pickle plus its large numpy buffers in
+# a separate .npy file that load_object memory-maps
+MODEL_ARTIFACT_OUT_OF_BAND: bool = True
+MODEL_ARTIFACT_MIN_BUFFER_BYTES: int = 65536
+MODEL_ARTIFACT_MANIFEST_FILE_NAME: str = "manifest.json"
+MODEL_ARTIFACT_OBJECT_FILE_NAME: str = "object.pkl"
+MODEL_ARTIFACT_BUFFER_FILE_NAME: str = "buffers.npy"
+
+# Each training run publishes final_model/versions/<version>/ and then flips final_model/CURRENT to it
+FINAL_MODEL_DIR: str = "final_model"
+FINAL_MODEL_VERSIONS_DIR: str = "versions"
+FINAL_MODEL_CURRENT_FILE_NAME: str = "CURRENT"
+FINAL_MODEL_KEEP_VERSIONS: int = 3
+FINAL_MODEL_PREPROCESSOR_FILE_NAME: str = "preprocessor.pkl"
+
 DATA_INGESTION_COLLECTION_NAME : str = "WebData"
 DATA_INGESTION_DATABASE_NAME : str ="Ishant"
 DATA_INGESTION_DIR_NAME : str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR : str = "feature store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATION: float = 0.2
+DATA_INGESTION_EXPORT_MODE: str = "streaming"  # "full", "streaming" or "partitioned"
+DATA_INGESTION_BATCH_SIZE: int = 10000
+DATA_INGESTION_NUM_PARTITIONS: int = 8
+DATA_INGESTION_MAX_POOL_SIZE: int = 8
+DATA_INGESTION_INCREMENTAL: bool = False
+# push_data.py stamps every document when it is first inserted; its _id is a hash of the row
+DATA_INGESTION_INGESTED_AT_FIELD: str = "ingested_at"
+DATA_INGESTION_WATERMARK_FIELD: str = DATA_INGESTION_INGESTED_AT_FIELD
+DATA_INGESTION_WATERMARK_FILE_NAME: str = "watermark.yaml"
+# Stamps younger than this are left for the next run: a write stamped earlier may still be committing
+DATA_INGESTION_WATERMARK_LAG_SECONDS: float = 60.0
+DATA_INGESTION_FILE_FORMAT: str = "parquet"  # "csv", "parquet" or "feather"
+DATA_INGESTION_LOAD_CHUNK_SIZE: int = 100000
+DATA_INGESTION_LOAD_BATCH_SIZE: int = 5000
+DATA_INGESTION_LOAD_WORKERS: int = 8
 
 
 DATA_VALIDATION_DIR_NAME : str = "data_validation"
@@ -29,6 +67,12 @@ DATA_VALIDATION_VALID_DIR : str = "validated"
 DATA_VALIDATION_INVALID_DIR : str = "invalid"
 DATA_VALIDATION_DRIFT_REPORT_DIR : str = "drift report"
 DATA_VALIDATION_DRIFT_REPORT_FILE_NAME : str = "report.yml"
+DATA_VALIDATION_FILE_FORMAT: str = "parquet"  # "csv", "parquet" or "feather"
+DATA_VALIDATION_DRIFT_METRIC: str = "ks"  # "ks" or "chi2"
+DATA_VALIDATION_DRIFT_MAX_CATEGORIES: int = 32
+DATA_VALIDATION_MODE: str = "chunked"  # "in_memory" or "chunked"
+DATA_VALIDATION_CHUNK_SIZE: int = 50000
+DATA_VALIDATION_INVALID_REPORT_FILE_NAME: str = "invalid_rows.yml"
 PREPROCESSING_OBJECT_FILE_NAME:str="preprocessing.pkl"
 
 DATA_TRANSFORMATION_DIR_NAME : str = "data transformation"
@@ -39,12 +83,22 @@ DATA_TRANSFORMATION_IMPUTER_PARAMS :dict={
     "missing_values":np.nan,
     "n_neighbors":3,
     "weights":"uniform",
+    # "knn" (sklearn KNNImputer), "hash_lookup" or "blocked_knn" (DiscreteNeighborImputer)
+    "algorithm":"knn",
 }
 
 DATA_TRANSFORMATION_TRAIN_FILE_PATH: str = "train.npy"
 
 DATA_TRANSFORMATION_TEST_FILE_PATH: str = "test.npy"
 
+# Separate C-contiguous feature/target arrays that the trainer memory-maps
+DATA_TRANSFORMATION_TRAIN_FEATURES_FILE_NAME: str = "train_features.npy"
+DATA_TRANSFORMATION_TRAIN_TARGET_FILE_NAME: str = "train_target.npy"
+DATA_TRANSFORMATION_TEST_FEATURES_FILE_NAME: str = "test_features.npy"
+DATA_TRANSFORMATION_TEST_TARGET_FILE_NAME: str = "test_target.npy"
+DATA_TRANSFORMATION_FEATURE_DTYPE: str = "float32"
+DATA_TRANSFORMATION_TARGET_DTYPE: str = "int8"
+
 
 
 MODEL_TRAINER_DIR_NAME: str = "model_trainer"
@@ -52,5 +106,29 @@ MODEL_TRAINER_TRAINED_MODEL_DIR: str = "trained_model"
 MODEL_TRAINER_TRAINED_MODEL_NAME: str = "model.pkl"
 MODEL_TRAINER_EXPECTED_SCORE: float = 0.6
 MODEL_TRAINER_OVER_FITTING_UNDER_FITTING_THRESHOLD: float = 0.05
+MODEL_TRAINER_MMAP_MODE: str = "r"
+MODEL_TRAINER_SEARCH_N_JOBS: int = -1
+MODEL_TRAINER_SEARCH_CACHE_DIR: str = "search_cache"
+MODEL_TRAINER_SEARCH_STRATEGY: str = "exhaustive"  # "exhaustive", "randomized" or "halving"
+MODEL_TRAINER_SEARCH_BUDGET: int = 20  # candidates per model for "randomized"
+MODEL_TRAINER_HALVING_RESOURCE: str = "n_samples"  # "n_samples" or "n_estimators"
+MODEL_TRAINER_HALVING_FACTOR: int = 3
+# Export tree ensembles to flat NumPy arrays for low-latency prediction
+MODEL_TRAINER_COMPILE_MODEL: bool = True
+MODEL_TRAINER_COMPILED_MODEL_FILE_NAME: str = "compiled_model.pkl"
+# Tabulate the model over the features it uses when the table stays small
+MODEL_TRAINER_LOOKUP_MODEL: bool = True
+MODEL_TRAINER_LOOKUP_MAX_DENSE_ENTRIES: int = 3 ** 13
+MODEL_TRAINER_LOOKUP_MAX_HASHED_ENTRIES: int = 1000000
+MODEL_TRAINER_LOOKUP_MODEL_FILE_NAME: str = "lookup_model.pkl"
+# MLflow runs are logged in the background; unreachable servers fall back to a local SQLite store
+MODEL_TRAINER_MLFLOW_FALLBACK_DIR: str = "mlruns"
+MODEL_TRAINER_MLFLOW_FLUSH_TIMEOUT_SECONDS: float = 60.0
+MODEL_TRAINER_MLFLOW_CONNECT_TIMEOUT_SECONDS: float = 3.0
+# "incremental" fits partial_fit / warm-start models chunk by chunk over the memory-mapped arrays
+MODEL_TRAINER_MODE: str = "in_memory"  # "in_memory" or "incremental"
+MODEL_TRAINER_CHUNK_SIZE: int = 50000
+MODEL_TRAINER_INCREMENTAL_EPOCHS: int = 5  # passes over the data for partial_fit models
+MODEL_TRAINER_TREES_PER_CHUNK: int = 16  # trees added per chunk for warm-started ensembles
 
 TRAINING_BUCKET_NAME = "websecurity"
\ No newline at end of file
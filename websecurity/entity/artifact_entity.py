@@ -1,10 +1,11 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
 class DataIngestionArtifact:
     trained_file_path:str
     test_file_path:str
+    partition_timings:dict=field(default_factory=dict)
 
 @dataclass
 class DataValidationArtifact:
@@ -17,9 +18,11 @@ class DataValidationArtifact:
 
 @dataclass
 class DataTransformationArtifact:
-    transformed_train_file_path:str
-    transformed_test_file_path:str
     transformed_object_file_path:str
+    transformed_train_features_file_path:str
+    transformed_train_target_file_path:str
+    transformed_test_features_file_path:str
+    transformed_test_target_file_path:str
 
 @dataclass
 class ClassificationMetricArtifact:
@@ -7,8 +7,9 @@ class TrainingPipelineConfig:
     """
     Configuration class for the training pipeline.
     """
-    def __init__(self, timestamp: datetime = datetime.now()):
-        formatted_timestamp = timestamp.strftime("%M_%d_%Y_%H_%M_%S")
+    def __init__(self, timestamp: datetime = datetime.now(), run_name: str = None):
+        # run_name reopens an existing run directory, e.g. to resume it
+        formatted_timestamp = run_name or timestamp.strftime("%M_%d_%Y_%H_%M_%S")
         self.pipeline_name: str = training_pipeline.PIPELINE_NAME
         self.artifact_name: str = training_pipeline.ARTIFACT_DIR
         self.artifact_dir: str = os.path.join(self.artifact_name, formatted_timestamp)
@@ -20,24 +21,55 @@ class DataIngestionConfig:
     Configuration class for the data ingestion component.
     """
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
+        self.file_format: str = training_pipeline.DATA_INGESTION_FILE_FORMAT
+        file_name: str = training_pipeline.FILE_NAME.replace("csv", self.file_format)
+        train_file_name: str = training_pipeline.TRAIN_FILE_NAME.replace("csv", self.file_format)
+        test_file_name: str = training_pipeline.TEST_FILE_NAME.replace("csv", self.file_format)
         self.data_ingestion_dir: str = os.path.join(
             training_pipeline_config.artifact_dir, training_pipeline.DATA_INGESTION_DIR_NAME
         )
         self.feature_store_file_path: str = os.path.join(
-            self.data_ingestion_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, training_pipeline.FILE_NAME
+            self.data_ingestion_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, file_name
         )
         self.training_file_path: str = os.path.join(
-            self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, training_pipeline.TRAIN_FILE_NAME
+            self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, train_file_name
         )
         self.testing_file_path: str = os.path.join(
-            self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, training_pipeline.TEST_FILE_NAME
+            self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, test_file_name
         )
         self.train_test_split_ratio: float = training_pipeline.DATA_INGESTION_TRAIN_TEST_SPLIT_RATION
         self.collection_name: str = training_pipeline.DATA_INGESTION_COLLECTION_NAME
         self.database_name: str = training_pipeline.DATA_INGESTION_DATABASE_NAME
+        self.export_mode: str = training_pipeline.DATA_INGESTION_EXPORT_MODE
+        self.batch_size: int = training_pipeline.DATA_INGESTION_BATCH_SIZE
+        self.num_partitions: int = training_pipeline.DATA_INGESTION_NUM_PARTITIONS
+        self.max_pool_size: int = training_pipeline.DATA_INGESTION_MAX_POOL_SIZE
+        # Incremental mode keeps its feature store outside the timestamped run directory
+        self.incremental: bool = training_pipeline.DATA_INGESTION_INCREMENTAL
+        self.watermark_field: str = training_pipeline.DATA_INGESTION_WATERMARK_FIELD
+        self.watermark_lag_seconds: float = training_pipeline.DATA_INGESTION_WATERMARK_LAG_SECONDS
+        self.incremental_dir: str = os.path.join(
+            training_pipeline_config.artifact_name, training_pipeline.DATA_INGESTION_DIR_NAME
+        )
+        self.incremental_feature_store_file_path: str = os.path.join(
+            self.incremental_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, file_name
+        )
+        self.watermark_file_path: str = os.path.join(
+            self.incremental_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR,
+            training_pipeline.DATA_INGESTION_WATERMARK_FILE_NAME
+        )
+        self.incremental_training_file_path: str = os.path.join(
+            self.incremental_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, train_file_name
+        )
+        self.incremental_testing_file_path: str = os.path.join(
+            self.incremental_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, test_file_name
+        )
 
 class DataValidationConfig:
     def __init__(self,training_pipeline_config: TrainingPipelineConfig):
+        self.file_format : str = training_pipeline.DATA_VALIDATION_FILE_FORMAT
+        train_file_name : str = training_pipeline.TRAIN_FILE_NAME.replace("csv", self.file_format)
+        test_file_name : str = training_pipeline.TEST_FILE_NAME.replace("csv", self.file_format)
         self.data_validation_dir : str =os.path.join(
             training_pipeline_config.artifact_dir,training_pipeline.DATA_VALIDATION_DIR_NAME
         )
@@ -48,32 +80,45 @@ class DataValidationConfig:
             self.data_validation_dir,training_pipeline.DATA_VALIDATION_INVALID_DIR
         )
         self.valid_train_file_path : str =os.path.join(
-            self.valid_data_dir,training_pipeline.TRAIN_FILE_NAME
+            self.valid_data_dir,train_file_name
         )
         self.valid_test_file_path : str =os.path.join(
-            self.valid_data_dir,training_pipeline.TEST_FILE_NAME
+            self.valid_data_dir,test_file_name
         )
         self.invalid_train_file_path : str = os.path.join(
-            self.invalid_data_dir,training_pipeline.TRAIN_FILE_NAME
+            self.invalid_data_dir,train_file_name
         )
         self.invalid_test_file_path : str = os.path.join(
-            self.invalid_data_dir,training_pipeline.TEST_FILE_NAME
+            self.invalid_data_dir,test_file_name
         )
         self.drift_report_file_path: str= os.path.join(
             self.data_validation_dir,
             training_pipeline.DATA_VALIDATION_DRIFT_REPORT_DIR,
             training_pipeline.DATA_VALIDATION_DRIFT_REPORT_FILE_NAME
         )
+        self.drift_metric: str = training_pipeline.DATA_VALIDATION_DRIFT_METRIC
+        self.drift_max_categories: int = training_pipeline.DATA_VALIDATION_DRIFT_MAX_CATEGORIES
+        self.validation_mode: str = training_pipeline.DATA_VALIDATION_MODE
+        self.chunk_size: int = training_pipeline.DATA_VALIDATION_CHUNK_SIZE
+        self.invalid_report_file_path: str = os.path.join(
+            self.invalid_data_dir,training_pipeline.DATA_VALIDATION_INVALID_REPORT_FILE_NAME
+        )
 
 class DataTransformationConfig:
      def __init__(self,training_pipeline_config:TrainingPipelineConfig):
         self.data_transformation_dir: str = os.path.join( training_pipeline_config.artifact_dir,training_pipeline.DATA_TRANSFORMATION_DIR_NAME )
-        self.transformed_train_file_path : str = os.path.join( self.data_transformation_dir,training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-            training_pipeline.TRAIN_FILE_NAME.replace("csv", "npy"),)
-        self.transformed_test_file_path : str = os.path.join(self.data_transformation_dir,  training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-            training_pipeline.TEST_FILE_NAME.replace("csv", "npy"), )
         self.transformed_object_file_path : str = os.path.join( self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
             training_pipeline.PREPROCESSING_OBJECT_FILE_NAME,)
+        self.transformed_train_features_file_path : str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+            training_pipeline.DATA_TRANSFORMATION_TRAIN_FEATURES_FILE_NAME)
+        self.transformed_train_target_file_path : str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+            training_pipeline.DATA_TRANSFORMATION_TRAIN_TARGET_FILE_NAME)
+        self.transformed_test_features_file_path : str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+            training_pipeline.DATA_TRANSFORMATION_TEST_FEATURES_FILE_NAME)
+        self.transformed_test_target_file_path : str = os.path.join(self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+            training_pipeline.DATA_TRANSFORMATION_TEST_TARGET_FILE_NAME)
+        self.feature_dtype : str = training_pipeline.DATA_TRANSFORMATION_FEATURE_DTYPE
+        self.target_dtype : str = training_pipeline.DATA_TRANSFORMATION_TARGET_DTYPE
         
 class ModelTrainerConfig:
     def __init__(self,training_pipeline_config:TrainingPipelineConfig):
@@ -84,4 +129,26 @@ class ModelTrainerConfig:
             self.model_trainer_dir,training_pipeline.MODEL_TRAINER_TRAINED_MODEL_DIR,training_pipeline.MODEL_FILE_NAME
         )
         self.expected_accuracy:float=training_pipeline.MODEL_TRAINER_EXPECTED_SCORE
-        self.overfitting_underfitting_threshold:float=training_pipeline.MODEL_TRAINER_OVER_FITTING_UNDER_FITTING_THRESHOLD 
\ No newline at end of file
+        self.overfitting_underfitting_threshold:float=training_pipeline.MODEL_TRAINER_OVER_FITTING_UNDER_FITTING_THRESHOLD
+        self.mmap_mode:str=training_pipeline.MODEL_TRAINER_MMAP_MODE
+        self.search_n_jobs:int=training_pipeline.MODEL_TRAINER_SEARCH_N_JOBS
+        # Fold scores are cached across runs, keyed by dataset fingerprint
+        self.search_cache_dir:str=os.path.join(
+            training_pipeline_config.artifact_name,training_pipeline.MODEL_TRAINER_DIR_NAME,
+            training_pipeline.MODEL_TRAINER_SEARCH_CACHE_DIR
+        )
+        self.search_strategy:str=training_pipeline.MODEL_TRAINER_SEARCH_STRATEGY
+        self.search_budget:int=training_pipeline.MODEL_TRAINER_SEARCH_BUDGET
+        self.halving_resource:str=training_pipeline.MODEL_TRAINER_HALVING_RESOURCE
+        self.halving_factor:int=training_pipeline.MODEL_TRAINER_HALVING_FACTOR
+        self.compile_model:bool=training_pipeline.MODEL_TRAINER_COMPILE_MODEL
+        self.lookup_model:bool=training_pipeline.MODEL_TRAINER_LOOKUP_MODEL
+        self.lookup_max_dense_entries:int=training_pipeline.MODEL_TRAINER_LOOKUP_MAX_DENSE_ENTRIES
+        self.lookup_max_hashed_entries:int=training_pipeline.MODEL_TRAINER_LOOKUP_MAX_HASHED_ENTRIES
+        # Deployed models are published as versions under final_model_dir
+        self.final_model_dir:str=training_pipeline.FINAL_MODEL_DIR
+        self.keep_model_versions:int=training_pipeline.FINAL_MODEL_KEEP_VERSIONS
+        self.mode:str=training_pipeline.MODEL_TRAINER_MODE
+        self.chunk_size:int=training_pipeline.MODEL_TRAINER_CHUNK_SIZE
+        self.incremental_epochs:int=training_pipeline.MODEL_TRAINER_INCREMENTAL_EPOCHS
+        self.trees_per_chunk:int=training_pipeline.MODEL_TRAINER_TREES_PER_CHUNK 
\ No newline at end of file
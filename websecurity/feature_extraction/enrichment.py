@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import socket
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from websecurity.constant.feature_extraction import (
+    FEATURE_EXTRACTION_ENRICHMENT_CACHE_FILE_PATH, FEATURE_EXTRACTION_ENRICHMENT_TTL_SECONDS,
+    FEATURE_EXTRACTION_ENRICHMENT_TIMEOUT_SECONDS, FEATURE_EXTRACTION_ENRICHMENT_MAX_CONCURRENCY,
+    FEATURE_EXTRACTION_ENRICHMENT_MEMORY_ENTRIES, FEATURE_EXTRACTION_MULTI_LABEL_SUFFIXES
+)
+from websecurity.exception.exception import WebShieldException
+from websecurity.feature_extraction.providers import FeatureProvider
+from websecurity.feature_extraction.url_features import IP_HOST_PATTERN
+from websecurity.logging.logger import logging
+
+
+def registered_domains(hosts: pd.Series) -> pd.Series:
+    """
+    Registered domain of every host: the last two labels, or three under a two-label public suffix
+    (example.co.uk). IP addresses are kept whole. Worked out once per distinct host.
+    """
+    try:
+        codes, unique_hosts = pd.factorize(hosts.fillna(""))
+        unique_hosts = pa.array(np.asarray(unique_hosts, dtype=object), type=pa.string())
+        last_two = pc.struct_field(pc.extract_regex(unique_hosts, r"(?P<domain>[^.]+\.[^.]+)$"), "domain")
+        last_three = pc.struct_field(pc.extract_regex(unique_hosts, r"(?P<domain>[^.]+\.[^.]+\.[^.]+)$"), "domain")
+        under_suffix = pc.and_(pc.is_in(last_two, value_set=pa.array(FEATURE_EXTRACTION_MULTI_LABEL_SUFFIXES)),
+                               pc.is_valid(last_three))
+        domains = pc.coalesce(pc.if_else(under_suffix, last_three, last_two), unique_hosts)
+        domains = pc.if_else(pc.match_substring_regex(unique_hosts, IP_HOST_PATTERN), unique_hosts, domains)
+        return pd.Series(domains.to_numpy(zero_copy_only=False)[codes], index=hosts.index, dtype=object)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+class AsyncFeatureProvider(ABC):
+    """
+    Looks up network-dependent features for one registered domain at a time, e.g. over DNS, WHOIS or a
+    ranking API. At most max_concurrency lookups of a provider run at once and each is abandoned after
+    timeout_seconds; successful results are cached for ttl_seconds. lookup() returns {feature: -1|0|1},
+    leaving out or setting NaN for what it could not determine.
+    """
+    name: str = "provider"
+    features: Tuple[str, ...] = ()
+    max_concurrency: int = FEATURE_EXTRACTION_ENRICHMENT_MAX_CONCURRENCY
+    timeout_seconds: float = FEATURE_EXTRACTION_ENRICHMENT_TIMEOUT_SECONDS
+    ttl_seconds: float = FEATURE_EXTRACTION_ENRICHMENT_TTL_SECONDS
+
+    @abstractmethod
+    async def lookup(self, domain: str) -> Dict[str, float]:
+        """Features of one registered domain; raise to leave them all NaN and uncached."""
+
+
+class DNSRecordProvider(AsyncFeatureProvider):
+    """
+    DNSRecord: 1 when the domain resolves, -1 when the resolver says it doesn't exist (NXDOMAIN). Other
+    resolver failures (timeouts, SERVFAIL, no network) are raised, so they stay NaN and are retried.
+    """
+    name = "dns"
+    features = ("DNSRecord",)
+
+    async def lookup(self, domain: str) -> Dict[str, float]:
+        try:
+            await asyncio.get_running_loop().getaddrinfo(domain, None)
+            return {"DNSRecord": 1.0}
+        except socket.gaierror as e:
+            if e.errno == socket.EAI_NONAME:
+                return {"DNSRecord": -1.0}
+            raise
+
+
+class EnrichmentCache:
+    """
+    Lookup results in a SQLite file, keyed by provider and domain, each with its own expiry. WAL mode
+    lets several serving processes share the file; one connection per process is shared by its threads.
+    """
+    def __init__(self, file_path: str = FEATURE_EXTRACTION_ENRICHMENT_CACHE_FILE_PATH):
+        try:
+            self.file_path = file_path
+            if file_path != ":memory:":
+                os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            self.lock = threading.Lock()
+            self.connection = sqlite3.connect(file_path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS enrichment (provider TEXT NOT NULL, domain TEXT NOT NULL, "
+                "features TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (provider, domain))"
+            )
+            self.connection.commit()
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def get_many(self, provider: str, domains: Sequence[str]) -> Dict[str, Dict[str, float]]:
+        """Unexpired cached features of the given domains."""
+        try:
+            found = {}
+            now = time.time()
+            with self.lock:
+                # Bounded by SQLite's limit on bound parameters
+                for start in range(0, len(domains), 900):
+                    batch = list(domains[start:start + 900])
+                    rows = self.connection.execute(
+                        f"SELECT domain, features FROM enrichment WHERE provider = ? AND expires_at > ? "
+                        f"AND domain IN ({','.join('?' * len(batch))})", [provider, now, *batch]
+                    )
+                    found.update((domain, json.loads(features)) for domain, features in rows)
+            return found
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def put_many(self, provider: str, results: Dict[str, Dict[str, float]], ttl_seconds: float) -> None:
+        try:
+            expires_at = time.time() + ttl_seconds
+            with self.lock:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO enrichment (provider, domain, features, expires_at) VALUES (?, ?, ?, ?)",
+                    [(provider, domain, json.dumps(features), expires_at) for domain, features in results.items()]
+                )
+                self.connection.commit()
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def purge_expired(self) -> int:
+        with self.lock:
+            removed = self.connection.execute("DELETE FROM enrichment WHERE expires_at <= ?", [time.time()]).rowcount
+            self.connection.commit()
+        return removed
+
+
+class Enricher:
+    """
+    Resolves the features of a set of registered domains through every provider concurrently. Results
+    already in memory or in the on-disk cache are used as they are; the rest are looked up by
+    max_concurrency workers per provider. A lookup that times out or fails leaves its features NaN and
+    is not cached, so it is retried next time.
+    """
+    def __init__(self, providers: Sequence[AsyncFeatureProvider], cache: Optional[EnrichmentCache] = None,
+                 memory_entries: int = FEATURE_EXTRACTION_ENRICHMENT_MEMORY_ENTRIES):
+        self.providers = list(providers)
+        self.cache = cache
+        self.memory_entries = memory_entries
+        # provider name -> {domain: (features, expires_at)}
+        self.memory = {provider.name: {} for provider in self.providers}
+        self.stats = {"domains": 0, "cache_hits": 0, "lookups": 0, "timeouts": 0, "failures": 0}
+
+    @property
+    def features(self) -> List[str]:
+        return list(dict.fromkeys(feature for provider in self.providers for feature in provider.features))
+
+    async def lookup_all(self, provider: AsyncFeatureProvider, domains: Iterable[str]) -> Dict[str, Dict[str, float]]:
+        results = {}
+        pending = iter(domains)
+
+        async def worker():
+            # Workers share one iterator, so no more than max_concurrency lookups are ever in flight
+            for domain in pending:
+                self.stats["lookups"] += 1
+                try:
+                    results[domain] = await asyncio.wait_for(provider.lookup(domain), provider.timeout_seconds)
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                except Exception as e:
+                    self.stats["failures"] += 1
+                    logging.info(f"{provider.name} lookup of {domain} failed: {e}")
+
+        await asyncio.gather(*(worker() for _ in range(max(provider.max_concurrency, 1))))
+        return results
+
+    async def resolve_provider(self, provider: AsyncFeatureProvider, domains: List[str]) -> Dict[str, Dict[str, float]]:
+        memory, now = self.memory[provider.name], time.time()
+        remembered = {}
+        for domain in domains:
+            entry = memory.get(domain)
+            if entry is not None and entry[1] > now:
+                remembered[domain] = entry[0]
+        missing = [domain for domain in domains if domain not in remembered]
+        cached = self.cache.get_many(provider.name, missing) if self.cache is not None and missing else {}
+        self.stats["cache_hits"] += len(remembered) + len(cached)
+        looked_up = await self.lookup_all(provider, [domain for domain in missing if domain not in cached])
+        if self.cache is not None and looked_up:
+            self.cache.put_many(provider.name, looked_up, provider.ttl_seconds)
+
+        fresh = {**cached, **looked_up}
+        if len(memory) + len(fresh) > self.memory_entries:
+            # Simplest bound: start over, the disk cache still has everything
+            memory.clear()
+        # Disk entries keep their own expiry only on disk; in memory they get at most one provider TTL
+        expires_at = now + provider.ttl_seconds
+        memory.update((domain, (features, expires_at)) for domain, features in fresh.items())
+        return {**remembered, **fresh}
+
+    async def enrich(self, domains: Sequence[str]) -> pd.DataFrame:
+        """Features (columns) of every distinct domain (index); NaN where nothing could be resolved."""
+        try:
+            domains = list(dict.fromkeys(domain for domain in domains if domain))
+            self.stats["domains"] += len(domains)
+            frame = pd.DataFrame(np.nan, index=pd.Index(domains, dtype=object), columns=self.features, dtype=np.float32)
+            resolved = await asyncio.gather(*(self.resolve_provider(provider, domains) for provider in self.providers))
+            for provider, results in zip(self.providers, resolved):
+                for feature in provider.features:
+                    values = {domain: result.get(feature, np.nan) for domain, result in results.items()}
+                    frame[feature] = frame[feature].fillna(pd.Series(values, dtype=np.float32))
+            return frame
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+
+class EnrichmentProvider(FeatureProvider):
+    """
+    FeatureProvider for URLFeatureExtractor that enriches a chunk of URLs through an Enricher, with one
+    lookup per distinct registered domain. resolve() runs its own event loop, so call it from a thread
+    without one (the extractor already runs on the serving pool).
+    """
+    def __init__(self, providers: Sequence[AsyncFeatureProvider], cache: Optional[EnrichmentCache] = None):
+        self.enricher = Enricher(providers, cache)
+        self.features = tuple(self.enricher.features)
+
+    def resolve(self, parsed: pd.DataFrame) -> pd.DataFrame:
+        try:
+            domains = registered_domains(parsed["host"])
+            enriched = asyncio.run(self.enricher.enrich(domains.unique()))
+            return enriched.reindex(domains.to_numpy()).set_axis(parsed.index)
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
@@ -0,0 +1,52 @@
+import zlib
+import asyncio
+from typing import Dict, Optional, Sequence, Tuple
+
+from websecurity.feature_extraction.enrichment import AsyncFeatureProvider
+
+
+class FakeProvider(AsyncFeatureProvider):
+    """
+    Local stand-in for a network provider, for running the enrichment layer without network access.
+    Answers after latency_seconds with values derived from a hash of the domain, so repeated runs agree;
+    a slow_fraction of domains take slow_latency_seconds instead, to exercise the timeout. calls counts
+    the lookups actually made.
+    """
+    def __init__(self, name: str, features: Sequence[str], latency_seconds: float = 0.01,
+                 slow_fraction: float = 0.0, slow_latency_seconds: float = 60.0,
+                 values: Optional[Dict[str, Tuple[float, ...]]] = None, max_concurrency: Optional[int] = None,
+                 timeout_seconds: Optional[float] = None):
+        self.name = name
+        self.features = tuple(features)
+        self.latency_seconds = latency_seconds
+        self.slow_fraction = slow_fraction
+        self.slow_latency_seconds = slow_latency_seconds
+        self.values = values or {}
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        if timeout_seconds is not None:
+            self.timeout_seconds = timeout_seconds
+        self.calls = 0
+
+    async def lookup(self, domain: str) -> Dict[str, float]:
+        self.calls += 1
+        digest = zlib.crc32(f"{self.name}:{domain}".encode())
+        slow = (digest % 10000) / 10000 < self.slow_fraction
+        await asyncio.sleep(self.slow_latency_seconds if slow else self.latency_seconds)
+        values = {}
+        for index, feature in enumerate(self.features):
+            choices = self.values.get(feature, (-1.0, 1.0))
+            values[feature] = choices[(digest >> (4 * index + 8)) % len(choices)]
+        return values
+
+
+def fake_providers(latency_seconds: float = 0.01, slow_fraction: float = 0.0, **kwargs) -> list:
+    """Fake DNS, WHOIS and ranking providers covering the domain-level network features."""
+    return [
+        FakeProvider("dns", ("DNSRecord",), latency_seconds, slow_fraction, **kwargs),
+        FakeProvider("whois", ("Domain_registeration_length", "age_of_domain", "Abnormal_URL"),
+                     latency_seconds, slow_fraction, **kwargs),
+        FakeProvider("rank", ("web_traffic", "Page_Rank", "Google_Index", "Links_pointing_to_page"),
+                     latency_seconds, slow_fraction,
+                     values={"web_traffic": (-1.0, 0.0, 1.0), "Links_pointing_to_page": (-1.0, 0.0, 1.0)}, **kwargs),
+    ]
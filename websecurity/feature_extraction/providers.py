@@ -0,0 +1,21 @@
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+import pandas as pd
+
+
+class FeatureProvider(ABC):
+    """
+    Resolves network-dependent features (DNS, WHOIS, page content, ranking) for a batch of parsed URLs.
+
+    Subclasses list the schema columns they produce in `features` and implement resolve(). Values a
+    provider can't determine are returned as NaN and left for the imputer.
+    """
+    features: Tuple[str, ...] = ()
+
+    @abstractmethod
+    def resolve(self, parsed: pd.DataFrame) -> pd.DataFrame:
+        """
+        parsed is the output of parse_urls (url, scheme, host, port columns). Returns a frame with the
+        same index and one float column per name in `features`, holding -1, 0, 1 or NaN.
+        """
@@ -0,0 +1,222 @@
+import sys
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from websecurity.constant.feature_extraction import (
+    FEATURE_EXTRACTION_URL_LENGTH_BOUNDS, FEATURE_EXTRACTION_SHORTENER_DOMAINS, FEATURE_EXTRACTION_CHUNK_SIZE
+)
+from websecurity.exception.exception import WebShieldException
+from websecurity.feature_extraction.providers import FeatureProvider
+from websecurity.logging.logger import logging
+from websecurity.utils.main_utils.utils import get_feature_columns, iter_dataframe_chunks
+
+# RE2 patterns, only ever matched against whole Arrow arrays
+SCHEME_PATTERN = r"^[A-Za-z][A-Za-z0-9+.-]*://"
+IP_HOST_PATTERN = (r"^(?:(?:\d{1,3}|0x[0-9a-f]{1,2})(?:\.(?:\d{1,3}|0x[0-9a-f]{1,2})){3}"
+                   r"|0x[0-9a-f]+|\d+|\[[0-9a-f:.]+\])$")
+COUNTRY_CODE_PATTERN = r"\.[a-z]{2}$"
+# A "//" starting at character 7 or later comes after the scheme separator of even https://
+DOUBLE_SLASH_MIN_POSITION = 7
+
+
+def _positions(data: np.ndarray, values: bytes) -> np.ndarray:
+    """Sorted positions in data of any of the given byte values."""
+    mask = data == values[0]
+    for value in values[1:]:
+        mask |= data == value
+    return np.flatnonzero(mask)
+
+
+def _count_between(positions: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Per row, how many of the sorted positions fall in [start, end)."""
+    return np.searchsorted(positions, end) - np.searchsorted(positions, start)
+
+
+def _last_between(positions: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Per row, the last of the sorted positions in [start, end), or -1 if there is none."""
+    positions = np.concatenate([[-1], positions])
+    last = positions[np.searchsorted(positions, end) - 1]
+    return np.where(last >= start, last, -1)
+
+
+def _slice(data: np.ndarray, start: np.ndarray, end: np.ndarray) -> pa.Array:
+    """String array of data[start:end] for every row, built with a single gather."""
+    lengths = end - start
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    gather = np.repeat(start - offsets[:-1], lengths) + np.arange(offsets[-1])
+    return pa.LargeStringArray.from_buffers(len(lengths), pa.py_buffer(offsets), pa.py_buffer(data[gather]))
+
+
+class ParsedURLs:
+    """
+    Byte offsets of the scheme, host and port of every URL in a chunk, located by vectorized searches
+    over the positions of the delimiter bytes in the chunk's UTF-8 data rather than a regex per URL.
+    """
+    def __init__(self, urls: pa.Array):
+        # Null URLs become "" so every row has offsets
+        self.urls = pc.fill_null(pc.utf8_trim_whitespace(urls.cast(pa.large_string())), "")
+        _, offsets, data = self.urls.buffers()
+        offsets = np.frombuffer(offsets, dtype=np.int64)[self.urls.offset:self.urls.offset + len(self.urls) + 1]
+        # A trailing 0 byte keeps lookups one past the last URL in bounds
+        data = np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, dtype=np.uint8)
+        self.data = np.concatenate([data, np.zeros(1, dtype=np.uint8)])
+        self.start, self.end = offsets[:-1], offsets[1:]
+
+        has_scheme = pc.match_substring_regex(self.urls, SCHEME_PATTERN).to_numpy(zero_copy_only=False)
+        self.scheme_end = np.where(has_scheme, self.start + pc.find_substring(self.urls, "://").to_numpy(), self.start)
+        netloc_start = np.where(has_scheme, self.scheme_end + 3, self.start)
+        path_starts = np.concatenate([_positions(self.data, b"/?#\\"), [len(self.data)]])
+        self.netloc_end = np.minimum(path_starts[np.searchsorted(path_starts, netloc_start)], self.end)
+
+        # userinfo@host:port, where the port colon of a bracketed IPv6 host follows the "]"
+        self.at_signs = _positions(self.data, b"@")
+        last_at = _last_between(self.at_signs, netloc_start, self.netloc_end)
+        self.host_start = np.where(last_at >= 0, last_at + 1, netloc_start)
+        last_colon = _last_between(_positions(self.data, b":"), self.host_start, self.netloc_end)
+        bracketed = self.data[self.host_start] == ord("[")
+        has_port = (last_colon >= 0) & (~bracketed | (self.data[np.maximum(last_colon - 1, 0)] == ord("]")))
+        self.host_end = np.where(has_port, last_colon, self.netloc_end)
+        self.port_start = np.where(has_port, last_colon + 1, self.netloc_end)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    @property
+    def scheme(self) -> pa.Array:
+        return pc.ascii_lower(_slice(self.data, self.start, self.scheme_end))
+
+    @property
+    def host(self) -> pa.Array:
+        """Lowercase host without userinfo, port or trailing dot."""
+        return pc.utf8_rtrim(pc.utf8_lower(_slice(self.data, self.host_start, self.host_end)), ".")
+
+    @property
+    def port(self) -> pa.Array:
+        return _slice(self.data, self.port_start, self.netloc_end)
+
+    def double_slash_positions(self) -> np.ndarray:
+        slashes = self.data == ord("/")
+        return np.flatnonzero(slashes[:-1] & slashes[1:])
+
+    def to_frame(self, index: Optional[pd.Index] = None) -> pd.DataFrame:
+        frame = pd.DataFrame({"url": self.urls.to_pandas(), "scheme": self.scheme.to_pandas(),
+                              "host": self.host.to_pandas(), "port": self.port.to_pandas()})
+        return frame.set_axis(index) if index is not None else frame
+
+
+def parse_urls(urls) -> pd.DataFrame:
+    """url, lowercase scheme, host and port of every URL, indexed like urls when it is a Series."""
+    try:
+        index = urls.index if isinstance(urls, pd.Series) else None
+        return ParsedURLs(pa.array(urls, type=pa.string(), from_pandas=True)).to_frame(index)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def _phishing_if(condition) -> np.ndarray:
+    """-1 (phishing) where condition holds, 1 (legitimate) elsewhere."""
+    if isinstance(condition, (pa.Array, pa.ChunkedArray)):
+        condition = pc.fill_null(condition, False).to_numpy(zero_copy_only=False)
+    return np.where(condition, -1, 1).astype(np.float32)
+
+
+class URLFeatureExtractor:
+    """
+    Computes the schema features of raw URLs in chunks of chunk_size rows, with no Python work per URL.
+    The URL-derived features follow the rules the dataset was built with (1 legitimate, 0 suspicious,
+    -1 phishing); features that need the network are NaN, for the imputer to fill, unless one of the
+    providers resolves them.
+    """
+    def __init__(self, feature_columns: Optional[List[str]] = None, providers: Sequence[FeatureProvider] = (),
+                 shortener_domains: Sequence[str] = FEATURE_EXTRACTION_SHORTENER_DOMAINS,
+                 chunk_size: int = FEATURE_EXTRACTION_CHUNK_SIZE):
+        try:
+            self.feature_columns = list(feature_columns) if feature_columns is not None else get_feature_columns()
+            self.providers = list(providers)
+            self.shortener_domains = pa.array(sorted(set(domain.lower() for domain in shortener_domains)))
+            self.chunk_size = chunk_size
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def lexical_features(self, parsed: ParsedURLs) -> Dict[str, np.ndarray]:
+        host, scheme, port = parsed.host, parsed.scheme, parsed.port
+        features = {}
+        features["having_IP_Address"] = _phishing_if(pc.match_substring_regex(host, IP_HOST_PATTERN))
+
+        length = pc.utf8_length(parsed.urls).to_numpy()
+        short, long = FEATURE_EXTRACTION_URL_LENGTH_BOUNDS
+        features["URL_Length"] = np.select([length < short, length <= long], [1, 0], -1).astype(np.float32)
+
+        domain = pc.if_else(pc.starts_with(host, "www."), pc.utf8_slice_codeunits(host, 4), host)
+        features["Shortining_Service"] = _phishing_if(pc.is_in(domain, value_set=self.shortener_domains))
+        features["having_At_Symbol"] = _phishing_if(_count_between(parsed.at_signs, parsed.start, parsed.end) > 0)
+        features["double_slash_redirecting"] = _phishing_if(_count_between(
+            parsed.double_slash_positions(), parsed.start + DOUBLE_SLASH_MIN_POSITION, parsed.end) > 0)
+        features["Prefix_Suffix"] = _phishing_if(pc.match_substring(host, "-"))
+
+        # Dots left in the domain once www. and a country-code TLD are dropped
+        dots = (pc.count_substring(domain, ".").to_numpy()
+                - pc.match_substring_regex(domain, COUNTRY_CODE_PATTERN).to_numpy(zero_copy_only=False))
+        features["having_Sub_Domain"] = np.select([dots <= 1, dots == 2], [1, 0], -1).astype(np.float32)
+
+        # Plain http is phishing outright; an https certificate needs checking by a provider
+        https = pc.equal(scheme, "https").to_numpy(zero_copy_only=False)
+        features["SSLfinal_State"] = np.where(https, np.nan, -1).astype(np.float32)
+
+        standard_port = pc.or_(
+            pc.and_(pc.equal(port, "80"), pc.not_equal(scheme, "https")),
+            pc.and_(pc.equal(port, "443"), pc.not_equal(scheme, "http")),
+        )
+        features["port"] = _phishing_if(pc.and_(pc.not_equal(port, ""), pc.invert(standard_port)))
+        features["HTTPS_token"] = _phishing_if(pc.match_substring(host, "https"))
+        return features
+
+    def extract_chunk(self, urls: pa.Array, index: pd.Index) -> pd.DataFrame:
+        parsed = ParsedURLs(urls)
+        values = np.full((len(urls), len(self.feature_columns)), np.nan, dtype=np.float32)
+        column_index = {column: position for position, column in enumerate(self.feature_columns)}
+        for column, feature in self.lexical_features(parsed).items():
+            if column in column_index:
+                values[:, column_index[column]] = feature
+        # Rows without a URL get no features at all
+        values[parsed.start == parsed.end] = np.nan
+        features = pd.DataFrame(values, columns=self.feature_columns, index=index)
+
+        if self.providers:
+            parsed_frame = parsed.to_frame(index)
+            for provider in self.providers:
+                resolved = provider.resolve(parsed_frame)
+                for column in provider.features:
+                    if column in column_index:
+                        # URL-derived values win; providers only fill what is still missing
+                        features[column] = features[column].fillna(resolved[column].astype(np.float32))
+        return features
+
+    def extract(self, urls) -> pd.DataFrame:
+        """Feature frame (float32, schema column order) for a list, array or Series of URLs."""
+        try:
+            index = urls.index if isinstance(urls, pd.Series) else pd.RangeIndex(len(urls))
+            urls = pa.array(urls, type=pa.string(), from_pandas=True)
+            if len(urls) == 0:
+                return pd.DataFrame(columns=self.feature_columns, index=index, dtype=np.float32)
+            chunks = [self.extract_chunk(urls.slice(start, self.chunk_size), index[start:start + self.chunk_size])
+                      for start in range(0, len(urls), self.chunk_size)]
+            return chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def extract_file(self, file_path: str, url_column: str = "url") -> Iterator[pd.DataFrame]:
+        """Yields the features of the URLs in a csv, parquet or feather file, one chunk at a time."""
+        try:
+            rows = 0
+            for chunk in iter_dataframe_chunks(file_path, self.chunk_size):
+                rows += len(chunk)
+                yield self.extract(chunk[url_column])
+            logging.info(f"Extracted URL features for {rows} rows of {file_path}")
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
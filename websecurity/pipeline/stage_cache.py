@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import threading
+import dataclasses
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from websecurity.constant.training_pipeline import (
+    ARTIFACT_DIR, STAGE_CACHE_DIR_NAME, STAGE_CACHE_DIGEST_FILE_NAME, RUN_STATE_FILE_NAME
+)
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+
+# Root of the websecurity package, whose source is part of every stage fingerprint
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _write_json(file_path: str, content: dict) -> None:
+    """
+    Writes through a temporary file of its own and a rename, so readers never see half a file and
+    concurrent writers never share a temporary file.
+    """
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=directory, prefix=f"{os.path.basename(file_path)}.",
+                                     suffix=".tmp", delete=False) as file:
+        try:
+            json.dump(content, file, indent=2, default=str)
+        except BaseException:
+            file.close()
+            os.remove(file.name)
+            raise
+    os.replace(file.name, file_path)
+
+
+def _read_json(file_path: str) -> Optional[dict]:
+    if not os.path.isfile(file_path):
+        return None
+    with open(file_path) as file:
+        return json.load(file)
+
+
+def artifact_to_dict(artifact) -> dict:
+    return dataclasses.asdict(artifact)
+
+
+def artifact_from_dict(artifact_type, content: dict):
+    """Rebuilds an artifact dataclass, including nested artifacts such as the metric artifacts."""
+    values = {}
+    for artifact_field in dataclasses.fields(artifact_type):
+        if artifact_field.name not in content:
+            continue
+        value = content[artifact_field.name]
+        if dataclasses.is_dataclass(artifact_field.type) and isinstance(value, dict):
+            value = artifact_from_dict(artifact_field.type, value)
+        values[artifact_field.name] = value
+    return artifact_type(**values)
+
+
+def artifact_paths(artifact) -> list:
+    """Files and directories an artifact points to that exist."""
+    content = artifact_to_dict(artifact) if dataclasses.is_dataclass(artifact) else artifact
+    return sorted(value for value in content.values() if isinstance(value, str) and os.path.exists(value))
+
+
+class StageCache:
+    """
+    Remembers the artifact each pipeline stage produced for a fingerprint of the stage's inputs: the
+    content of its upstream artifacts, its config and the package source. A later run that computes the
+    same fingerprint reuses that artifact instead of running the stage again. File digests are kept
+    by size and modification time, so unchanged artifacts are not read again to be hashed. Stages
+    running in parallel share the digests under a lock.
+    """
+    def __init__(self, cache_dir: str = os.path.join(ARTIFACT_DIR, STAGE_CACHE_DIR_NAME)):
+        try:
+            self.cache_dir = cache_dir
+            self.digest_file_path = os.path.join(cache_dir, STAGE_CACHE_DIGEST_FILE_NAME)
+            self.digests = _read_json(self.digest_file_path) or {}
+            self.lock = threading.Lock()
+            self._source_digest = None
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def file_digest(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        key = os.path.abspath(file_path)
+        with self.lock:
+            known = self.digests.get(key)
+        if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        with self.lock:
+            self.digests[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def path_digest(self, path: str) -> str:
+        """Digest of a file, or of every file under a directory together with its relative path."""
+        if os.path.isfile(path):
+            return self.file_digest(path)
+        digest = hashlib.blake2b(digest_size=16)
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file_name in sorted(files):
+                file_path = os.path.join(root, file_name)
+                digest.update(os.path.relpath(file_path, path).encode())
+                digest.update(self.file_digest(file_path).encode())
+        return digest.hexdigest()
+
+    def source_digest(self) -> str:
+        """
+        Digest of every module in the websecurity package. Components import shared helpers (the
+        imputer, the model search, utils), so an edit anywhere in the package invalidates the cache.
+        """
+        if self._source_digest is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for root, dirs, files in os.walk(PACKAGE_DIR):
+                dirs[:] = sorted(name for name in dirs if name != "__pycache__")
+                for file_name in sorted(name for name in files if name.endswith(".py")):
+                    file_path = os.path.join(root, file_name)
+                    digest.update(os.path.relpath(file_path, PACKAGE_DIR).encode())
+                    digest.update(self.file_digest(file_path).encode())
+            self._source_digest = digest.hexdigest()
+        return self._source_digest
+
+    def artifact_digest(self, artifact) -> str:
+        """
+        Digest of the content behind an artifact's paths and of its plain values. Paths themselves are
+        left out, so the same data produced by another run hashes the same; dict values hold run
+        metadata such as timings and are left out too.
+        """
+        content = artifact_to_dict(artifact)
+        described = {}
+        for name, value in sorted(content.items()):
+            if isinstance(value, str) and os.path.exists(value):
+                described[name] = self.path_digest(value)
+            elif not isinstance(value, (dict, str)):
+                described[name] = value
+        return hashlib.blake2b(json.dumps(described, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+    def fingerprint(self, stage: str, config=None, upstream: Iterable = (), run_dir: Optional[str] = None,
+                    extra: Optional[dict] = None) -> str:
+        """
+        Fingerprint of a stage's inputs. Paths inside run_dir are rewritten relative to it, since each
+        run writes its artifacts under a new timestamped directory.
+        """
+        try:
+            config_values = {}
+            for name, value in sorted(vars(config).items() if config is not None else []):
+                if run_dir and isinstance(value, str) and value.startswith(run_dir):
+                    value = "<run>" + value[len(run_dir):]
+                config_values[name] = value
+            description = {
+                "stage": stage,
+                "config": config_values,
+                "upstream": [self.artifact_digest(artifact) for artifact in upstream],
+                "source": self.source_digest(),
+                "extra": extra,
+            }
+            with self.lock:
+                _write_json(self.digest_file_path, self.digests)
+            return hashlib.blake2b(json.dumps(description, sort_keys=True, default=str).encode(),
+                                   digest_size=16).hexdigest()
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def entry_file_path(self, stage: str, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, stage, f"{fingerprint}.json")
+
+    def lookup(self, stage: str, fingerprint: str, artifact_type):
+        """The artifact stored for this fingerprint, or None when there is none or its files are gone."""
+        try:
+            entry = _read_json(self.entry_file_path(stage, fingerprint))
+            if entry is None:
+                return None
+            if not all(os.path.exists(path) for path in entry["paths"]):
+                logging.info(f"Cached {stage} artifact {fingerprint} is missing files, running the stage again")
+                return None
+            logging.info(f"Reusing the {stage} artifact of run {entry['run_dir']} ({fingerprint})")
+            return artifact_from_dict(artifact_type, entry["artifact"])
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def store(self, stage: str, fingerprint: str, artifact, run_dir: Optional[str] = None) -> None:
+        try:
+            _write_json(self.entry_file_path(stage, fingerprint), {
+                "stage": stage,
+                "run_dir": run_dir,
+                "created_at": datetime.now().isoformat(),
+                "artifact": artifact_to_dict(artifact),
+                "paths": artifact_paths(artifact),
+            })
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+
+class RunState:
+    """
+    Stages a run has completed and their artifacts, kept in the run's artifact directory so that a run
+    which failed part-way can be resumed from the first stage it did not complete.
+    """
+    def __init__(self, run_dir: str):
+        try:
+            self.run_dir = run_dir
+            self.file_path = os.path.join(run_dir, RUN_STATE_FILE_NAME)
+            self.state = _read_json(self.file_path) or {"status": "running", "stages": {}}
+            self.lock = threading.Lock()
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    @staticmethod
+    def latest_unfinished(artifact_dir: str = ARTIFACT_DIR) -> Optional[str]:
+        """Run directory of the most recently updated run that did not finish, if any."""
+        try:
+            candidates = []
+            for name in os.listdir(artifact_dir) if os.path.isdir(artifact_dir) else []:
+                state = _read_json(os.path.join(artifact_dir, name, RUN_STATE_FILE_NAME))
+                if state is not None and state["status"] != "completed":
+                    candidates.append((os.path.getmtime(os.path.join(artifact_dir, name, RUN_STATE_FILE_NAME)), name))
+            return os.path.join(artifact_dir, max(candidates)[1]) if candidates else None
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def completed(self, stage: str, artifact_type):
+        entry = self.state["stages"].get(stage)
+        return artifact_from_dict(artifact_type, entry["artifact"]) if entry is not None else None
+
+    def record(self, stage: str, artifact, cached: bool = False) -> None:
+        with self.lock:
+            self.state["stages"][stage] = {"artifact": artifact_to_dict(artifact), "cached": cached,
+                                           "completed_at": datetime.now().isoformat()}
+            _write_json(self.file_path, self.state)
+
+    def set_status(self, status: str) -> None:
+        with self.lock:
+            self.state["status"] = status
+            _write_json(self.file_path, self.state)
+
+    @property
+    def stages(self) -> Dict[str, dict]:
+        return self.state["stages"]
@@ -0,0 +1,242 @@
+import os
+import sys
+import time
+import json
+import resource
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Optional, Tuple
+
+from websecurity.components.data_ingestion import DataIngestion
+from websecurity.components.data_validation import DataValidation
+from websecurity.components.data_transformation import DataTransformation
+from websecurity.components.model_trainer import ModelTrainer
+from websecurity.constant.training_pipeline import (
+    RUN_SUMMARY_FILE_NAME, PIPELINE_MAX_CONCURRENT_STAGES, PIPELINE_RSS_SAMPLE_INTERVAL_SECONDS
+)
+from websecurity.entity.artifact_entity import (
+    DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact, ModelTrainerArtifact
+)
+from websecurity.entity.config_entity import (
+    TrainingPipelineConfig, DataIngestionConfig, DataValidationConfig, DataTransformationConfig, ModelTrainerConfig
+)
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+from websecurity.pipeline.stage_cache import StageCache, RunState
+from websecurity.utils.main_utils.utils import count_rows
+
+
+@dataclass
+class Stage:
+    """
+    One node of the pipeline DAG. run() receives the artifacts of the stages it depends on, by name;
+    rows() tells how many rows the stage processed, for the run summary.
+    """
+    name: str
+    artifact_type: type
+    config: object
+    depends_on: Tuple[str, ...]
+    run: Callable[[Dict[str, object]], object]
+    rows: Callable[[object, Dict[str, object]], int] = lambda artifact, upstream: 0
+    # Extra fingerprint input that is not an upstream artifact, e.g. the state of the source collection
+    source_fingerprint: Optional[Callable[[], dict]] = None
+
+
+class RSSMonitor:
+    """
+    Samples the resident set size of this process in a background thread and keeps the peak seen
+    while each stage was running. Stages that overlap share the process, so each sees their sum.
+    """
+    def __init__(self, interval_seconds: float = PIPELINE_RSS_SAMPLE_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self.peaks: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample_forever, name="rss-monitor", daemon=True)
+
+    def rss_bytes(self) -> int:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * self.page_size
+        except OSError:
+            # No procfs: the lifetime peak is the best available figure (kilobytes on Linux)
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def sample(self) -> None:
+        rss = self.rss_bytes()
+        with self.lock:
+            for name, peak in self.peaks.items():
+                self.peaks[name] = max(peak, rss)
+
+    def sample_forever(self) -> None:
+        while not self.stopped.wait(self.interval_seconds):
+            self.sample()
+
+    def start_stage(self, name: str) -> None:
+        with self.lock:
+            self.peaks[name] = 0
+        self.sample()
+
+    def end_stage(self, name: str) -> int:
+        self.sample()
+        with self.lock:
+            return self.peaks.pop(name)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+class TrainingPipeline:
+    """
+    Runs ingestion, validation, transformation and training as a DAG of stages. A stage starts as soon as
+    the stages it depends on have finished, up to max_concurrent_stages at once. Each stage is reused
+    from the stage cache when its inputs are unchanged, or from the run being resumed. Wall time,
+    peak RSS and rows/sec of every stage go to run_summary.json in the run directory.
+    """
+    def __init__(self, resume: bool = False, use_cache: bool = True,
+                 max_concurrent_stages: int = PIPELINE_MAX_CONCURRENT_STAGES):
+        try:
+            resume_dir = RunState.latest_unfinished() if resume else None
+            if resume and resume_dir is None:
+                logging.info("No unfinished run to resume, starting a new one")
+            self.training_pipeline_config = TrainingPipelineConfig(
+                run_name=os.path.basename(resume_dir) if resume_dir else None
+            )
+            self.run_state = RunState(self.training_pipeline_config.artifact_dir)
+            self.stage_cache = StageCache() if use_cache else None
+            self.max_concurrent_stages = max_concurrent_stages
+            self.summary: Dict[str, dict] = {}
+            self.stages = {stage.name: stage for stage in self.get_stages()}
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    def get_stages(self) -> list:
+        config = self.training_pipeline_config
+        data_ingestion_config = DataIngestionConfig(config)
+        data_validation_config = DataValidationConfig(config)
+        data_transformation_config = DataTransformationConfig(config)
+        model_trainer_config = ModelTrainerConfig(config)
+        return [
+            Stage(
+                name="data_ingestion", artifact_type=DataIngestionArtifact, config=data_ingestion_config,
+                depends_on=(),
+                run=lambda upstream: DataIngestion(data_ingestion_config).intiate_data_ingestion(),
+                rows=lambda artifact, upstream: count_rows(artifact.trained_file_path) + count_rows(artifact.test_file_path),
+                source_fingerprint=lambda: DataIngestion(data_ingestion_config).source_fingerprint(),
+            ),
+            Stage(
+                name="data_validation", artifact_type=DataValidationArtifact, config=data_validation_config,
+                depends_on=("data_ingestion",),
+                run=lambda upstream: DataValidation(upstream["data_ingestion"],
+                                                    data_validation_config).initiate_data_validation(),
+                rows=lambda artifact, upstream: (count_rows(upstream["data_ingestion"].trained_file_path)
+                                                 + count_rows(upstream["data_ingestion"].test_file_path)),
+            ),
+            Stage(
+                name="data_transformation", artifact_type=DataTransformationArtifact,
+                config=data_transformation_config, depends_on=("data_validation",),
+                run=lambda upstream: DataTransformation(upstream["data_validation"],
+                                                        data_transformation_config).initiate_data_transformation(),
+                rows=lambda artifact, upstream: (count_rows(upstream["data_validation"].valid_train_file_path)
+                                                 + count_rows(upstream["data_validation"].valid_test_file_path)),
+            ),
+            Stage(
+                name="model_trainer", artifact_type=ModelTrainerArtifact, config=model_trainer_config,
+                depends_on=("data_transformation",),
+                run=lambda upstream: ModelTrainer(
+                    model_trainer_config=model_trainer_config,
+                    data_transformation_artifact=upstream["data_transformation"],
+                ).initiate_model_trainer(),
+                rows=lambda artifact, upstream: count_rows(
+                    upstream["data_transformation"].transformed_train_features_file_path),
+            ),
+        ]
+
+    def run_stage(self, stage: Stage, upstream: Dict[str, object], monitor: RSSMonitor):
+        """
+        The stage's artifact: the one the resumed run already recorded, the one a previous run produced
+        from the same inputs, or a fresh one.
+        """
+        try:
+            start = time.perf_counter()
+            monitor.start_stage(stage.name)
+            source = "resumed"
+            artifact = self.run_state.completed(stage.name, stage.artifact_type)
+            if artifact is not None:
+                logging.info(f"{stage.name} already completed in {self.run_state.run_dir}, resuming after it")
+            else:
+                fingerprint = None
+                if self.stage_cache is not None:
+                    fingerprint = self.stage_cache.fingerprint(
+                        stage.name, stage.config, [upstream[name] for name in stage.depends_on],
+                        run_dir=self.training_pipeline_config.artifact_dir,
+                        extra=stage.source_fingerprint() if stage.source_fingerprint is not None else None,
+                    )
+                    artifact = self.stage_cache.lookup(stage.name, fingerprint, stage.artifact_type)
+                source = "cached" if artifact is not None else "executed"
+                if artifact is None:
+                    logging.info(f"Running {stage.name}")
+                    artifact = stage.run(upstream)
+                    if self.stage_cache is not None:
+                        self.stage_cache.store(stage.name, fingerprint, artifact,
+                                               run_dir=self.training_pipeline_config.artifact_dir)
+                self.run_state.record(stage.name, artifact, cached=source == "cached")
+
+            seconds = time.perf_counter() - start
+            peak_rss = monitor.end_stage(stage.name)
+            rows = stage.rows(artifact, upstream) if source == "executed" else 0
+            self.summary[stage.name] = {
+                "source": source,
+                "seconds": round(seconds, 3),
+                "peak_rss_mb": round(peak_rss / 2 ** 20, 1),
+                "rows": rows,
+                "rows_per_sec": round(rows / seconds) if rows and seconds > 0 else None,
+            }
+            logging.info(f"{stage.name} {source} in {seconds:.2f}s: {self.summary[stage.name]}")
+            return artifact
+        except Exception as e:
+            raise WebShieldException(e, sys)
+
+    def write_summary(self, status: str, seconds: float) -> str:
+        summary_file_path = os.path.join(self.training_pipeline_config.artifact_dir, RUN_SUMMARY_FILE_NAME)
+        os.makedirs(os.path.dirname(summary_file_path), exist_ok=True)
+        with open(summary_file_path, "w") as summary_file:
+            json.dump({"status": status, "seconds": round(seconds, 3), "stages": self.summary},
+                      summary_file, indent=2)
+        logging.info(f"Run summary written to {summary_file_path}")
+        return summary_file_path
+
+    def run_pipeline(self) -> ModelTrainerArtifact:
+        start = time.perf_counter()
+        status = "failed"
+        try:
+            self.run_state.set_status("running")
+            artifacts: Dict[str, object] = {}
+            pending = dict(self.stages)
+            with RSSMonitor() as monitor, ThreadPoolExecutor(max_workers=self.max_concurrent_stages) as executor:
+                running = {}
+                while pending or running:
+                    for name, stage in list(pending.items()):
+                        if all(dependency in artifacts for dependency in stage.depends_on):
+                            upstream = {dependency: artifacts[dependency] for dependency in stage.depends_on}
+                            running[executor.submit(self.run_stage, stage, upstream, monitor)] = name
+                            del pending[name]
+                    if not running:
+                        raise Exception(f"Stages {sorted(pending)} depend on stages that are not in the pipeline")
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        artifacts[running.pop(future)] = future.result()
+            self.run_state.set_status("completed")
+            status = "completed"
+            return artifacts["model_trainer"]
+        except Exception as e:
+            raise WebShieldException(e, sys)
+        finally:
+            self.write_summary(status, time.perf_counter() - start)
@@ -0,0 +1,122 @@
+import sys
+import time
+import asyncio
+from collections import deque
+from typing import Callable
+
+import numpy as np
+
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into one vectorized predict call.
+
+    Requests are queued as (rows, model, future) triples; a collector task drains the queue into a batch
+    until it holds max_batch_size rows or max_wait_ms has passed since the first row arrived, runs
+    predict_fn(rows, model) once on the stacked rows in the executor and hands each caller its slice of
+    the result. A batch only holds requests for one model, so a request queued before a model swap is
+    still scored by the model it captured. At most max_in_flight batches run at the same time, so a slow
+    batch doesn't stall the next one.
+    """
+    def __init__(self, predict_fn: Callable[[np.ndarray, object], np.ndarray], executor, max_batch_size: int,
+                 max_wait_ms: float, max_queue_size: int, max_in_flight: int = 1, metrics_window: int = 10000):
+        self.predict_fn = predict_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_in_flight = max_in_flight
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.collector = None
+        self.pending_rows = 0
+        self.batch_sizes = deque(maxlen=metrics_window)
+        self.latencies = deque(maxlen=metrics_window)
+        self.batch_count = 0
+        self.request_count = 0
+
+    def start(self) -> None:
+        self.collector = asyncio.create_task(self.collect())
+
+    async def stop(self) -> None:
+        if self.collector is not None:
+            self.collector.cancel()
+            await asyncio.gather(self.collector, return_exceptions=True)
+            self.collector = None
+        # Let running batches deliver their results
+        for _ in range(self.max_in_flight):
+            await self.in_flight.acquire()
+
+    async def submit(self, rows: np.ndarray, model) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        self.pending_rows += len(rows)
+        await self.queue.put((rows, model, future, time.perf_counter()))
+        return await future
+
+    async def collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        carry = None
+        while True:
+            batch = [carry] if carry is not None else [await self.queue.get()]
+            carry = None
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0 and self.queue.empty():
+                    break
+                try:
+                    item = self.queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self.queue.get(), timeout)
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                if size + len(item[0]) > self.max_batch_size or item[1] is not batch[0][1]:
+                    # Never split a request across batches or mix models; it opens the next one instead
+                    carry = item
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self.pending_rows -= size
+            await self.in_flight.acquire()
+            asyncio.create_task(self.run_batch(batch, size))
+
+    async def run_batch(self, batch: list, size: int) -> None:
+        try:
+            rows = np.concatenate([item[0] for item in batch]) if len(batch) > 1 else batch[0][0]
+            predictions = await asyncio.get_running_loop().run_in_executor(self.executor, self.predict_fn, rows,
+                                                                           batch[0][1])
+            offsets = np.cumsum([0] + [len(item[0]) for item in batch])
+            finished = time.perf_counter()
+            for (_, _, future, submitted), start, end in zip(batch, offsets[:-1], offsets[1:]):
+                if not future.done():
+                    future.set_result(predictions[start:end])
+                self.latencies.append(finished - submitted)
+            self.batch_sizes.append(size)
+            self.batch_count += 1
+            self.request_count += len(batch)
+        except Exception as e:
+            logging.info(f"Micro-batch of {size} rows failed: {e}")
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e if isinstance(e, WebShieldException) else WebShieldException(e, sys))
+        finally:
+            self.in_flight.release()
+
+    def metrics(self) -> dict:
+        latencies_ms = np.array(self.latencies) * 1000
+        batch_sizes = np.array(self.batch_sizes)
+        return {
+            "queue_depth": self.queue.qsize(),
+            "pending_rows": self.pending_rows,
+            "batches": self.batch_count,
+            "requests": self.request_count,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batch_size_mean": float(batch_sizes.mean()) if len(batch_sizes) else 0.0,
+            "batch_size_p50": float(np.percentile(batch_sizes, 50)) if len(batch_sizes) else 0.0,
+            "batch_size_max": int(batch_sizes.max()) if len(batch_sizes) else 0,
+            "latency_ms_p50": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else 0.0,
+            "latency_ms_p95": float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else 0.0,
+            "latency_ms_p99": float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else 0.0,
+        }
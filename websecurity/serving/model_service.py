@@ -0,0 +1,290 @@
+import os
+import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from websecurity.constant.training_pipeline import TARGET_COLUMN
+from websecurity.constant.serving import (
+    SERVING_MODEL_DIR, SERVING_MODEL_FILE_NAME, SERVING_PREPROCESSOR_FILE_NAME, SERVING_COMPILED_MODEL_FILE_NAME,
+    SERVING_LOOKUP_MODEL_FILE_NAME,
+    SERVING_MAX_WORKERS, SERVING_PREDICTION_COLUMN, SERVING_MICRO_BATCHING, SERVING_MAX_BATCH_SIZE,
+    SERVING_MAX_WAIT_MS, SERVING_MAX_QUEUE_SIZE, SERVING_METRICS_WINDOW, SERVING_CACHE_ENABLED,
+    SERVING_CACHE_MAX_ENTRIES, SERVING_CACHE_TTL_SECONDS, SERVING_RELOAD_INTERVAL_SECONDS, SERVING_WARMUP_ROWS
+)
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+from websecurity.feature_extraction.url_features import URLFeatureExtractor
+from websecurity.serving.batcher import MicroBatcher
+from websecurity.serving.prediction_cache import PredictionCache
+from websecurity.utils.main_utils.utils import load_object, object_file, get_feature_columns
+from websecurity.utils.main_utils.model_registry import get_current_version, resolve_model_dir
+from websecurity.utils.ml_utils.model.estimator import NetworkModel
+
+
+def get_model_version(model_dir: str = SERVING_MODEL_DIR) -> str:
+    """The published version of model_dir, or for an unversioned directory the model files' size and mtime."""
+    try:
+        current_version = get_current_version(model_dir)
+        if current_version is not None:
+            return current_version
+        stats = [os.stat(object_file(os.path.join(model_dir, name)))
+                 for name in (SERVING_PREPROCESSOR_FILE_NAME, SERVING_MODEL_FILE_NAME)]
+        return "-".join(f"{stat.st_mtime_ns:x}.{stat.st_size:x}" for stat in stats)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def load_network_model(model_dir: str = SERVING_MODEL_DIR) -> NetworkModel:
+    try:
+        preprocessor = load_object(os.path.join(model_dir, SERVING_PREPROCESSOR_FILE_NAME))
+        model = load_object(os.path.join(model_dir, SERVING_MODEL_FILE_NAME))
+        compiled_model_file_path = os.path.join(model_dir, SERVING_COMPILED_MODEL_FILE_NAME)
+        fast_model = load_object(compiled_model_file_path) if object_file(compiled_model_file_path) else None
+        lookup_model_file_path = os.path.join(model_dir, SERVING_LOOKUP_MODEL_FILE_NAME)
+        lookup_model = load_object(lookup_model_file_path) if object_file(lookup_model_file_path) else None
+        return NetworkModel(preprocessor=preprocessor, model=model, fast_model=fast_model, lookup_model=lookup_model)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+class ModelService:
+    """
+    Holds the NetworkModel loaded once at startup and runs predictions on a worker pool,
+    so the CPU-bound preprocess + predict never blocks the event loop. Requests of up to
+    max_batch_size rows are coalesced by a MicroBatcher when micro_batching is on, and rows
+    already scored by the loaded model are answered from a PredictionCache when cache_enabled is on.
+
+    Every reload_interval seconds the model directory is checked for a newly published version,
+    which is loaded and warmed up off the event loop and then swapped in; predictions that already
+    picked up the previous NetworkModel finish on it. Under PreforkServer the workers do not watch;
+    the parent reloads the model and replaces them.
+    """
+    def __init__(self, model_dir: str = SERVING_MODEL_DIR, max_workers: int = SERVING_MAX_WORKERS,
+                 micro_batching: bool = SERVING_MICRO_BATCHING, max_batch_size: int = SERVING_MAX_BATCH_SIZE,
+                 max_wait_ms: float = SERVING_MAX_WAIT_MS, cache_enabled: bool = SERVING_CACHE_ENABLED,
+                 cache_max_entries: int = SERVING_CACHE_MAX_ENTRIES, cache_ttl_seconds: float = SERVING_CACHE_TTL_SECONDS,
+                 reload_interval: float = SERVING_RELOAD_INTERVAL_SECONDS):
+        try:
+            self.model_dir = model_dir
+            self.max_workers = max_workers
+            self.micro_batching = micro_batching
+            self.max_batch_size = max_batch_size
+            self.max_wait_ms = max_wait_ms
+            self.reload_interval = reload_interval
+            self.feature_columns = get_feature_columns()
+            self.feature_index = {column: index for index, column in enumerate(self.feature_columns)}
+            self.url_extractor = URLFeatureExtractor(self.feature_columns)
+            self.network_model = None
+            self.model_version = None
+            self.executor = None
+            self.batcher = None
+            self.watcher = None
+            self.cache = PredictionCache(cache_max_entries, cache_ttl_seconds) if cache_enabled else None
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def load_model(self) -> tuple:
+        """(network_model, model_version) of the version currently published in model_dir."""
+        try:
+            current_version = get_current_version(self.model_dir)
+            model_dir = resolve_model_dir(self.model_dir, current_version)
+            return load_network_model(model_dir), current_version or get_model_version(model_dir)
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def warm_up(self, network_model: NetworkModel) -> None:
+        """Runs a single row and a full batch, some values missing, through every stage of a freshly loaded model."""
+        try:
+            generator = np.random.default_rng(0)
+            values = generator.integers(-1, 2, size=(SERVING_WARMUP_ROWS, len(self.feature_columns))).astype(np.float64)
+            values[generator.random(values.shape) < 0.05] = np.nan
+            for rows in (values[:1], values):
+                network_model.predict(pd.DataFrame(rows, columns=self.feature_columns))
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def swap(self, network_model: NetworkModel, model_version: str) -> None:
+        # Model before version: a request that reads the new version must also predict with the new model
+        self.network_model = network_model
+        self.model_version = model_version
+        if self.cache is not None:
+            self.cache.set_model_version(model_version)
+
+    def preload(self) -> None:
+        """Loads the model without starting anything, e.g. in a parent process before forking workers."""
+        try:
+            self.swap(*self.load_model())
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def load_and_warm_up(self) -> tuple:
+        network_model, model_version = self.load_model()
+        self.warm_up(network_model)
+        return network_model, model_version
+
+    async def watch_model(self) -> None:
+        """Swaps in each newly published version; a version that fails to load is skipped and the old model kept."""
+        loop = asyncio.get_running_loop()
+        failed_version = None
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            model_version = None
+            try:
+                model_version = get_model_version(self.model_dir)
+                if model_version in (self.model_version, failed_version):
+                    continue
+                # Default executor, so loading never occupies the prediction pool
+                network_model, model_version = await loop.run_in_executor(None, self.load_and_warm_up)
+                previous_version = self.model_version
+                self.swap(network_model, model_version)
+                logging.info(f"Swapped model version {previous_version} for {model_version}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Left unset when the directory itself could not be read; that is retried
+                failed_version = model_version
+                logging.info(f"Could not load model version {model_version}, keeping {self.model_version}: {e}")
+
+    def start(self) -> None:
+        """Loads the model unless preloaded and starts the pool; call from within the running event loop."""
+        try:
+            if self.network_model is None:
+                self.preload()
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="predict")
+            if self.micro_batching:
+                self.batcher = MicroBatcher(
+                    self.predict_array, self.executor, max_batch_size=self.max_batch_size,
+                    max_wait_ms=self.max_wait_ms, max_queue_size=SERVING_MAX_QUEUE_SIZE,
+                    max_in_flight=self.max_workers, metrics_window=SERVING_METRICS_WINDOW
+                )
+                self.batcher.start()
+            if self.reload_interval > 0:
+                self.watcher = asyncio.get_running_loop().create_task(self.watch_model())
+            logging.info(f"Loaded model from {self.model_dir} with {self.max_workers} prediction workers, "
+                         f"micro-batching={self.micro_batching}")
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    async def stop(self) -> None:
+        if self.watcher is not None:
+            self.watcher.cancel()
+            await asyncio.gather(self.watcher, return_exceptions=True)
+            self.watcher = None
+        if self.batcher is not None:
+            await self.batcher.stop()
+            self.batcher = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def to_array(self, records: List[dict]) -> np.ndarray:
+        """Feature matrix in training column order for a list of row dicts; absent features become NaN."""
+        try:
+            values = np.full((len(records), len(self.feature_columns)), np.nan)
+            for row_index, record in enumerate(records):
+                for column, value in record.items():
+                    if column == TARGET_COLUMN:
+                        continue
+                    if column not in self.feature_index:
+                        raise ValueError(f"Unknown feature column: {column}")
+                    if value is not None:
+                        values[row_index, self.feature_index[column]] = value
+            return values
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def to_frame(self, rows) -> pd.DataFrame:
+        """Orders caller rows (list of dicts or a DataFrame) by the training columns; absent features become NaN."""
+        try:
+            dataframe = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame.from_records(rows)
+            unknown = set(dataframe.columns) - set(self.feature_columns) - {TARGET_COLUMN}
+            if unknown:
+                raise ValueError(f"Unknown feature columns: {sorted(unknown)}")
+            return dataframe.reindex(columns=self.feature_columns).astype(np.float64)
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def predict_frame(self, dataframe: pd.DataFrame) -> np.ndarray:
+        return self.network_model.predict(self.to_frame(dataframe))
+
+    def predict_array(self, values: np.ndarray, network_model: NetworkModel = None) -> np.ndarray:
+        if network_model is None:
+            network_model = self.network_model
+        return network_model.predict(pd.DataFrame(values, columns=self.feature_columns))
+
+    @staticmethod
+    def merge_predictions(cached, miss_index: np.ndarray, miss_predictions: np.ndarray) -> np.ndarray:
+        if cached is None:
+            return miss_predictions
+        predictions = cached.astype(np.result_type(cached, miss_predictions))
+        predictions[miss_index] = miss_predictions
+        return predictions
+
+    def predict_cached(self, values: np.ndarray, network_model: NetworkModel, model_version: str) -> np.ndarray:
+        """Synchronous cached predict with a given model, for callers already running on the pool."""
+        if self.cache is None:
+            return self.predict_array(values, network_model)
+        cached, miss_index, codes, packable = self.cache.lookup(values)
+        if len(miss_index) == 0:
+            return cached
+        miss_predictions = self.predict_array(values[miss_index], network_model)
+        self.cache.store(codes[miss_index], packable[miss_index], miss_predictions, model_version)
+        return self.merge_predictions(cached, miss_index, miss_predictions)
+
+    async def predict_uncached(self, values: np.ndarray, network_model: NetworkModel) -> np.ndarray:
+        if self.batcher is not None and len(values) <= self.max_batch_size:
+            return await self.batcher.submit(values, network_model)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.predict_array, values, network_model)
+
+    async def predict(self, records: List[dict]) -> np.ndarray:
+        return await self.predict_values(self.to_array(records))
+
+    async def predict_urls(self, urls: List[str]) -> np.ndarray:
+        """Scores raw URLs from their URL-derived features; the network-dependent ones are imputed."""
+        loop = asyncio.get_running_loop()
+        features = await loop.run_in_executor(self.executor, self.url_extractor.extract, urls)
+        return await self.predict_values(features.to_numpy(dtype=np.float64))
+
+    async def predict_values(self, values: np.ndarray) -> np.ndarray:
+        # Captured once, so a swap while this request waits in the batcher doesn't change its model
+        network_model, model_version = self.network_model, self.model_version
+        if self.cache is None:
+            return await self.predict_uncached(values, network_model)
+        cached, miss_index, codes, packable = self.cache.lookup(values)
+        if len(miss_index) == 0:
+            return cached
+        miss_predictions = await self.predict_uncached(values[miss_index], network_model)
+        self.cache.store(codes[miss_index], packable[miss_index], miss_predictions, model_version)
+        return self.merge_predictions(cached, miss_index, miss_predictions)
+
+    def metrics(self) -> dict:
+        metrics = self.batcher.metrics() if self.batcher is not None else {}
+        if self.cache is not None:
+            metrics["cache"] = self.cache.metrics()
+        return metrics
+
+    def predict_chunks(self, chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        # A whole upload is scored by the model that was current when it started, even across a swap
+        model_version = self.model_version
+        network_model = self.network_model
+        for chunk in chunks:
+            chunk[SERVING_PREDICTION_COLUMN] = self.predict_cached(self.to_frame(chunk).to_numpy(), network_model,
+                                                                   model_version)
+            yield chunk
+
+    async def stream_predictions(self, chunks: Iterator[pd.DataFrame]):
+        """Scores an iterator of chunks one at a time on the pool, yielding each scored chunk as CSV text."""
+        loop = asyncio.get_running_loop()
+        scored = self.predict_chunks(chunks)
+        header = True
+        while True:
+            chunk = await loop.run_in_executor(self.executor, next, scored, None)
+            if chunk is None:
+                break
+            yield chunk.to_csv(index=False, header=header)
+            header = False
@@ -0,0 +1,115 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from websecurity.exception.exception import WebShieldException
+from websecurity.utils.ml_utils.model.feature_code import pack_feature_codes
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache of predictions keyed by the packed feature vector.
+
+    A batch is packed into int64 codes in one vectorized pass and deduplicated before the
+    dictionary lookups, so repeated rows within a batch cost a single lookup. Entries belong
+    to one model version; switching the version drops them all.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.model_version = None
+        self.dtype = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def set_model_version(self, model_version: str) -> None:
+        with self.lock:
+            if model_version != self.model_version:
+                self.entries.clear()
+                self.model_version = model_version
+                self.dtype = None
+
+    def lookup(self, values: np.ndarray) -> tuple:
+        """
+        Returns (predictions, miss_index, codes, packable). predictions holds the cached rows
+        (None if nothing was cached yet); the rows in miss_index still need the model.
+        """
+        try:
+            codes, packable = pack_feature_codes(values)
+            unique_codes, inverse = np.unique(codes[packable], return_inverse=True)
+            found = np.zeros(len(unique_codes), dtype=bool)
+            cached = [None] * len(unique_codes)
+            now = time.monotonic()
+            with self.lock:
+                for index, code in enumerate(unique_codes.tolist()):
+                    entry = self.entries.get(code)
+                    if entry is None:
+                        continue
+                    if entry[1] < now:
+                        del self.entries[code]
+                        continue
+                    self.entries.move_to_end(code)
+                    cached[index] = entry[0]
+                    found[index] = True
+                dtype = self.dtype
+                inverse = inverse.ravel()
+                hit = np.zeros(len(values), dtype=bool)
+                hit[packable] = found[inverse]
+                self.hits += int(hit.sum())
+                self.misses += int(len(values) - hit.sum())
+
+            predictions = None
+            if hit.any():
+                found_values = np.array([value for value in cached if value is not None], dtype=dtype)
+                found_rank = np.cumsum(found) - 1
+                predictions = np.empty(len(values), dtype=dtype)
+                predictions[hit] = found_values[found_rank[inverse[found[inverse]]]]
+            return predictions, np.flatnonzero(~hit), codes, packable
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def store(self, codes: np.ndarray, packable: np.ndarray, predictions: np.ndarray, model_version: str) -> None:
+        try:
+            expires_at = time.monotonic() + self.ttl_seconds
+            with self.lock:
+                if model_version != self.model_version:
+                    # Predicted by a model that was swapped out while the request was in flight
+                    return
+                self.dtype = predictions.dtype
+                for code, prediction in zip(codes[packable].tolist(), predictions[packable].tolist()):
+                    self.entries[code] = (prediction, expires_at)
+                    self.entries.move_to_end(code)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def memory_bytes(self) -> int:
+        """Approximate footprint: the dict itself plus one int key, tuple, value and float expiry per entry."""
+        with self.lock:
+            if not self.entries:
+                return sys.getsizeof(self.entries)
+            code, entry = next(iter(self.entries.items()))
+            per_entry = sys.getsizeof(code) + sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1])
+            return sys.getsizeof(self.entries) + len(self.entries) * per_entry
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_bytes": self.memory_bytes(),
+            "model_version": self.model_version,
+        }
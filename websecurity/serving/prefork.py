@@ -0,0 +1,202 @@
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+from collections import deque
+from typing import Optional
+
+import uvicorn
+
+from websecurity.constant.serving import (
+    SERVING_RESPAWN_BACKOFF_SECONDS, SERVING_RESPAWN_MAX_BACKOFF_SECONDS, SERVING_MAX_WORKER_CRASHES,
+    SERVING_WORKER_CRASH_WINDOW_SECONDS, SERVING_PREFORK_POLL_SECONDS
+)
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+from websecurity.serving.model_service import ModelService, get_model_version
+
+
+class PreforkServer:
+    """
+    Serves the app from several uvicorn worker processes that share one copy of the model.
+
+    The parent loads the model through model_service.preload(), freezes the garbage collector and
+    binds the listening socket, then forks the workers. Each worker inherits the fitted arrays
+    (tree nodes, the imputer's training matrix, compiled and lookup tables) copy-on-write and never
+    writes to them, so they stay shared pages instead of one unpickled copy per worker. Thread pools,
+    batchers and caches are per worker, started by the app's lifespan after the fork. Workers that
+    die are replaced after a backoff that doubles with every crash in the last crash_window seconds;
+    after more than max_crashes of them the server stops instead of crash-looping. SIGINT/SIGTERM are
+    forwarded to the workers and the parent exits once they have.
+
+    Hot reload is done by the parent, not the workers: it polls for a newly published model version,
+    loads and warms it up once, and replaces every worker with one forked from it, so the workers keep
+    sharing a single copy of the current model.
+    """
+    def __init__(self, app, model_service: ModelService, workers: int, host: str, port: int,
+                 log_level: str = "info", respawn_backoff: float = SERVING_RESPAWN_BACKOFF_SECONDS,
+                 max_respawn_backoff: float = SERVING_RESPAWN_MAX_BACKOFF_SECONDS,
+                 max_crashes: int = SERVING_MAX_WORKER_CRASHES, crash_window: float = SERVING_WORKER_CRASH_WINDOW_SECONDS):
+        self.app = app
+        self.model_service = model_service
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.log_level = log_level
+        self.respawn_backoff = respawn_backoff
+        self.max_respawn_backoff = max_respawn_backoff
+        self.max_crashes = max_crashes
+        self.crash_window = crash_window
+        self.reload_interval = model_service.reload_interval
+        self.failed_version = None
+        self.socket = None
+        self.pids = set()
+        self.crashes = deque()
+        self.respawns = []
+        self.retiring = set()
+        self.stopping = False
+        self.gave_up = False
+
+    def bind(self) -> socket.socket:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        listener.listen(2048)
+        listener.set_inheritable(True)
+        return listener
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid:
+            self.pids.add(pid)
+            return pid
+        # Worker: back to default signal handling, uvicorn installs its own
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        exit_code = 0
+        try:
+            config = uvicorn.Config(self.app, log_level=self.log_level)
+            uvicorn.Server(config).run(sockets=[self.socket])
+        except BaseException as e:
+            logging.info(f"Worker {os.getpid()} failed: {e}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def reap(self) -> list:
+        """(pid, status) of every worker that exited since the last call, without blocking."""
+        exited = []
+        while self.pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            self.pids.discard(pid)
+            exited.append((pid, status))
+        return exited
+
+    def backoff(self, now: float) -> Optional[float]:
+        """
+        Seconds to wait before replacing a crashed worker, doubling with each crash within crash_window,
+        or None once there have been more than max_crashes.
+        """
+        self.crashes.append(now)
+        while self.crashes[0] < now - self.crash_window:
+            self.crashes.popleft()
+        if len(self.crashes) > self.max_crashes:
+            return None
+        return min(self.respawn_backoff * 2 ** (len(self.crashes) - 1), self.max_respawn_backoff)
+
+    def reload(self) -> None:
+        """
+        Swaps in a newly published model version and replaces the workers: the replacements are forked
+        first, then the old workers are stopped gracefully, so the socket always has workers accepting.
+        A version that fails to load is skipped and the workers keep the old model.
+        """
+        model_version = None
+        try:
+            model_version = get_model_version(self.model_service.model_dir)
+            if model_version in (self.model_service.model_version, self.failed_version):
+                return
+            network_model, model_version = self.model_service.load_and_warm_up()
+        except Exception as e:
+            # Left unset when the directory itself could not be read; that is retried
+            self.failed_version = model_version
+            logging.info(f"Could not load model version {model_version}, keeping {self.model_service.model_version}: {e}")
+            return
+        previous_version = self.model_service.model_version
+        self.model_service.swap(network_model, model_version)
+        del network_model
+        # Free the previous model and freeze the new one, so the new workers share its pages
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        previous_pids = set(self.pids)
+        for _ in previous_pids:
+            self.spawn()
+        self.retiring |= previous_pids
+        for pid in previous_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        logging.info(f"Replaced {len(previous_pids)} workers serving model version {previous_version} "
+                     f"with workers serving {model_version}")
+
+    def shutdown(self, signum, frame) -> None:
+        self.stopping = True
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        try:
+            self.model_service.preload()
+            # Workers inherit this; they must not reload on their own, the parent reloads and replaces them
+            self.model_service.reload_interval = 0
+            # Objects that exist now are never tracked again, so collections in the workers don't
+            # write to the inherited pages
+            gc.collect()
+            gc.freeze()
+            self.socket = self.bind()
+            signal.signal(signal.SIGINT, self.shutdown)
+            signal.signal(signal.SIGTERM, self.shutdown)
+            for _ in range(self.workers):
+                self.spawn()
+            logging.info(f"Serving on {self.host}:{self.port} with {self.workers} preforked workers "
+                         f"sharing the model loaded by {os.getpid()}")
+
+            next_reload = time.monotonic() + self.reload_interval
+            while self.pids or (self.respawns and not self.stopping):
+                now = time.monotonic()
+                for pid, status in self.reap():
+                    if pid in self.retiring:
+                        self.retiring.discard(pid)
+                        continue
+                    if self.stopping:
+                        continue
+                    delay = self.backoff(now)
+                    if delay is None:
+                        logging.info(f"{len(self.crashes)} workers crashed within {self.crash_window}s, stopping")
+                        self.gave_up = True
+                        self.shutdown(None, None)
+                        continue
+                    logging.info(f"Worker {pid} exited with status {status}, starting a replacement in {delay:.1f}s")
+                    self.respawns.append(now + delay)
+                if not self.stopping:
+                    due = [at for at in self.respawns if at <= now]
+                    self.respawns = [at for at in self.respawns if at > now]
+                    for _ in due:
+                        self.spawn()
+                if self.reload_interval > 0 and now >= next_reload and not self.stopping:
+                    self.reload()
+                    next_reload = time.monotonic() + self.reload_interval
+                time.sleep(SERVING_PREFORK_POLL_SECONDS)
+            self.socket.close()
+            if self.gave_up:
+                raise Exception(f"Workers crashed more than {self.max_crashes} times within {self.crash_window}s")
+        except Exception as e:
+            raise WebShieldException(e, sys)
@@ -0,0 +1,64 @@
+import os
+import sys
+import shutil
+from datetime import datetime
+from typing import Dict, Optional
+
+from websecurity.constant.training_pipeline import (
+    FINAL_MODEL_VERSIONS_DIR, FINAL_MODEL_CURRENT_FILE_NAME, FINAL_MODEL_KEEP_VERSIONS, MODEL_ARTIFACT_OUT_OF_BAND
+)
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+from websecurity.utils.main_utils.utils import save_object
+
+
+def get_current_version(model_dir: str) -> Optional[str]:
+    """Version named by model_dir/CURRENT, or None for a directory that was never published to."""
+    try:
+        current_file_path = os.path.join(model_dir, FINAL_MODEL_CURRENT_FILE_NAME)
+        if not os.path.isfile(current_file_path):
+            return None
+        with open(current_file_path) as current_file:
+            return current_file.read().strip() or None
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def resolve_model_dir(model_dir: str, version: Optional[str] = None) -> str:
+    """Directory holding the files of a version (the current one by default); model_dir itself if unversioned."""
+    version = version or get_current_version(model_dir)
+    return os.path.join(model_dir, FINAL_MODEL_VERSIONS_DIR, version) if version else model_dir
+
+
+def publish_model_version(model_dir: str, objects: Dict[str, object],
+                          keep_versions: int = FINAL_MODEL_KEEP_VERSIONS) -> str:
+    """
+    Saves objects ({file name: object}, None entries skipped) as a new version directory, then points
+    CURRENT at it with an atomic rename, so readers see either the previous version or the complete
+    new one. Versions beyond the newest keep_versions are removed, never the current one.
+    """
+    try:
+        versions_dir = os.path.join(model_dir, FINAL_MODEL_VERSIONS_DIR)
+        version = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        staging_dir = os.path.join(versions_dir, f".{version}.tmp")
+        os.makedirs(staging_dir)
+        for file_name, obj in objects.items():
+            if obj is not None:
+                save_object(os.path.join(staging_dir, file_name), obj, out_of_band=MODEL_ARTIFACT_OUT_OF_BAND)
+        os.rename(staging_dir, os.path.join(versions_dir, version))
+
+        current_file_path = os.path.join(model_dir, FINAL_MODEL_CURRENT_FILE_NAME)
+        with open(f"{current_file_path}.tmp", "w") as current_file:
+            current_file.write(version)
+            current_file.flush()
+            os.fsync(current_file.fileno())
+        os.replace(f"{current_file_path}.tmp", current_file_path)
+        logging.info(f"Published model version {version} to {model_dir}")
+
+        # Processes still serving a removed version keep their open mmaps
+        published = sorted(name for name in os.listdir(versions_dir) if not name.startswith("."))
+        for old_version in published[:-keep_versions]:
+            shutil.rmtree(os.path.join(versions_dir, old_version), ignore_errors=True)
+        return version
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
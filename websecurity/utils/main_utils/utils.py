@@ -3,11 +3,21 @@ from websecurity.exception.exception import WebShieldException
 from websecurity.logging.logger import logging
 import os
 import sys
+import json
+import shutil
 import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.feather as feather
 import dill
 import pickle
 from sklearn.metrics import r2_score
-from sklearn.model_selection import GridSearchCV
+from websecurity.utils.ml_utils.search.model_search import search_models
+from websecurity.constant.training_pipeline import (
+    SCHEMA_FILE_PATH, TARGET_COLUMN, MODEL_ARTIFACT_MIN_BUFFER_BYTES, MODEL_ARTIFACT_MANIFEST_FILE_NAME, MODEL_ARTIFACT_OBJECT_FILE_NAME,
+    MODEL_ARTIFACT_BUFFER_FILE_NAME
+)
 
 def read_yaml_file(file_path:str) -> dict:
     try:
@@ -27,58 +37,402 @@ def write_yaml_file(file_path: str, content: object, replace: bool = False) -> N
     except Exception as e:
         raise WebShieldException(e, sys) from e 
     
-def save_numpy_array_data(file_path:str,array:np.array):
+def get_feature_columns(schema_file_path: str = SCHEMA_FILE_PATH) -> list:
+    """Model input columns in schema order, without the target."""
+    try:
+        schema_config = read_yaml_file(schema_file_path)
+        columns = [list(column.keys())[0] for column in schema_config["columns"]]
+        return [column for column in columns if column != TARGET_COLUMN]
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+def get_file_format(file_path: str) -> str:
+    return os.path.splitext(file_path)[1].lstrip(".").lower()
+
+def compact_dataframe(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcasts integer columns to the smallest integer type and floats to float32.
+    """
+    try:
+        compacted = {}
+        for column in dataframe.columns:
+            values = dataframe[column]
+            if pd.api.types.is_integer_dtype(values):
+                compacted[column] = pd.to_numeric(values, downcast="integer")
+            elif pd.api.types.is_float_dtype(values):
+                compacted[column] = values.astype(np.float32)
+            else:
+                compacted[column] = values
+        return pd.DataFrame(compacted, index=dataframe.index)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+def write_dataframe(file_path: str, dataframe: pd.DataFrame) -> None:
+    """
+    Writes a dataframe in the format given by the file extension (csv, parquet or feather).
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        file_format = get_file_format(file_path)
+        if file_format == "csv":
+            dataframe.to_csv(file_path, index=False, header=True)
+        elif file_format == "parquet":
+            compact_dataframe(dataframe).to_parquet(file_path, index=False)
+        elif file_format == "feather":
+            compact_dataframe(dataframe).reset_index(drop=True).to_feather(file_path)
+        else:
+            raise Exception(f"Unsupported file format: {file_format}")
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+def dataframe_part_paths(dir_path: str) -> list:
+    """Part files of a dataset directory written by append_dataframe, in the order they were appended."""
+    return sorted(os.path.join(dir_path, name) for name in os.listdir(dir_path)
+                  if name.startswith("part-") and not name.endswith(".tmp"))
+
+def read_dataframe(file_path: str) -> pd.DataFrame:
+    try:
+        if os.path.isdir(file_path):
+            return pd.concat([read_dataframe(part_path) for part_path in dataframe_part_paths(file_path)],
+                             ignore_index=True)
+        file_format = get_file_format(file_path)
+        if file_format == "csv":
+            return pd.read_csv(file_path)
+        if file_format == "parquet":
+            return pd.read_parquet(file_path)
+        if file_format == "feather":
+            return pd.read_feather(file_path)
+        raise Exception(f"Unsupported file format: {file_format}")
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+def append_dataframe(file_path: str, dataframe: pd.DataFrame) -> str:
+    """
+    Appends rows to a dataframe file. CSV is appended in place; a parquet or feather path is a dataset
+    directory that gets one new part file per append, so earlier rows are never read or rewritten.
+    Returns the path that was written.
+    """
+    try:
+        file_format = get_file_format(file_path)
+        if file_format == "csv":
+            if not os.path.exists(file_path):
+                write_dataframe(file_path, dataframe)
+            else:
+                dataframe.to_csv(file_path, mode="a", index=False, header=False)
+            return file_path
+        if os.path.isfile(file_path):
+            # A single file written before the dataset layout becomes its first part
+            os.replace(file_path, f"{file_path}.tmp")
+            os.makedirs(file_path)
+            os.replace(f"{file_path}.tmp", os.path.join(file_path, f"part-00000.{file_format}"))
+        part_paths = dataframe_part_paths(file_path) if os.path.isdir(file_path) else []
+        if part_paths and dataframe.empty:
+            return file_path
+        part_path = os.path.join(file_path, f"part-{len(part_paths):05d}.{file_format}")
+        write_dataframe(part_path, dataframe)
+        return part_path
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+def copy_dataframe(source_path: str, destination_path: str) -> None:
+    """
+    Copies a dataframe file, or streams the parts of a dataset directory into a single file one part
+    at a time. Columns that were downcast differently in different parts are widened to a common type.
+    """
+    try:
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+        if not os.path.isdir(source_path):
+            shutil.copyfile(source_path, destination_path)
+            return
+        part_paths = dataframe_part_paths(source_path)
+        if get_file_format(source_path) == "parquet":
+            read_table, read_schema = pq.read_table, pq.read_schema
+        else:
+            read_table, read_schema = feather.read_table, lambda part_path: pa.ipc.open_file(part_path).schema
+        schema = pa.unify_schemas([read_schema(part_path).remove_metadata() for part_path in part_paths],
+                                  promote_options="permissive")
+        with DataFrameChunkWriter(destination_path) as writer:
+            for part_path in part_paths:
+                writer.write(read_table(part_path).replace_schema_metadata(None).cast(schema).to_pandas())
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+def read_dataframe_columns(file_path: str) -> list:
+    """
+    Column names of a dataframe file, read from the header/metadata only.
+    """
+    try:
+        file_format = get_file_format(file_path)
+        if file_format == "csv":
+            return list(pd.read_csv(file_path, nrows=0).columns)
+        if file_format == "parquet":
+            return list(pq.read_schema(file_path).names)
+        if file_format == "feather":
+            with pa.memory_map(file_path) as source:
+                return list(pa.ipc.open_file(source).schema.names)
+        raise Exception(f"Unsupported file format: {file_format}")
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+def count_rows(file_path: str) -> int:
+    """
+    Number of rows of a dataframe file or .npy array, from metadata where the format has it.
+    """
+    try:
+        file_format = get_file_format(file_path)
+        if file_format == "npy":
+            return len(np.load(file_path, mmap_mode="r"))
+        if file_format == "parquet":
+            return pq.ParquetFile(file_path).metadata.num_rows
+        if file_format == "feather":
+            with pa.memory_map(file_path) as source:
+                return pa.ipc.open_file(source).read_all().num_rows
+        if file_format == "csv":
+            with open(file_path, "rb") as file:
+                return max(sum(block.count(b"\n") for block in iter(lambda: file.read(1 << 20), b"")) - 1, 0)
+        raise Exception(f"Unsupported file format: {file_format}")
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+def iter_dataframe_chunks(file_path: str, chunk_size: int):
+    """
+    Yields a dataframe file as consecutive chunks of at most chunk_size rows.
+    """
+    try:
+        file_format = get_file_format(file_path)
+        if file_format == "csv":
+            yield from pd.read_csv(file_path, chunksize=chunk_size)
+        elif file_format == "parquet":
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif file_format == "feather":
+            with pa.memory_map(file_path) as source:
+                reader = pa.ipc.open_file(source)
+                for index in range(reader.num_record_batches):
+                    for batch in pa.Table.from_batches([reader.get_batch(index)]).to_batches(max_chunksize=chunk_size):
+                        yield batch.to_pandas()
+        else:
+            raise Exception(f"Unsupported file format: {file_format}")
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+class DataFrameChunkWriter:
+    """
+    Appends dataframe chunks to a csv, parquet or feather file without holding the whole file in memory.
+    The file is only created once the first chunk arrives; every chunk must have the same columns and dtypes.
+    """
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.file_format = get_file_format(file_path)
+        self.rows = 0
+        self._writer = None
+        self._sink = None
+
+    def write(self, dataframe: pd.DataFrame) -> None:
+        try:
+            if self.file_format == "csv":
+                if self.rows == 0:
+                    os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+                dataframe.to_csv(self.file_path, mode="w" if self.rows == 0 else "a",
+                                 index=False, header=self.rows == 0)
+            else:
+                # Dropping the pandas metadata makes nullable columns read back as plain numpy dtypes
+                table = pa.Table.from_pandas(dataframe, preserve_index=False).replace_schema_metadata(None)
+                if self._writer is None:
+                    os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+                    if self.file_format == "parquet":
+                        self._writer = pq.ParquetWriter(self.file_path, table.schema)
+                    elif self.file_format == "feather":
+                        self._sink = pa.OSFile(self.file_path, "wb")
+                        self._writer = pa.ipc.new_file(self._sink, table.schema,
+                                                       options=pa.ipc.IpcWriteOptions(compression="lz4"))
+                    else:
+                        raise Exception(f"Unsupported file format: {self.file_format}")
+                self._writer.write_table(table)
+            self.rows += len(dataframe)
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def save_numpy_array_data(file_path:str,array:np.array,dtype=None):
+    """
+    Saves an array as a C-contiguous .npy file (optionally cast to dtype) so it can be memory-mapped back.
+    """
     try:
         dir_path=os.path.dirname(file_path)
         os.makedirs(dir_path,exist_ok=True)
         with open(file_path,"wb") as file_obj:
-            np.save(file_obj,array)
+            np.save(file_obj,np.ascontiguousarray(array,dtype=dtype))
     except Exception as e:
         raise WebShieldException(e,sys) from e
     
-def save_object(file_path: str, obj: object) -> None:
+def get_artifact_dir(file_path: str) -> str:
+    """Directory an out-of-band artifact for file_path lives in: model.pkl -> model/."""
+    return os.path.splitext(file_path)[0]
+
+
+def is_model_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MODEL_ARTIFACT_MANIFEST_FILE_NAME))
+
+
+def save_model_artifact(artifact_dir: str, obj: object, min_buffer_bytes: int = MODEL_ARTIFACT_MIN_BUFFER_BYTES) -> None:
+    """
+    Pickles obj with protocol 5; contiguous buffers of at least min_buffer_bytes (numpy arrays, tree node
+    tables) are written out of band into one .npy blob, each at a 64-byte aligned offset listed in the
+    manifest, so loading costs a single mmap. The directory is built next to the target and renamed into place.
+    """
+    try:
+        buffers = []
+
+        def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+            if buffer.raw().nbytes < min_buffer_bytes:
+                return True
+            buffers.append(buffer)
+            return False
+
+        data = pickle.dumps(obj, protocol=5, buffer_callback=buffer_callback)
+        staging_dir = f"{artifact_dir}.tmp"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(staging_dir)
+        with open(os.path.join(staging_dir, MODEL_ARTIFACT_OBJECT_FILE_NAME), "wb") as file_obj:
+            file_obj.write(data)
+
+        sizes = [buffer.raw().nbytes for buffer in buffers]
+        offsets = [0]
+        for size in sizes[:-1]:
+            offsets.append(offsets[-1] + -(-size // 64) * 64)
+        blob = np.lib.format.open_memmap(os.path.join(staging_dir, MODEL_ARTIFACT_BUFFER_FILE_NAME), mode="w+",
+                                         dtype=np.uint8, shape=(offsets[-1] + (sizes[-1] if sizes else 0),))
+        for buffer, offset, size in zip(buffers, offsets, sizes):
+            blob[offset:offset + size] = np.frombuffer(buffer.raw(), dtype=np.uint8)
+        blob.flush()
+        del blob
+
+        manifest = {"format_version": 1, "pickle_protocol": 5, "object_file": MODEL_ARTIFACT_OBJECT_FILE_NAME,
+                    "object_type": f"{type(obj).__module__}.{type(obj).__qualname__}",
+                    "buffer_file": MODEL_ARTIFACT_BUFFER_FILE_NAME,
+                    "buffers": [{"offset": offset, "nbytes": size} for offset, size in zip(offsets, sizes)]}
+        # JSON rather than YAML: the manifest lists every buffer and is parsed on each cold start
+        with open(os.path.join(staging_dir, MODEL_ARTIFACT_MANIFEST_FILE_NAME), "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        shutil.rmtree(artifact_dir, ignore_errors=True)
+        os.rename(staging_dir, artifact_dir)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def load_model_artifact(artifact_dir: str, mmap_mode: str = "r") -> object:
+    """Unpickles an artifact with its buffers memory-mapped, so pages are read lazily and shared between processes."""
+    try:
+        with open(os.path.join(artifact_dir, MODEL_ARTIFACT_MANIFEST_FILE_NAME)) as manifest_file:
+            manifest = json.load(manifest_file)
+        blob = np.load(os.path.join(artifact_dir, manifest["buffer_file"]), mmap_mode=mmap_mode)
+        buffers = [blob[buffer["offset"]:buffer["offset"] + buffer["nbytes"]] for buffer in manifest["buffers"]]
+        with open(os.path.join(artifact_dir, manifest["object_file"]), "rb") as file_obj:
+            return pickle.loads(file_obj.read(), buffers=buffers)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def save_object(file_path: str, obj: object, out_of_band: bool = False) -> None:
+    """
+    Pickles obj to file_path, or with out_of_band=True writes it as a model artifact directory
+    (see save_model_artifact) next to it. Whichever form is not written is removed, so load_object
+    never sees a stale copy.
+    """
     try:
         logging.info("Entered the save_object method of MainUtils class")
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "wb") as file_obj:
-            pickle.dump(obj, file_obj)
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        artifact_dir = get_artifact_dir(file_path)
+        if out_of_band:
+            save_model_artifact(artifact_dir, obj)
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+        else:
+            with open(file_path, "wb") as file_obj:
+                pickle.dump(obj, file_obj)
+            if is_model_artifact(artifact_dir):
+                shutil.rmtree(artifact_dir)
         logging.info("Exited the save_object method of MainUtils class")
     except Exception as e:
         raise WebShieldException(e, sys) from e
     
 
+def object_file(file_path: str):
+    """The file backing a saved object: the pickle itself or its artifact manifest; None if nothing is saved."""
+    manifest_file_path = os.path.join(get_artifact_dir(file_path), MODEL_ARTIFACT_MANIFEST_FILE_NAME)
+    if os.path.isfile(manifest_file_path):
+        return manifest_file_path
+    return file_path if os.path.isfile(file_path) else None
+
+
+def remove_object(file_path: str) -> None:
+    try:
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+        if is_model_artifact(get_artifact_dir(file_path)):
+            shutil.rmtree(get_artifact_dir(file_path))
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
 def load_object(file_path: str,) -> object:
+    """Loads a pickle, or the model artifact directory written for file_path (or given directly)."""
     try:
+        for artifact_dir in (file_path, get_artifact_dir(file_path)):
+            if is_model_artifact(artifact_dir):
+                return load_model_artifact(artifact_dir)
         if not os.path.exists(file_path):
             raise Exception(f"The file{file_path} not exists")
         with open(file_path, "rb") as file_obj:
-            print(file_obj)
             return pickle.load(file_obj)
     except Exception as e:
         raise WebShieldException(e, sys) from e
     
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: str = None) -> np.array:
+    """
+    Loads a .npy file. With mmap_mode ("r", "r+", "c") the array is memory-mapped instead of read into RAM.
+    """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, "rb") as file_obj:
             return np.load(file_obj)
     except Exception as e:
         raise WebShieldException(e, sys) from e
     
-def evaluate_models(X_train, y_train,X_test,y_test,models,params):
+def evaluate_models(X_train, y_train,X_test,y_test,models,params,n_jobs=-1,cache_dir=None,
+                    strategy="exhaustive",budget=20,resource="n_samples",factor=3):
+    """
+    Searches every model's grid, replaces each entry of `models` with its refitted best estimator
+    and returns {model name: test score}.
+    """
     try:
         report = {}
 
-        for i in range(len(list(models))):
-            model = list(models.values())[i]
-            para=params[list(models.keys())[i]]
-
-            gs = GridSearchCV(model,para,cv=3)
-            gs.fit(X_train,y_train)
-
-            model.set_params(**gs.best_params_)
-            model.fit(X_train,y_train)
+        search_results = search_models(
+            X_train=X_train, y_train=y_train, models=models, params=params,
+            cv=3, n_jobs=n_jobs, cache_dir=cache_dir,
+            strategy=strategy, budget=budget, resource=resource, factor=factor,
+        )
 
-            #model.fit(X_train, y_train)  # Train model
+        for model_name, (model, best_params, cv_score) in search_results.items():
+            # The refitted best estimator is reused by the caller, no second fit
+            models[model_name] = model
 
             y_train_pred = model.predict(X_train)
 
@@ -88,7 +442,7 @@ def evaluate_models(X_train, y_train,X_test,y_test,models,params):
 
             test_model_score = r2_score(y_test, y_test_pred)
 
-            report[list(models.keys())[i]] = test_model_score
+            report[model_name] = test_model_score
 
         return report
 
@@ -0,0 +1,189 @@
+from websecurity.exception.exception import WebShieldException
+from scipy.stats import ks_2samp, kstwo, chi2
+import numpy as np
+import pandas as pd
+import sys
+
+# Same cut-over as scipy.stats.ks_2samp(method="auto") between exact and asymptotic p-values
+KS_EXACT_MAX_N = 10000
+
+
+def categorical_histograms(base: np.ndarray, current: np.ndarray, max_categories: int = 32,
+                           chunk_size: int = 65536):
+    """
+    Bins every column of base/current with one bincount per block of rows, for columns holding at most
+    max_categories consecutive integer values (the phishing features only take -1, 0 and 1).
+
+    Returns (categorical column mask, support (n_categorical, width), base counts, current counts).
+    """
+    try:
+        base = np.asarray(base)
+        current = np.asarray(current)
+        n_columns = base.shape[1]
+
+        if base.dtype.kind in "iub" and current.dtype.kind in "iub":
+            # Integer data cannot hold NaN or fractions, skip the float checks entirely
+            low = np.minimum(base.min(axis=0), current.min(axis=0)).astype(np.int64)
+            high = np.maximum(base.max(axis=0), current.max(axis=0)).astype(np.int64)
+            is_categorical = high - low < max_categories
+        else:
+            base = base.astype(np.float64, copy=False)
+            current = current.astype(np.float64, copy=False)
+            has_nan = np.isnan(base).any(axis=0) | np.isnan(current).any(axis=0)
+            is_integral = (base == np.round(base)).all(axis=0) & (current == np.round(current)).all(axis=0)
+            with np.errstate(invalid="ignore"):
+                low = np.minimum(base.min(axis=0), current.min(axis=0))
+                high = np.maximum(base.max(axis=0), current.max(axis=0))
+            is_categorical = ~has_nan & is_integral & (high - low < max_categories)
+            low = np.where(is_categorical, low, 0).astype(np.int64)
+            high = np.where(is_categorical, high, 0).astype(np.int64)
+
+        columns = np.flatnonzero(is_categorical)
+        width = int((high[columns] - low[columns]).max()) + 1 if len(columns) else 1
+        offsets = np.arange(len(columns)) * width - low[columns]
+
+        def bincount(data: np.ndarray) -> np.ndarray:
+            counts = np.zeros(len(columns) * width, dtype=np.int64)
+            for start in range(0, data.shape[0], chunk_size):
+                codes = data[start:start + chunk_size, columns].astype(np.int64) + offsets
+                counts += np.bincount(codes.ravel(order="K"), minlength=len(columns) * width)
+            return counts.reshape(len(columns), width)
+
+        support = low[columns][:, None] + np.arange(width)[None, :]
+        return is_categorical, support, bincount(base), bincount(current)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def ks_statistic_from_histograms(base_counts: np.ndarray, current_counts: np.ndarray) -> np.ndarray:
+    """
+    Two-sided KS statistic per row of aligned histograms, computed exactly as ks_2samp does
+    from the empirical CDFs.
+    """
+    n1 = base_counts.sum(axis=1, keepdims=True)
+    n2 = current_counts.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cddiffs = np.cumsum(base_counts, axis=1) / n1 - np.cumsum(current_counts, axis=1) / n2
+    max_s = cddiffs.max(axis=1)
+    min_s = np.clip(-cddiffs.min(axis=1), 0, 1)
+    return np.where(min_s > max_s, min_s, max_s)
+
+
+def ks_p_values(statistics: np.ndarray, support: np.ndarray, base_counts: np.ndarray,
+                current_counts: np.ndarray) -> np.ndarray:
+    """
+    p-values matching ks_2samp(method="auto"): one vectorized kstwo call for all large samples; for
+    small samples (exact method) the sorted samples are rebuilt from the histograms, which is cheap.
+    """
+    try:
+        n1 = base_counts.sum(axis=1)
+        n2 = current_counts.sum(axis=1)
+        p_values = np.full(len(statistics), np.nan)
+
+        asymptotic = np.maximum(n1, n2) > KS_EXACT_MAX_N
+        if asymptotic.any():
+            m = np.maximum(n1, n2)[asymptotic].astype(np.float64)
+            n = np.minimum(n1, n2)[asymptotic].astype(np.float64)
+            p_values[asymptotic] = np.clip(kstwo.sf(statistics[asymptotic], np.round(m * n / (m + n))), 0, 1)
+
+        for index in np.flatnonzero(~asymptotic & (n1 > 0) & (n2 > 0)):
+            values = support[index]
+            p_values[index] = ks_2samp(np.repeat(values, base_counts[index]),
+                                       np.repeat(values, current_counts[index])).pvalue
+        return p_values
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def chi2_p_values(base_counts: np.ndarray, current_counts: np.ndarray) -> np.ndarray:
+    """
+    Chi-square test of homogeneity on each row of a pair of aligned histograms, all rows at once.
+    """
+    try:
+        observed = np.stack([base_counts, current_counts], axis=1).astype(np.float64)
+        row_totals = observed.sum(axis=2, keepdims=True)
+        column_totals = observed.sum(axis=1, keepdims=True)
+        expected = row_totals * column_totals / row_totals.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            terms = np.where(expected > 0, (observed - expected) ** 2 / expected, 0.0)
+        statistics = terms.sum(axis=(1, 2))
+        dof = (column_totals[:, 0, :] > 0).sum(axis=1) - 1
+        return np.where(dof > 0, chi2.sf(statistics, np.maximum(dof, 1)), 1.0)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def histogram_p_values(support: np.ndarray, base_counts: np.ndarray, current_counts: np.ndarray,
+                       metric: str = "ks") -> np.ndarray:
+    if metric == "ks":
+        statistics = ks_statistic_from_histograms(base_counts, current_counts)
+        return ks_p_values(statistics, support, base_counts, current_counts)
+    if metric == "chi2":
+        return chi2_p_values(base_counts, current_counts)
+    raise ValueError(f"Unsupported drift metric: {metric}")
+
+
+def drift_p_values(base_df: pd.DataFrame, current_df: pd.DataFrame, metric: str = "ks",
+                   max_categories: int = 32) -> dict:
+    """
+    p-value per column for "base and current come from the same distribution".
+
+    Categorical columns are tested together from histograms built in a single NumPy pass, with the
+    KS test or chi-square; any other column falls back to the exact scipy ks_2samp test.
+    """
+    try:
+        columns = list(base_df.columns)
+        base = base_df[columns].to_numpy()
+        current = current_df[columns].to_numpy()
+
+        is_categorical, support, base_counts, current_counts = categorical_histograms(base, current, max_categories)
+        p_values = dict(zip(
+            [column for column, flag in zip(columns, is_categorical) if flag],
+            histogram_p_values(support, base_counts, current_counts, metric).tolist(),
+        ))
+        for index in np.flatnonzero(~is_categorical):
+            p_values[columns[index]] = float(ks_2samp(base[:, index], current[:, index]).pvalue)
+        return {column: float(p_values[column]) for column in columns}
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+class HistogramAccumulator:
+    """
+    Running per-column value counts of integer-coded columns, updated chunk by chunk so drift can be
+    tested after a single streaming pass without keeping the data. Missing values are not counted.
+    """
+    def __init__(self, columns: list, low: int = -128, high: int = 127):
+        self.columns = list(columns)
+        self.low = low
+        self.width = high - low + 1
+        self.counts = np.zeros((len(self.columns), self.width), dtype=np.int64)
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        values: (rows, columns) float array in column order, NaN for missing, integers in [low, high] otherwise.
+        """
+        try:
+            present = ~np.isnan(values)
+            codes = (np.where(present, values, self.low) - self.low).astype(np.int64)
+            codes += np.arange(len(self.columns)) * self.width
+            self.counts += np.bincount(codes[present], minlength=self.counts.size).reshape(self.counts.shape)
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+
+def accumulated_drift_p_values(base: HistogramAccumulator, current: HistogramAccumulator,
+                               metric: str = "ks") -> dict:
+    """
+    p-value per column from two HistogramAccumulators over the same columns.
+    """
+    try:
+        occupied = np.flatnonzero((base.counts + current.counts).sum(axis=0))
+        if len(occupied) == 0:
+            return {column: float("nan") for column in base.columns}
+        bins = slice(occupied[0], occupied[-1] + 1)
+        support = np.tile(np.arange(base.width)[bins] + base.low, (len(base.columns), 1))
+        p_values = histogram_p_values(support, base.counts[:, bins], current.counts[:, bins], metric)
+        return {column: float(p_value) for column, p_value in zip(base.columns, p_values)}
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
@@ -0,0 +1,279 @@
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import AdaBoostClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+
+
+class CompiledTreeModel:
+    """
+    Array-backed copy of a fitted sklearn tree classifier with a vectorized NumPy predictor.
+
+    All trees live in one flat node table (feature, threshold, first child, missing-value direction and a
+    per-node output vector). Nodes are renumbered so that the two children of a node are adjacent, which
+    makes one routing step `node = child[node] + (x > threshold[node])`; leaves point to themselves with an
+    infinite threshold, so a block of rows goes through every tree at once in max_depth steps with no
+    per-node Python. The per-leaf outputs are precomputed with the same floating point operations sklearn
+    applies at predict time and summed in the same tree order, so predictions are bit-identical to the
+    source estimator.
+
+    kind is one of:
+    - "tree": single decision tree, argmax of the leaf class weights
+    - "forest": random forest, mean of the per-tree normalized class probabilities
+    - "gradient_boosting": init raw prediction plus learning_rate * leaf value per stage and class
+    - "adaboost": SAMME weighted votes of the boosted trees
+    """
+    # Rows routed together; keeps the (rows, trees) working arrays cache sized
+    block_elements: int = 1 << 16
+    # Deeper ensembles only step the (row, tree) pairs that have not reached a leaf yet
+    dense_max_depth: int = 8
+
+    def __init__(self, kind: str, classes: np.ndarray, feature: np.ndarray, threshold: np.ndarray,
+                 child: np.ndarray, missing_left: np.ndarray, value: np.ndarray, roots: np.ndarray,
+                 tree_columns: np.ndarray, max_depth: int, n_features: int,
+                 init_raw: Optional[np.ndarray] = None, weight_sum: float = 1.0):
+        self.kind = kind
+        self.classes_ = classes
+        self.feature = feature
+        self.threshold = threshold
+        self.child = child
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.tree_columns = tree_columns
+        self.max_depth = max_depth
+        self.n_features_in_ = n_features
+        self.init_raw = init_raw
+        self.weight_sum = weight_sum
+        self.is_leaf = np.isinf(threshold)
+        # Largest batch this predictor beats the source estimator on (None: any size), see calibrate_batch_limit
+        self.max_batch_rows = None
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def _route(self, X: np.ndarray) -> np.ndarray:
+        offsets = (np.arange(len(X)) * X.shape[1])[:, None]
+        X = X.ravel()
+        node = np.broadcast_to(self.roots, (len(offsets), self.n_trees))
+        has_nan = np.isnan(X).any()
+        if self.max_depth > self.dense_max_depth:
+            return self._route_active(X, offsets, node, has_nan)
+        for _ in range(self.max_depth):
+            node = self._step(X, offsets, node, has_nan)
+        return node
+
+    def _route_active(self, X: np.ndarray, offsets: np.ndarray, node: np.ndarray, has_nan: bool) -> np.ndarray:
+        # Deep trees have leaves at very different depths: only (row, tree) pairs still inside a tree are stepped
+        node = node.ravel().copy()
+        offsets = np.repeat(offsets.ravel(), self.n_trees)
+        active = np.flatnonzero(~self.is_leaf[node])
+        while len(active):
+            moved = self._step(X, offsets[active], node[active], has_nan)
+            node[active] = moved
+            active = active[~self.is_leaf[moved]]
+        return node.reshape(-1, self.n_trees)
+
+    def _step(self, X: np.ndarray, offsets: np.ndarray, node: np.ndarray, has_nan: bool) -> np.ndarray:
+        x = X[offsets + self.feature[node]]
+        if not has_nan:
+            return self.child[node] + (x > self.threshold[node])
+        go_left = (x <= self.threshold[node]) | (np.isnan(x) & self.missing_left[node])
+        return self.child[node] + ~go_left
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Global leaf node id reached by every row in every tree, shape (n_samples, n_trees)."""
+        try:
+            # sklearn trees compare float32 inputs against float64 thresholds
+            X = np.ascontiguousarray(X, dtype=np.float32)
+            if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+                raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+            block_rows = max(1, self.block_elements // self.n_trees)
+            if len(X) <= block_rows:
+                return self._route(X)
+            return np.concatenate([self._route(X[start:start + block_rows]) for start in range(0, len(X), block_rows)])
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def decision_values(self, X: np.ndarray) -> np.ndarray:
+        """Class scores the source estimator takes its argmax (or sign) over."""
+        try:
+            leaves = self.apply(X).T
+            if self.kind == "tree":
+                return self.value[leaves[0]]
+
+            if self.kind == "gradient_boosting":
+                # Reduction over the leading axis adds stage after stage, starting from the init prediction
+                raw = np.empty((leaves.shape[1], len(self.init_raw)))
+                for column, init in enumerate(self.init_raw):
+                    trees = leaves[self.tree_columns == column]
+                    raw[:, column] = np.add.reduce(self.value[trees, 0], axis=0, initial=init)
+                return raw
+
+            # Summed one tree at a time, in estimator order, like sklearn
+            scores = self.value[leaves].sum(axis=0)
+            scores /= self.n_trees if self.kind == "forest" else self.weight_sum
+            return scores
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        try:
+            scores = self.decision_values(X)
+            if self.kind == "gradient_boosting" and scores.shape[1] == 1:
+                return self.classes_[(scores[:, 0] >= 0).astype(int)]
+            if self.kind == "adaboost" and len(self.classes_) == 2:
+                scores[:, 0] *= -1
+                return self.classes_.take(scores.sum(axis=1) > 0, axis=0)
+            return self.classes_.take(np.argmax(scores, axis=1), axis=0)
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        try:
+            if self.kind != "forest":
+                raise ValueError(f"predict_proba is only compiled for forests, not {self.kind}")
+            return self.decision_values(X)
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+
+def _tree_node_values(estimator, kind: str, learning_rate: float = 1.0, weight: float = 1.0,
+                      n_classes: int = 2, classes: Optional[np.ndarray] = None) -> np.ndarray:
+    tree = estimator.tree_
+    if kind == "tree":
+        return tree.value[:, 0, :]
+    if kind == "forest":
+        # DecisionTreeClassifier.predict_proba normalization, applied per leaf
+        proba = tree.value[:, 0, :n_classes].copy()
+        normalizer = proba.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        proba /= normalizer
+        return proba
+    if kind == "gradient_boosting":
+        return learning_rate * tree.value[:, 0, :1]
+    # AdaBoost SAMME: +w for the predicted class, -w / (K - 1) for the others
+    predicted = estimator.classes_.take(np.argmax(tree.value[:, 0, :], axis=1), axis=0)
+    return np.where((predicted == classes[:, np.newaxis]).T, weight, -1 / (n_classes - 1) * weight)
+
+
+def _children_adjacent_order(tree) -> tuple:
+    """Breadth-first node order in which every internal node's right child directly follows its left child."""
+    order, first_child = [0], {}
+    for node in order:
+        if tree.children_left[node] != -1:
+            first_child[node] = len(order)
+            order.extend((tree.children_left[node], tree.children_right[node]))
+    return np.array(order, dtype=np.int64), first_child
+
+
+def _build(kind: str, estimators: List, classes: np.ndarray, n_features: int, values: List[np.ndarray],
+           tree_columns: Optional[List[int]] = None, **kwargs) -> CompiledTreeModel:
+    feature, threshold, child, missing_left, node_values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator, value in zip(estimators, values):
+        tree = estimator.tree_
+        order, first_child = _children_adjacent_order(tree)
+        is_leaf = tree.children_left[order] == -1
+        new_ids = np.arange(len(order), dtype=np.int64) + offset
+        feature.append(np.where(is_leaf, 0, tree.feature[order]))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+        child.append(np.array([first_child.get(node, -1) for node in order.tolist()], dtype=np.int64) + offset)
+        child[-1][is_leaf] = new_ids[is_leaf]
+        missing_left.append(np.where(is_leaf, True, tree.missing_go_to_left[order].astype(bool)))
+        node_values.append(value[order])
+        roots.append(offset)
+        offset += len(order)
+
+    index_dtype = np.int32 if offset < 2 ** 31 else np.int64
+    return CompiledTreeModel(
+        kind=kind,
+        classes=np.array(classes),
+        feature=np.concatenate(feature).astype(np.intp),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        child=np.concatenate(child).astype(index_dtype),
+        missing_left=np.concatenate(missing_left),
+        value=np.ascontiguousarray(np.concatenate(node_values).astype(np.float64)),
+        roots=np.array(roots, dtype=index_dtype),
+        tree_columns=np.array(tree_columns if tree_columns is not None else [0] * len(estimators), dtype=np.intp),
+        max_depth=max(estimator.tree_.max_depth for estimator in estimators),
+        n_features=n_features,
+        **kwargs,
+    )
+
+
+def calibrate_batch_limit(compiled_model: CompiledTreeModel, model, X: np.ndarray,
+                          batch_sizes=(1, 16, 64, 256, 1024, 4096, 16384), repeats: int = 3) -> Optional[int]:
+    """
+    Largest batch size (from batch_sizes, ascending) up to which the compiled predictor is faster than
+    model.predict; None if it is faster at every size and 0 if it is slower even for a single row.
+    NumPy routing wins on per-call overhead, sklearn's Cython traversal wins on large batches of deep trees.
+    """
+    try:
+        X = np.asarray(X)
+        limit = 0
+        for batch_size in batch_sizes:
+            batch = np.resize(X, (batch_size, X.shape[1]))
+            timings = []
+            for predict in (compiled_model.predict, model.predict):
+                predict(batch)
+                best = np.inf
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    predict(batch)
+                    best = min(best, time.perf_counter() - start)
+                timings.append(best)
+            if timings[0] >= timings[1]:
+                return limit
+            limit = batch_size
+        return None
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def compile_tree_model(model) -> Optional[CompiledTreeModel]:
+    """
+    Converts a fitted DecisionTree, RandomForest, GradientBoosting or AdaBoost classifier into a
+    CompiledTreeModel. Returns None for anything else (e.g. LogisticRegression or multi-output trees).
+    """
+    try:
+        if isinstance(model, DecisionTreeClassifier) and model.n_outputs_ == 1:
+            return _build("tree", [model], model.classes_, model.n_features_in_,
+                          [_tree_node_values(model, "tree")])
+
+        if isinstance(model, RandomForestClassifier) and model.n_outputs_ == 1:
+            values = [_tree_node_values(tree, "forest", n_classes=model.n_classes_) for tree in model.estimators_]
+            return _build("forest", model.estimators_, model.classes_, model.n_features_in_, values)
+
+        if isinstance(model, GradientBoostingClassifier) and isinstance(model.init_, DummyClassifier) \
+                and model.init_.strategy == "prior":
+            init_raw = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0]
+            estimators, values, columns = [], [], []
+            for stage in model.estimators_:
+                for column, tree in enumerate(stage):
+                    estimators.append(tree)
+                    values.append(_tree_node_values(tree, "gradient_boosting", learning_rate=model.learning_rate))
+                    columns.append(column)
+            return _build("gradient_boosting", estimators, model.classes_, model.n_features_in_, values,
+                          tree_columns=columns, init_raw=init_raw.astype(np.float64))
+
+        if isinstance(model, AdaBoostClassifier) and model.n_classes_ > 1 \
+                and all(isinstance(tree, DecisionTreeClassifier) for tree in model.estimators_):
+            values = [
+                _tree_node_values(tree, "adaboost", weight=weight, n_classes=model.n_classes_, classes=model.classes_)
+                for tree, weight in zip(model.estimators_, model.estimator_weights_)
+            ]
+            return _build("adaboost", list(model.estimators_[:len(values)]), model.classes_, model.n_features_in_,
+                          values, weight_sum=model.estimator_weights_.sum())
+
+        logging.info(f"{type(model).__name__} has no compiled tree representation")
+        return None
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
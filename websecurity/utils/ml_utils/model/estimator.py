@@ -6,17 +6,37 @@ from websecurity.exception.exception import WebShieldException
 from websecurity.logging.logger import logging
 
 class NetworkModel:
-    def __init__(self,preprocessor,model):
+    def __init__(self,preprocessor,model,fast_model=None,lookup_model=None):
         try:
-            self.preprocesssor=preprocessor
+            self.preprocessor=preprocessor
             self.model=model
+            # Optional drop-in predictor with identical output, e.g. a CompiledTreeModel
+            self.fast_model=fast_model
+            # Optional LookupTableModel answered before any model, misses go through predict_transformed
+            self.lookup_model=lookup_model
         except Exception as e:
             raise WebShieldException(e,sys) from e
         
     def predict(self,x):
         try:
             X_transform=self.preprocessor.transform(x)
-            y_hat=self.model.predict(X_transform)
+            lookup_model=getattr(self,"lookup_model",None)
+            if lookup_model is not None:
+                return lookup_model.predict(X_transform,fallback=self.predict_transformed)
+            return self.predict_transformed(X_transform)
+        except Exception as e:
+            raise WebShieldException(e,sys) from e
+
+    def predict_transformed(self,X_transform):
+        try:
+            model=self.model
+            # Pickles written before fast_model existed don't carry the attribute
+            fast_model=getattr(self,"fast_model",None)
+            if fast_model is not None:
+                max_batch_rows=getattr(fast_model,"max_batch_rows",None)
+                if max_batch_rows is None or len(X_transform)<=max_batch_rows:
+                    model=fast_model
+            y_hat=model.predict(X_transform)
             return y_hat
         except Exception as e:
             raise WebShieldException(e,sys) from e
\ No newline at end of file
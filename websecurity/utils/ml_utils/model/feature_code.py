@@ -0,0 +1,40 @@
+import sys
+import numpy as np
+
+from websecurity.exception.exception import WebShieldException
+
+# Every phishing feature is one of {-1, 0, 1}; a fourth digit value stands for a missing feature
+FEATURE_VALUES = np.array([-1.0, 0.0, 1.0])
+FEATURE_CODE_BASE: int = 4
+FEATURE_CODE_MISSING_DIGIT: int = 3
+
+
+def pack_feature_codes(values: np.ndarray) -> tuple:
+    """
+    Packs each row of ternary features into one int64 (2 bits per feature, NaN allowed).
+
+    Returns (codes, packable): rows holding anything other than -1/0/1/NaN are not packable
+    and their code is meaningless. Up to 31 features fit in a code.
+    """
+    try:
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape[1] > 31:
+            raise ValueError(f"{values.shape[1]} features do not fit in a 64-bit feature code")
+        missing = np.isnan(values)
+        digits = np.where(missing, FEATURE_CODE_MISSING_DIGIT, values + 1)
+        packable = ((digits == 0) | (digits == 1) | (digits == 2) | missing).all(axis=1)
+        digits = np.where(packable[:, None], digits, 0).astype(np.int64)
+        shifts = np.arange(values.shape[1], dtype=np.int64) * 2
+        codes = np.bitwise_or.reduce(digits << shifts, axis=1) if values.shape[1] else np.zeros(len(values), np.int64)
+        return codes, packable
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def unpack_feature_codes(codes: np.ndarray, n_features: int) -> np.ndarray:
+    try:
+        shifts = np.arange(n_features, dtype=np.int64) * 2
+        digits = (np.asarray(codes, dtype=np.int64)[:, None] >> shifts) & 3
+        return np.where(digits == FEATURE_CODE_MISSING_DIGIT, np.nan, digits - 1.0)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
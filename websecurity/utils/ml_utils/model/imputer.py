@@ -0,0 +1,208 @@
+from websecurity.exception.exception import WebShieldException
+import sys
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_is_fitted, validate_data
+
+
+class DiscreteNeighborImputer(TransformerMixin, BaseEstimator):
+    """
+    Nearest-neighbour imputer for small integer-coded features, a faster stand-in for KNNImputer.
+
+    Donors are the complete rows seen in fit. Rows to impute are grouped by their missing-value
+    pattern; within a group the distance only depends on the observed features, so:
+
+    - algorithm="hash_lookup" packs the complete rows into base-n integer codes once in fit and looks
+      each row up by its observed-feature code (sorted index for groups of at least index_min_rows rows,
+      a linear code scan otherwise). When at least n_neighbors donors match exactly, the first n_neighbors
+      of them (in fit order) are used; the remaining rows go through the blocked search.
+    - algorithm="blocked_knn" computes squared euclidean distances for block_size queries against
+      donor_block_size donors at a time with one matrix product per pair of blocks, and keeps a running
+      list of the n_neighbors closest donors (ties go to the earlier donor). Integer-coded data is
+      searched in float32 with exact integer distances; anything else in float64.
+
+    Missing values are replaced by the (optionally distance-weighted) mean of the neighbours, as in
+    KNNImputer; batches without missing values are returned without any neighbour search.
+    """
+    def __init__(self, missing_values=np.nan, n_neighbors=3, weights="uniform", algorithm="hash_lookup",
+                 block_size=2048, donor_block_size=8192, index_min_rows=32):
+        self.missing_values = missing_values
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.algorithm = algorithm
+        self.block_size = block_size
+        self.donor_block_size = donor_block_size
+        self.index_min_rows = index_min_rows
+
+    def __setstate__(self, state):
+        # Imputers pickled before the donor search was blocked have no donor_block_size
+        state.setdefault("donor_block_size", 8192)
+        if "_fit_X" in state and "_integral" not in state:
+            state["_integral"] = bool((state["_fit_X"] == np.round(state["_fit_X"])).all())
+        super().__setstate__(state)
+
+    def fit(self, X, y=None):
+        try:
+            X = validate_data(self, X, dtype=np.float64, ensure_all_finite="allow-nan", reset=True)
+            mask = np.isnan(X)
+            with np.errstate(invalid="ignore"):
+                statistics = np.nanmean(np.where(mask.all(axis=0), 0.0, X), axis=0) if len(X) else np.zeros(X.shape[1])
+            self.statistics_ = np.nan_to_num(statistics)
+            # Complete rows only, float32 is exact for small integer codes and feeds BLAS directly
+            complete = X[~mask.any(axis=1)]
+            self._integral = bool((complete == np.round(complete)).all())
+            self._fit_X = np.ascontiguousarray(complete, dtype=np.float32 if self._integral else np.float64)
+            self._fit_codes = self._pack_donors(self._fit_X)
+            return self
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def transform(self, X):
+        try:
+            check_is_fitted(self, "_fit_X")
+            X = validate_data(self, X, dtype=np.float64, ensure_all_finite="allow-nan", reset=False, copy=False)
+            mask = np.isnan(X)
+            if not mask.any():
+                return X
+
+            X = X.copy()
+            rows = np.flatnonzero(mask.any(axis=1))
+            if len(self._fit_X) == 0:
+                X[mask] = np.take(self.statistics_, np.nonzero(mask)[1])
+                return X
+
+            patterns, inverse = np.unique(mask[rows], axis=0, return_inverse=True)
+            for pattern_index, missing in enumerate(patterns):
+                receivers = rows[inverse.ravel() == pattern_index]
+                observed = ~missing
+                if not observed.any():
+                    X[np.ix_(receivers, missing)] = self.statistics_[missing]
+                    continue
+                X[np.ix_(receivers, missing)] = self._impute_pattern(X[np.ix_(receivers, observed)], observed, missing)
+            return X
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def _impute_pattern(self, queries: np.ndarray, observed: np.ndarray, missing: np.ndarray) -> np.ndarray:
+        donors = self._fit_X[:, observed]
+        n_neighbors = min(self.n_neighbors, len(donors))
+        neighbors = np.empty((len(queries), n_neighbors), dtype=np.int64)
+        distances = np.zeros((len(queries), n_neighbors), dtype=np.float64)
+
+        pending = np.arange(len(queries))
+        if self.algorithm == "hash_lookup":
+            found, exact = self._exact_matches(queries, observed, n_neighbors)
+            neighbors[found] = exact
+            pending = np.flatnonzero(~found)
+        elif self.algorithm != "blocked_knn":
+            raise Exception(f"Unsupported imputer algorithm: {self.algorithm}")
+
+        if len(pending):
+            neighbors[pending], distances[pending] = self._nearest_donors(queries[pending], donors, n_neighbors)
+
+        values = self._fit_X[:, missing][neighbors].astype(np.float64)
+        if self.weights == "distance":
+            with np.errstate(divide="ignore"):
+                weights = 1.0 / np.sqrt(distances)
+            zero = np.isinf(weights)
+            weights[zero.any(axis=1)] = zero[zero.any(axis=1)]
+            return np.einsum("rk,rkc->rc", weights, values) / weights.sum(axis=1, keepdims=True)
+        return values.mean(axis=1)
+
+    def _pack_donors(self, donors: np.ndarray):
+        """Base-`n_values` codes of the complete rows, or None when they are not small integers."""
+        self._low = float(donors.min()) if donors.size else 0.0
+        self._base = int(donors.max() - self._low) + 1 if donors.size else 1
+        if not donors.size or not (donors == np.round(donors)).all() or self._base ** donors.shape[1] >= 2 ** 62:
+            return None
+        self._powers = self._base ** np.arange(donors.shape[1], dtype=np.int64)
+        return (donors - self._low).astype(np.int64) @ self._powers
+
+    def _exact_matches(self, queries: np.ndarray, observed: np.ndarray, n_neighbors: int):
+        found = np.zeros(len(queries), dtype=bool)
+        high = self._low + self._base - 1
+        usable = (queries == np.round(queries)).all(axis=1) & (queries >= self._low).all(axis=1) & (queries <= high).all(axis=1)
+        if self._fit_codes is None or not usable.any():
+            return found, np.empty((0, n_neighbors), dtype=np.int64)
+
+        # Zero the missing digits so the donor codes only encode the observed features
+        powers = self._powers[observed]
+        donor_codes = self._fit_codes - (self._fit_X[:, ~observed] - self._low).astype(np.int64) @ self._powers[~observed]
+        query_codes = (queries[usable] - self._low).astype(np.int64) @ powers
+
+        if len(query_codes) < self.index_min_rows:
+            # A sorted index does not pay off for a handful of rows, scan the codes instead
+            matches = np.full((len(query_codes), n_neighbors), -1, dtype=np.int64)
+            for row, code in enumerate(query_codes):
+                hits = np.flatnonzero(donor_codes == code)[:n_neighbors]
+                matches[row, :len(hits)] = hits
+            enough = matches[:, -1] >= 0
+            found[np.flatnonzero(usable)[enough]] = True
+            return found, matches[enough]
+
+        order = np.argsort(donor_codes, kind="stable")
+        sorted_codes = donor_codes[order]
+        left = np.searchsorted(sorted_codes, query_codes, side="left")
+        right = np.searchsorted(sorted_codes, query_codes, side="right")
+        enough = right - left >= n_neighbors
+        found[np.flatnonzero(usable)[enough]] = True
+        return found, order[left[enough][:, None] + np.arange(n_neighbors)]
+
+    def _nearest_donors(self, queries: np.ndarray, donors: np.ndarray, n_neighbors: int):
+        """
+        The n_neighbors closest donors of every query, searched one block of queries against one block
+        of donors at a time while a running top-k per query is kept, so memory does not grow with the
+        number of donors.
+        """
+        if not (self._integral and (queries == np.round(queries)).all()):
+            return self._nearest_donors_float(queries, donors, n_neighbors)
+        queries = queries.astype(np.float32)
+        donor_norms = np.einsum("ij,ij->i", donors, donors)
+        n_donors = len(donors)
+        neighbors = np.empty((len(queries), n_neighbors), dtype=np.int64)
+        distances = np.empty((len(queries), n_neighbors), dtype=np.float64)
+        for start in range(0, len(queries), self.block_size):
+            block = queries[start:start + self.block_size]
+            block_norms = np.einsum("ij,ij->i", block, block)[:, None]
+            # Keys are distance * n_donors + donor index: the index breaks ties, so results do not depend
+            # on the partition algorithm, and both are recovered from the key. Integer rows have integer
+            # squared distances, so rounding only removes float32 error.
+            best = np.full((len(block), n_neighbors), np.iinfo(np.int64).max, dtype=np.int64)
+            for donor_start in range(0, n_donors, self.donor_block_size):
+                donor_stop = min(donor_start + self.donor_block_size, n_donors)
+                squared = block_norms + donor_norms[None, donor_start:donor_stop] - 2 * block @ donors[donor_start:donor_stop].T
+                keys = np.maximum(np.round(squared), 0).astype(np.int64) * n_donors + np.arange(donor_start, donor_stop)
+                best = np.partition(np.concatenate([best, keys], axis=1), n_neighbors - 1, axis=1)[:, :n_neighbors]
+            best.sort(axis=1)
+            neighbors[start:start + len(block)] = best % n_donors
+            distances[start:start + len(block)] = best // n_donors
+        return neighbors, distances
+
+    def _nearest_donors_float(self, queries: np.ndarray, donors: np.ndarray, n_neighbors: int):
+        """
+        Same blocked search on float64 distances for data that is not integer-coded. Running neighbours
+        come before the current donor block and are kept in (distance, index) order, so a stable sort of
+        the concatenation gives ties to the earlier donor.
+        """
+        queries = queries.astype(np.float64)
+        donors = donors.astype(np.float64, copy=False)
+        donor_norms = np.einsum("ij,ij->i", donors, donors)
+        n_donors = len(donors)
+        neighbors = np.empty((len(queries), n_neighbors), dtype=np.int64)
+        distances = np.empty((len(queries), n_neighbors), dtype=np.float64)
+        for start in range(0, len(queries), self.block_size):
+            block = queries[start:start + self.block_size]
+            block_norms = np.einsum("ij,ij->i", block, block)[:, None]
+            best_distances = np.full((len(block), 0), np.inf)
+            best = np.empty((len(block), 0), dtype=np.int64)
+            for donor_start in range(0, n_donors, self.donor_block_size):
+                donor_stop = min(donor_start + self.donor_block_size, n_donors)
+                squared = block_norms + donor_norms[None, donor_start:donor_stop] - 2 * block @ donors[donor_start:donor_stop].T
+                candidate_distances = np.concatenate([best_distances, np.maximum(squared, 0)], axis=1)
+                candidates = np.concatenate([best, np.broadcast_to(np.arange(donor_start, donor_stop), squared.shape)], axis=1)
+                order = np.argsort(candidate_distances, axis=1, kind="stable")[:, :n_neighbors]
+                best_distances = np.take_along_axis(candidate_distances, order, axis=1)
+                best = np.take_along_axis(candidates, order, axis=1)
+            neighbors[start:start + len(block)] = best
+            distances[start:start + len(block)] = best_distances
+        return neighbors, distances
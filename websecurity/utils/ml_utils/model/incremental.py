@@ -0,0 +1,67 @@
+import sys
+from typing import Iterator, Tuple
+
+import numpy as np
+
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+
+
+def iter_chunks(X, y, chunk_size: int, classes=None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Consecutive row chunks of X and y, each read into memory on its own, so memory-mapped arrays are
+    never loaded whole. With classes, a chunk missing one of them is carried over into the next.
+    """
+    carried_X, carried_y = [], []
+    for start in range(0, len(X), chunk_size):
+        carried_X.append(np.asarray(X[start:start + chunk_size]))
+        carried_y.append(np.asarray(y[start:start + chunk_size]))
+        chunk_y = np.concatenate(carried_y) if len(carried_y) > 1 else carried_y[0]
+        if classes is not None and len(np.unique(chunk_y)) < len(classes) and start + chunk_size < len(X):
+            continue
+        chunk_X = np.concatenate(carried_X) if len(carried_X) > 1 else carried_X[0]
+        carried_X, carried_y = [], []
+        yield chunk_X, chunk_y
+
+
+def predict_in_chunks(model, X, chunk_size: int) -> np.ndarray:
+    try:
+        predictions = [model.predict(np.asarray(X[start:start + chunk_size])) for start in range(0, len(X), chunk_size)]
+        return np.concatenate(predictions) if predictions else np.empty(0)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def supports_incremental_fit(model) -> bool:
+    params = model.get_params()
+    return hasattr(model, "partial_fit") or ("warm_start" in params and "n_estimators" in params)
+
+
+def fit_incremental(model, X, y, chunk_size: int, epochs: int = 1, trees_per_chunk: int = 16):
+    """
+    Fits model one chunk of rows at a time. Estimators with partial_fit (SGD, naive Bayes) see every
+    chunk once per epoch; warm-started ensembles (forests, gradient boosting) grow trees_per_chunk
+    trees on each chunk, so each tree only ever sees one chunk.
+    """
+    try:
+        classes = np.unique(y)
+        if hasattr(model, "partial_fit"):
+            for epoch in range(epochs):
+                for X_chunk, y_chunk in iter_chunks(X, y, chunk_size):
+                    model.partial_fit(X_chunk, y_chunk, classes=classes)
+        elif supports_incremental_fit(model):
+            # Trees fitted on a chunk without every class would disagree with the ensemble on classes_
+            n_estimators = 0
+            for X_chunk, y_chunk in iter_chunks(X, y, chunk_size, classes=classes):
+                if len(np.unique(y_chunk)) < len(classes):
+                    logging.info(f"Skipping the last {len(y_chunk)} rows, they do not contain every class")
+                    continue
+                n_estimators += trees_per_chunk
+                model.set_params(warm_start=True, n_estimators=n_estimators)
+                model.fit(X_chunk, y_chunk)
+        else:
+            raise ValueError(f"{type(model).__name__} has neither partial_fit nor warm_start")
+        logging.info(f"Fitted {type(model).__name__} incrementally over {len(X)} rows in chunks of {chunk_size}")
+        return model
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
@@ -0,0 +1,145 @@
+import sys
+from typing import Callable, Optional
+
+import numpy as np
+
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+
+
+def used_features(model) -> Optional[np.ndarray]:
+    """Indices of the input features a fitted model can look at, or None when that can't be told."""
+    try:
+        if hasattr(model, "tree_"):
+            return np.unique(model.tree_.feature[model.tree_.feature >= 0])
+        if hasattr(model, "estimators_"):
+            estimators = np.ravel(model.estimators_)
+            features = [used_features(estimator) for estimator in estimators]
+            if any(feature is None for feature in features):
+                return None
+            return np.unique(np.concatenate(features)) if features else np.array([], dtype=np.intp)
+        if hasattr(model, "coef_"):
+            return np.flatnonzero(np.any(np.atleast_2d(model.coef_) != 0, axis=0))
+        return None
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+class LookupTableModel:
+    """
+    Precomputed predictions of a model, indexed by the base-3 code of the features it uses.
+
+    "dense" tables hold a prediction for every combination of the used features; "hashed" tables only
+    hold the combinations seen in the data they were built from (sorted codes, searched vectorially).
+    Rows with a value outside {-1, 0, 1} in a used feature, or a code missing from a hashed table,
+    are sent to the fallback predict passed to predict().
+    """
+    def __init__(self, kind: str, features: np.ndarray, n_features: int, predictions: np.ndarray,
+                 codes: Optional[np.ndarray] = None):
+        self.kind = kind
+        self.features = features
+        self.n_features_in_ = n_features
+        self.predictions = predictions
+        self.codes = codes
+        self.powers = 3 ** np.arange(len(features), dtype=np.int64)
+
+    @property
+    def n_entries(self) -> int:
+        return len(self.predictions)
+
+    def encode(self, X: np.ndarray) -> tuple:
+        """(codes, ternary) for the used features of every row; codes of non-ternary rows are meaningless."""
+        values = np.asarray(X)[:, self.features]
+        ternary = ((values == -1) | (values == 0) | (values == 1)).all(axis=1)
+        digits = np.where(ternary[:, None], values + 1, 0).astype(np.int64)
+        return digits @ self.powers, ternary
+
+    def lookup(self, X: np.ndarray) -> tuple:
+        """(predictions, found): table predictions for the rows found in it; other rows are left unset."""
+        try:
+            codes, found = self.encode(X)
+            if self.kind == "dense":
+                index = codes
+            elif len(self.codes) == 0:
+                index, found = codes, np.zeros(len(codes), dtype=bool)
+            else:
+                index = np.minimum(np.searchsorted(self.codes, codes), len(self.codes) - 1)
+                found &= self.codes[index] == codes
+            predictions = np.empty(len(codes), dtype=self.predictions.dtype)
+            predictions[found] = self.predictions[index[found]]
+            return predictions, found
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def predict(self, X: np.ndarray, fallback: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> np.ndarray:
+        try:
+            predictions, found = self.lookup(X)
+            if not found.all():
+                if fallback is None:
+                    raise ValueError(f"{(~found).sum()} rows are not in the lookup table and no fallback was given")
+                missed = np.flatnonzero(~found)
+                missed_predictions = fallback(np.asarray(X)[missed])
+                predictions = predictions.astype(np.result_type(predictions, missed_predictions))
+                predictions[missed] = missed_predictions
+            return predictions
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+
+def unseen_rows(table: LookupTableModel, n_rows: int = 256, seed: int = 0) -> np.ndarray:
+    """
+    Rows the table has no entry for, to check the fallback with: random ternary combinations of the used
+    features that a hashed table misses, and one row with a value outside {-1, 0, 1}.
+    """
+    try:
+        generator = np.random.default_rng(seed)
+        rows = generator.integers(-1, 2, size=(n_rows, table.n_features_in_)).astype(np.float32)
+        _, found = table.lookup(rows)
+        rows = rows[~found]
+        outside = np.zeros((1, table.n_features_in_), dtype=np.float32)
+        if len(table.features):
+            outside[0, table.features[0]] = 2
+        return np.concatenate([rows, outside])
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def build_lookup_model(model, X: np.ndarray, max_dense_entries: int, max_hashed_entries: int,
+                       chunk_size: int = 100000) -> Optional[LookupTableModel]:
+    """
+    Tabulates model.predict over the features it uses. Every combination is enumerated when there are at
+    most max_dense_entries of them; otherwise the distinct ternary combinations present in X are tabulated
+    if there are at most max_hashed_entries. Returns None when neither fits.
+    """
+    try:
+        X = np.asarray(X)
+        n_features = X.shape[1]
+        features = used_features(model)
+        if features is None:
+            features = np.arange(n_features)
+
+        if 3 ** len(features) <= max_dense_entries:
+            kind, codes = "dense", np.arange(3 ** len(features), dtype=np.int64)
+        else:
+            table = LookupTableModel("hashed", features, n_features, np.empty(0))
+            observed_codes, ternary = table.encode(X)
+            codes = np.unique(observed_codes[ternary])
+            if len(codes) > max_hashed_entries:
+                logging.info(f"Lookup table over {len(features)} features needs {len(codes)} entries, "
+                             f"more than {max_hashed_entries}")
+                return None
+            kind = "hashed"
+
+        predictions = []
+        for start in range(0, len(codes), chunk_size):
+            chunk = codes[start:start + chunk_size]
+            # Features the model never looks at are left at 0
+            rows = np.zeros((len(chunk), n_features), dtype=np.float32)
+            rows[:, features] = (chunk[:, None] // 3 ** np.arange(len(features), dtype=np.int64)) % 3 - 1
+            predictions.append(model.predict(rows))
+        predictions = np.concatenate(predictions) if predictions else np.empty(0)
+
+        logging.info(f"Built {kind} lookup table with {len(codes)} entries over {len(features)} of {n_features} features")
+        return LookupTableModel(kind, features, n_features, predictions, codes=codes if kind == "hashed" else None)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
@@ -0,0 +1,272 @@
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+
+import os
+import sys
+import json
+import math
+import time
+import hashlib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone, is_classifier
+from sklearn.model_selection import ParameterGrid, ParameterSampler, check_cv
+
+
+def dataset_fingerprint(X, y) -> str:
+    """
+    Content hash of the training data, used to key cached search results.
+    """
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (X, y):
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.shape}{array.dtype}".encode())
+            digest.update(memoryview(array).cast("B"))
+        return digest.hexdigest()
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def task_key(model, params: dict, fold: int, n_samples: int = None) -> str:
+    full_params = {**model.get_params(deep=False), **params}
+    description = f"{type(model).__name__}|{sorted(full_params.items(), key=lambda item: item[0])!r}|{fold}"
+    if n_samples is not None:
+        description = f"{description}|{n_samples}"
+    return hashlib.blake2b(description.encode(), digest_size=16).hexdigest()
+
+
+class SearchCache:
+    """
+    Append-only JSON-lines store of fold scores for one dataset fingerprint.
+    Scores are written as soon as each fold finishes, so an interrupted search resumes where it stopped.
+    Failed fits (NaN) are only kept for the current search, so the next search runs them again.
+    """
+    def __init__(self, cache_dir: str, fingerprint: str):
+        try:
+            self.file_path = os.path.join(cache_dir, f"{fingerprint}.jsonl") if cache_dir else None
+            self.scores = {}
+            if self.file_path and os.path.exists(self.file_path):
+                with open(self.file_path, "r") as file_obj:
+                    for line in file_obj:
+                        if line.strip():
+                            record = json.loads(line)
+                            # Caches written before failures were skipped may hold NaN scores
+                            if not math.isnan(record["score"]):
+                                self.scores[record["key"]] = record["score"]
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.scores
+
+    def __getitem__(self, key: str) -> float:
+        return self.scores[key]
+
+    def add(self, key: str, score: float) -> None:
+        self.scores[key] = score
+        if self.file_path and not math.isnan(score):
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            with open(self.file_path, "a") as file_obj:
+                file_obj.write(json.dumps({"key": key, "score": score}) + "\n")
+
+
+def fit_and_score(key: str, model, params: dict, X, y, train_index, test_index, n_samples: int = None):
+    try:
+        if n_samples is not None:
+            train_index = train_index[:n_samples]
+        estimator = clone(model).set_params(**params)
+        estimator.fit(X[train_index], y[train_index])
+        return key, float(estimator.score(X[test_index], y[test_index]))
+    except Exception as e:
+        # Same contract as GridSearchCV(error_score=np.nan): a failing candidate never wins
+        logging.warning(f"Fit failed for {type(model).__name__} {params}: {e}")
+        return key, float("nan")
+
+
+def refit(name: str, model, params: dict, X, y):
+    estimator = clone(model).set_params(**params)
+    estimator.fit(X, y)
+    return name, estimator
+
+
+def run_tasks(tasks: list, cache: SearchCache, n_jobs: int) -> None:
+    """
+    Runs (key, model, params, X, y, train, test, n_samples) fit/score tasks on one shared pool and caches every score.
+    """
+    try:
+        if not tasks:
+            return
+        parallel = Parallel(n_jobs=n_jobs, return_as="generator_unordered")
+        for key, score in parallel(delayed(fit_and_score)(*task) for task in tasks):
+            cache.add(key, score)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def generate_candidates(param_grid: dict, strategy: str, budget: int, random_state: int) -> list:
+    try:
+        grid = ParameterGrid(param_grid)
+        if strategy == "randomized" and budget < len(grid):
+            return list(ParameterSampler(param_grid, n_iter=budget, random_state=random_state))
+        return list(grid)
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def score_round(models: dict, evaluations: dict, folds: dict, X, y, cache: SearchCache, n_jobs: int) -> dict:
+    """
+    Scores one round of evaluations ({model name: [(params, n_samples), ...]}) for all models on the shared pool.
+    Returns {model name: array of mean fold scores}, in evaluation order.
+    """
+    try:
+        tasks = []
+        total = 0
+        for name, model in models.items():
+            for params, n_samples in evaluations[name]:
+                for fold, (train_index, test_index) in enumerate(folds[name]):
+                    total += 1
+                    key = task_key(model, params, fold, n_samples)
+                    if key not in cache:
+                        tasks.append((key, model, params, X, y, train_index, test_index, n_samples))
+
+        logging.info(f"{len(tasks)} of {total} fits to run, {total - len(tasks)} reused from cache")
+        run_tasks(tasks, cache, n_jobs)
+
+        return {
+            name: np.array([
+                np.mean([cache[task_key(model, params, fold, n_samples)] for fold in range(len(folds[name]))])
+                for params, n_samples in evaluations[name]
+            ])
+            for name, model in models.items()
+        }
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def best_index(model, mean_scores: np.ndarray) -> int:
+    """
+    Index of the highest mean fold score, first one winning ties like GridSearchCV.
+    """
+    if np.all(np.isnan(mean_scores)):
+        raise Exception(f"All candidate fits failed for {type(model).__name__}")
+    return int(np.nanargmax(mean_scores))
+
+
+def successive_halving(models: dict, candidates: dict, folds: dict, X, y, cache: SearchCache, n_jobs: int,
+                       resource: str, factor: int, min_resources: int) -> dict:
+    """
+    Evaluates all candidates on a small resource budget, keeps the best 1/factor of them and
+    multiplies the budget by factor until the full resource is reached.
+
+    resource is "n_samples" (rows of each training fold) or "n_estimators" (ensemble size;
+    models without n_estimators fall back to n_samples). Returns {model name: (params, mean cv score)}.
+    """
+    try:
+        plans = {}
+        for name, model in models.items():
+            uses_estimators = resource == "n_estimators" and "n_estimators" in model.get_params()
+            if uses_estimators:
+                grid_sizes = {params.get("n_estimators", model.n_estimators) for params in candidates[name]}
+                max_resource = max(grid_sizes)
+                remaining = []
+                for params in candidates[name]:
+                    params = {key: value for key, value in params.items() if key != "n_estimators"}
+                    if params not in remaining:
+                        remaining.append(params)
+            else:
+                max_resource = min(len(train_index) for train_index, _ in folds[name])
+                remaining = list(candidates[name])
+            n_rounds = 1 + int(np.floor(np.log(max(len(remaining), 1)) / np.log(factor)))
+            plans[name] = {"uses_estimators": uses_estimators, "max_resource": max_resource,
+                           "remaining": remaining, "n_rounds": n_rounds}
+
+        best = {}
+        n_rounds = max(plan["n_rounds"] for plan in plans.values())
+        for round_number in range(n_rounds):
+            # Models with fewer candidates join later so every model finishes in the last round
+            active = {name: plan for name, plan in plans.items() if round_number >= n_rounds - plan["n_rounds"]}
+            evaluations = {}
+            for name, plan in active.items():
+                rounds_left = n_rounds - 1 - round_number
+                budget = max(int(plan["max_resource"] / factor ** rounds_left), min_resources)
+                plan["budget"] = min(budget, plan["max_resource"])
+                if plan["uses_estimators"]:
+                    evaluations[name] = [({**params, "n_estimators": plan["budget"]}, None)
+                                         for params in plan["remaining"]]
+                else:
+                    n_samples = None if plan["budget"] >= plan["max_resource"] else plan["budget"]
+                    evaluations[name] = [(params, n_samples) for params in plan["remaining"]]
+
+            logging.info(f"Successive halving round {round_number + 1}/{n_rounds}: " + ", ".join(
+                f"{name}={len(evaluations[name])}x{plan['budget']}" for name, plan in active.items()))
+            scores = score_round({name: models[name] for name in active}, evaluations, folds, X, y, cache, n_jobs)
+
+            for name, plan in active.items():
+                if round_number == n_rounds - 1:
+                    index = best_index(models[name], scores[name])
+                    params = evaluations[name][index][0]
+                    if plan["uses_estimators"]:
+                        params = {**params, "n_estimators": plan["max_resource"]}
+                    best[name] = (params, float(scores[name][index]))
+                    continue
+                keep = max(int(np.ceil(len(plan["remaining"]) / factor)), 1)
+                order = np.argsort(-np.nan_to_num(scores[name], nan=-np.inf), kind="stable")[:keep]
+                plan["remaining"] = [plan["remaining"][i] for i in sorted(order)]
+        return best
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
+
+
+def search_models(X_train, y_train, models: dict, params: dict, cv: int = 3, n_jobs: int = -1,
+                  cache_dir: str = None, strategy: str = "exhaustive", budget: int = 20,
+                  resource: str = "n_samples", factor: int = 3, min_resources: int = 8,
+                  random_state: int = 42) -> dict:
+    """
+    Searches every model's parameter space with all model/candidate/fold fits sharing one process pool,
+    then refits each model's best candidate once on the full training data.
+
+    strategy is "exhaustive" (full grid), "randomized" (at most `budget` sampled candidates per model)
+    or "halving" (successive halving over `resource`, see successive_halving).
+
+    Returns {model name: (fitted best estimator, best params, mean cv score)}.
+    """
+    try:
+        start = time.perf_counter()
+        fingerprint = dataset_fingerprint(X_train, y_train)
+        cache = SearchCache(cache_dir, fingerprint)
+        logging.info(f"{strategy} search on dataset {fingerprint}")
+
+        candidates = {
+            name: generate_candidates(params[name], strategy, budget, random_state) for name in models
+        }
+        folds = {}
+        rng = np.random.RandomState(random_state)
+        for name, model in models.items():
+            splits = check_cv(cv, y_train, classifier=is_classifier(model)).split(X_train, y_train)
+            if strategy == "halving":
+                # Shuffled training indices so halving's row subsets are random rather than the first rows
+                splits = [(rng.permutation(train_index), test_index) for train_index, test_index in splits]
+            folds[name] = list(splits)
+
+        if strategy == "halving":
+            best = successive_halving(models, candidates, folds, X_train, y_train, cache, n_jobs,
+                                      resource, factor, min_resources)
+        else:
+            evaluations = {name: [(params, None) for params in candidates[name]] for name in models}
+            scores = score_round(models, evaluations, folds, X_train, y_train, cache, n_jobs)
+            best = {}
+            for name, model in models.items():
+                index = best_index(model, scores[name])
+                best[name] = (candidates[name][index], float(scores[name][index]))
+
+        for name in models:
+            logging.info(f"{name}: best params {best[name][0]} (cv score {best[name][1]:.4f})")
+
+        fitted = dict(Parallel(n_jobs=n_jobs)(
+            delayed(refit)(name, model, best[name][0], X_train, y_train) for name, model in models.items()
+        ))
+        logging.info(f"Model search finished in {time.perf_counter() - start:.1f}s")
+        return {name: (fitted[name], best[name][0], best[name][1]) for name in models}
+    except Exception as e:
+        raise WebShieldException(e, sys) from e
@@ -0,0 +1,146 @@
+import os
+import sys
+import queue
+import atexit
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Callable, Dict, Optional
+
+import mlflow
+
+from websecurity.constant.training_pipeline import (
+    MODEL_TRAINER_MLFLOW_FALLBACK_DIR, MODEL_TRAINER_MLFLOW_FLUSH_TIMEOUT_SECONDS,
+    MODEL_TRAINER_MLFLOW_CONNECT_TIMEOUT_SECONDS
+)
+from websecurity.exception.exception import WebShieldException
+from websecurity.logging.logger import logging
+
+
+def tracking_server_reachable(tracking_uri: str, timeout_seconds: float) -> bool:
+    """False only for an http(s) tracking server that cannot be connected to; any HTTP answer counts."""
+    if urllib.parse.urlparse(tracking_uri).scheme not in ("http", "https"):
+        return True
+    try:
+        urllib.request.urlopen(f"{tracking_uri.rstrip('/')}/health", timeout=timeout_seconds).close()
+        return True
+    except urllib.error.HTTPError:
+        return True
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+class MLflowTracker:
+    """
+    Logs training runs to MLflow from a background thread, so training returns while the model is
+    serialized and uploaded. Each training run becomes one MLflow run: its metrics go in a single
+    batch and the model is logged (and registered) once. When the tracking server cannot be reached,
+    runs go to a local SQLite store under fallback_dir instead. Pending runs are flushed at exit for
+    at most flush_timeout_seconds; the thread is a daemon, so a hung upload never blocks exit.
+    """
+    def __init__(self, tracking_uri: Optional[str] = None, fallback_dir: str = MODEL_TRAINER_MLFLOW_FALLBACK_DIR,
+                 flush_timeout_seconds: float = MODEL_TRAINER_MLFLOW_FLUSH_TIMEOUT_SECONDS,
+                 connect_timeout_seconds: float = MODEL_TRAINER_MLFLOW_CONNECT_TIMEOUT_SECONDS):
+        self.tracking_uri = tracking_uri
+        self.fallback_dir = fallback_dir
+        self.fallback_uri = f"sqlite:///{os.path.abspath(os.path.join(fallback_dir, 'mlflow.db'))}"
+        self.flush_timeout_seconds = flush_timeout_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.jobs = queue.Queue()
+        self.pending = 0
+        self.idle = threading.Condition()
+        self.active_uri = None
+        self.thread = None
+
+    def resolve_tracking_uri(self) -> str:
+        tracking_uri = self.tracking_uri or mlflow.get_tracking_uri()
+        if tracking_server_reachable(tracking_uri, self.connect_timeout_seconds):
+            return tracking_uri
+        logging.info(f"MLflow tracking server {tracking_uri} is unreachable, logging to {self.fallback_uri}")
+        return self.fallback_uri
+
+    def use_fallback(self) -> None:
+        os.makedirs(self.fallback_dir, exist_ok=True)
+        self.active_uri = self.fallback_uri
+        mlflow.set_tracking_uri(self.active_uri)
+
+    def work(self) -> None:
+        while True:
+            job = self.jobs.get()
+            try:
+                if self.active_uri is None:
+                    self.active_uri = self.resolve_tracking_uri()
+                    if self.active_uri == self.fallback_uri:
+                        self.use_fallback()
+                    else:
+                        mlflow.set_tracking_uri(self.active_uri)
+                try:
+                    job()
+                except Exception as e:
+                    if self.active_uri == self.fallback_uri:
+                        raise
+                    # The server went away part-way: log the whole run again to the local store
+                    logging.info(f"MLflow logging to {self.active_uri} failed ({e}), retrying on {self.fallback_uri}")
+                    self.use_fallback()
+                    job()
+            except Exception as e:
+                logging.info(f"MLflow logging failed, run not tracked: {e}")
+            finally:
+                with self.idle:
+                    self.pending -= 1
+                    self.idle.notify_all()
+
+    def submit(self, job: Callable[[], None]) -> None:
+        with self.idle:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.work, name="mlflow-tracker", daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+            self.pending += 1
+        self.jobs.put(job)
+
+    def log_training_run(self, model_name: str, model, metrics: Dict[str, float], params: Optional[dict] = None,
+                         input_example=None) -> None:
+        """Queues one MLflow run with all metrics and a single logged model; returns immediately."""
+        try:
+            def job():
+                with mlflow.start_run(run_name=model_name):
+                    mlflow.log_metrics(metrics)
+                    if params:
+                        mlflow.log_params(params)
+                    mlflow.sklearn.log_model(
+                        sk_model=model,
+                        name=model_name.replace(" ", "_"),
+                        registered_model_name=model_name,
+                        input_example=input_example,
+                        # The repo's own artifacts are pickles too; skops refuses sklearn's tree internals
+                        serialization_format=mlflow.sklearn.SERIALIZATION_FORMAT_CLOUDPICKLE,
+                    )
+                logging.info(f"Logged MLflow run for {model_name} to {self.active_uri}")
+
+            self.submit(job)
+        except Exception as e:
+            raise WebShieldException(e, sys) from e
+
+    def flush(self, timeout_seconds: Optional[float] = None) -> bool:
+        """Waits up to timeout_seconds for queued runs; True when none are left."""
+        with self.idle:
+            return self.idle.wait_for(lambda: self.pending == 0, timeout_seconds)
+
+    def close(self) -> None:
+        if not self.flush(self.flush_timeout_seconds):
+            logging.info(f"Gave up on {self.pending} MLflow run(s) after {self.flush_timeout_seconds}s")
+
+
+_tracker: Optional[MLflowTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_tracker() -> MLflowTracker:
+    """Process-wide tracker, so every training run in a process shares one queue and one exit flush."""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = MLflowTracker()
+        return _tracker